@@ -0,0 +1,125 @@
+import hashlib
+import json
+import os
+import threading
+
+# Tokens are refreshed once they are within this many seconds of expiring
+STALE_SECONDS = 300
+
+DEFAULT_CACHE_DIR = os.path.join('~', '.osfunc', 'tokens')
+
+# keystoneclient is imported where it is used so that importing this module
+# (the shell does for DEFAULT_CACHE_DIR) stays cheap
+
+_lock = threading.Lock()
+_auth_refs = {}
+
+
+def cache_key(**kwargs):
+    """
+    Description - Key a token by the identity it was issued for
+    """
+    parts = [kwargs.get('os_auth_url'), kwargs.get('os_username'),
+             kwargs.get('os_tenant_name'), kwargs.get('os_region')]
+    return hashlib.sha1('|'.join(str(part) for part in parts)).hexdigest()
+
+
+def _cache_path(key, cache_dir):
+    return os.path.join(os.path.expanduser(cache_dir), key + '.json')
+
+
+def _load(key, cache_dir, region):
+    from keystoneclient import access
+
+    try:
+        with open(_cache_path(key, cache_dir)) as cache_file:
+            body = json.load(cache_file)
+    except (IOError, ValueError):
+        return None
+    return access.AccessInfo.factory(body={'access': body},
+                                     region_name=region)
+
+
+def _save(key, cache_dir, auth_ref):
+    path = _cache_path(key, cache_dir)
+    directory = os.path.dirname(path)
+    if not os.path.isdir(directory):
+        os.makedirs(directory, 0700)
+
+    # Write to a private temp file and rename so concurrent processes never
+    # read a partially written token
+    tmp_path = '{0}.{1}'.format(path, os.getpid())
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0600)
+    with os.fdopen(fd, 'w') as cache_file:
+        json.dump(dict(auth_ref), cache_file)
+    os.rename(tmp_path, path)
+
+
+def _authenticate(**kwargs):
+    from keystoneclient.v2_0 import client as keystone_client
+
+    client = keystone_client.Client(
+        username=kwargs['os_username'],
+        password=kwargs['os_password'],
+        tenant_name=kwargs['os_tenant_name'],
+        auth_url=kwargs['os_auth_url']
+    )
+    return client.auth_ref
+
+
+def get_auth_ref(**kwargs):
+    """
+    Description - Return a Keystone v2 token and service catalog for the
+                  supplied credentials, authenticating only when neither
+                  the in process nor the on disk cache hold a token that
+                  is still valid for STALE_SECONDS
+
+                  The disk cache lives in --token-cache-dir, set it to an
+                  empty string to keep tokens in memory only
+    """
+    key = cache_key(**kwargs)
+    cache_dir = kwargs.get('token_cache_dir', DEFAULT_CACHE_DIR)
+    region = kwargs.get('os_region')
+
+    with _lock:
+        auth_ref = _auth_refs.get(key)
+        if auth_ref is None and cache_dir:
+            auth_ref = _load(key, cache_dir, region)
+
+        if auth_ref is None or auth_ref.will_expire_soon(STALE_SECONDS):
+            auth_ref = _authenticate(**kwargs)
+            if cache_dir:
+                _save(key, cache_dir, auth_ref)
+
+        _auth_refs[key] = auth_ref
+        return auth_ref
+
+
+def invalidate(**kwargs):
+    """
+    Description - Forget the cached token for the supplied credentials
+    """
+    key = cache_key(**kwargs)
+    cache_dir = kwargs.get('token_cache_dir', DEFAULT_CACHE_DIR)
+
+    with _lock:
+        _auth_refs.pop(key, None)
+        if cache_dir:
+            try:
+                os.remove(_cache_path(key, cache_dir))
+            except OSError:
+                pass
+
+
+def endpoint(auth_ref, service_type, region=None):
+    """
+    Description - Look up the public endpoint of service_type in the
+                  cached service catalog
+    """
+    if region is None:
+        return auth_ref.service_catalog.url_for(service_type=service_type,
+                                                endpoint_type='publicURL')
+    return auth_ref.service_catalog.url_for(service_type=service_type,
+                                            endpoint_type='publicURL',
+                                            attr='region',
+                                            filter_value=region)
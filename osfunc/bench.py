@@ -0,0 +1,141 @@
+import time
+
+import monitoring
+import runner
+
+from fakecloud import FakeCloud
+from sys import exit
+
+# Services run by default against FakeCloud
+BENCH_SERVICES = ['keystone', 'nova', 'neutron', 'cinder', 'swift', 'trove',
+                  'designate', 'libra']
+
+
+class BenchCheck:
+    """
+    Description - Run the workflows of --bench-services against an in
+                  process FakeCloud and report, for every step, the time
+                  the step took, the time the fake endpoints spent serving
+                  it and the difference - the overhead of osfunc and the
+                  client libraries.  The latency of every call and the
+                  duration of every state transition are set with
+                  --bench-latency and --bench-transition
+
+        osfunc --os-service bench --bench-services nova,swift \
+            --bench-latency 0.02 --bench-iterations 5
+
+                  Sleeps inside a step count as overhead, the fixed sleeps
+                  between steps only show in the total run time
+    """
+
+    def __init__(self, logger, exec_time, **kwargs):
+        self.logger = logger
+        self.exec_time = exec_time
+        self.kwargs = kwargs
+        self.services = [name.strip() for name in
+                         (kwargs.get('bench_services') or
+                          ','.join(BENCH_SERVICES)).split(',')
+                         if name.strip()]
+        self.latency = float(kwargs.get('bench_latency') or 0)
+        self.transition = float(kwargs.get('bench_transition') or 0)
+        self.iterations = int(kwargs.get('bench_iterations') or 1)
+
+        self.service = 'Benchmark'
+        self.zone = None
+        self.region = None
+        self.tenant_name = None
+        self.failure = None
+        self.overall_success = True
+
+        self.steps = {}
+        self.totals = {}
+
+    def _observe(self, cloud):
+        """
+        Description - Observer attributing the time served by cloud since
+                      the previous step to the step that just finished,
+                      rates and other gauges are not steps
+        """
+        last = [cloud.stats()[1]]
+
+        def observer(check, run, st, en):
+            payload = run['payload']
+            if payload['kind'] != monitoring.TIMER:
+                return
+            served = cloud.stats()[1]
+            key = (check.service, payload['name'])
+            step = self.steps.setdefault(key, {'calls': 0, 'failures': 0,
+                                               'total': 0.0, 'server': 0.0})
+            step['calls'] += 1
+            step['failures'] += 0 if payload['success'] else 1
+            step['total'] += en - st
+            step['server'] += served - last[0]
+            last[0] = served
+
+        return observer
+
+    def run_service(self, cloud, name):
+        import shell
+
+        kwargs = dict(self.kwargs)
+        kwargs.update(cloud.credentials())
+        st = time.time()
+        try:
+            check = shell.load_check(name)(logger=self.logger,
+                                           exec_time=self.exec_time,
+                                           **kwargs)
+            status = runner.run_check(check)
+        except (Exception, SystemExit) as e:
+            self.logger.error('<*>%s setup Failed %s', name, e)
+            status = 1
+        total = self.totals.setdefault(name, {'runs': 0, 'failures': 0,
+                                              'elapsed': 0.0})
+        total['runs'] += 1
+        total['failures'] += 0 if status == 0 else 1
+        total['elapsed'] += time.time() - st
+        return status
+
+    def report(self, cloud):
+        requests, served = cloud.stats()
+        lines = ['{0:<14} {1:<28} {2:>5} {3:>5} {4:>10} {5:>10} {6:>10}'
+                 .format('service', 'step', 'calls', 'fail', 'step ms',
+                         'server ms', 'overhead')]
+        for (service, name), step in sorted(self.steps.items()):
+            calls = step['calls']
+            lines.append('{0:<14} {1:<28} {2:>5} {3:>5} {4:>10.1f} '
+                         '{5:>10.1f} {6:>10.1f}'.format(
+                             service, name, calls, step['failures'],
+                             step['total'] * 1000 / calls,
+                             step['server'] * 1000 / calls,
+                             (step['total'] - step['server']) * 1000 / calls))
+        for name in self.services:
+            total = self.totals.get(name)
+            if total is None:
+                continue
+            lines.append('<*> {0} - {1} runs - {2} failed - {3:.2f} sec per '
+                         'run'.format(name, total['runs'], total['failures'],
+                                      total['elapsed'] / total['runs']))
+        lines.append('<*> {0} requests served in {1:.2f} sec'
+                     .format(requests, served))
+        return lines
+
+    def run(self):
+        with FakeCloud(latency=self.latency,
+                       transition=self.transition) as cloud:
+            observer = self._observe(cloud)
+            monitoring.observers.append(observer)
+            try:
+                for iteration in range(self.iterations):
+                    for name in self.services:
+                        if self.run_service(cloud, name) != 0:
+                            self.overall_success = False
+            finally:
+                monitoring.observers.remove(observer)
+
+            for line in self.report(cloud):
+                self.logger.warning(line)
+
+        if self.overall_success is True:
+            exit(0)
+        else:
+            exit(1)
@@ -0,0 +1,339 @@
+import time
+
+from cinderclient import exceptions as cinder_exceptions
+from novaclient import exceptions as nova_exceptions
+from novaclient import utils as nova_utils
+
+import clients
+import images
+import keypairs
+import monitoring
+import networks
+import servers
+import stats
+import waiters
+import workers
+
+from nova import NovaCheck
+from timeline import Timeline
+from sys import exit
+
+# Fault of an instance the scheduler found no host for
+REJECTED = 'No valid host'
+
+# Longest time to wait for the boot volumes to become available
+VOLUME_TIMEOUT = 285
+
+
+class BootStormCheck(NovaCheck):
+    """
+    Boot storm for Nova - boot --boot-storm-count instances at once and time
+    each of them to ACTIVE
+
+    Select the image (--boot-storm-image, or as the nova check does), the
+    keypair and the network
+    With --boot-storm-volume-size create a bootable volume of that many GB
+    from the image for every instance, waiting for all of them together
+    Boot the instances of --boot-storm-flavor, --boot-storm-concurrency
+    create requests at a time
+    Wait for every instance to be ACTIVE or ERROR with one listing of the
+    servers per poll
+    Delete the instances, and their volumes, and wait for them to be gone
+
+    Record boot_active_p50/_p95/_p99, seconds from the create request to the
+    poll that saw the instance ACTIVE - polls are at most 2 seconds apart,
+    boot_task_<task_state>_p50/_p95/_p99, seconds the instances spent in each
+    task_state (scheduling, networking, spawning ...) - their transitions are
+    stored in server_timeline, boot_error_rate, the share of instances that
+    could not be created, went to ERROR or were not ACTIVE in time,
+    boot_rejections, the number the scheduler found no valid host for, and
+    boot_storm, the seconds from the first request to the report.  Everything
+    created is deleted even when a stage fails
+
+    """
+
+    def __init__(self, logger, exec_time, **kwargs):
+        NovaCheck.__init__(self, logger, exec_time, **kwargs)
+
+        # The create and delete requests run on several threads, each needs
+        # its own client
+        self.nova_client = clients.PerThread(clients.nova, **kwargs)
+        self.cinder_client = clients.PerThread(clients.cinder, **kwargs)
+
+        self.service = 'Compute Boot Storm'
+        self.count = int(kwargs.get('boot_storm_count') or 10)
+        self.concurrency = int(kwargs.get('boot_storm_concurrency') or
+                               self.count)
+        self.flavor = str(kwargs.get('boot_storm_flavor') or 101)
+        self.image_ref = kwargs.get('boot_storm_image')
+        self.volume_size = int(kwargs.get('boot_storm_volume_size') or 0)
+        self.name = 'novacheck-storm-{0}'.format(int(time.time()))
+
+        self.boot_volumes = {}
+        self.bootable = set()
+        self.requested = {}
+        self.timelines = {}
+        self.settled = {}
+
+    @monitoring.timeit
+    def select_image(self):
+        """
+        Description - Boot the image named or identified by
+                      --boot-storm-image
+        """
+        try:
+            self.success = True
+            self.image = nova_utils.find_resource(self.nova_client.images,
+                                                  self.image_ref)
+            self.logger.warning('Selected image %s', self.image.id)
+        except Exception as e:
+            self.success, self.overall_success = False, False
+            self.failure = e
+            self.logger.error("<*>select_image Failed %s", e)
+
+    def _create_volume(self, index):
+        volume = self.cinder_client.volumes.create(
+            self.volume_size,
+            display_name='cindercheck-storm-{0}'.format(index),
+            imageRef=self.image.id,
+            availability_zone=self.zone)
+        self.boot_volumes[index] = volume.id
+        return volume.id
+
+    @monitoring.timeit
+    def create_volumes(self):
+        """
+        Description - Create the boot volume of every instance and wait for
+                      them with one listing per poll.  An instance whose
+                      volume is not available is not booted, every volume
+                      created is still deleted by delete_instances
+        """
+        self.success = True
+        for index, volume_id, error in workers.run_concurrently(
+                self._create_volume, range(self.count), self.concurrency):
+            if error is not None:
+                self.logger.error('<*>create_volumes Failed %s', error)
+                self.success, self.failure = False, error
+
+        pending = set(self.boot_volumes.values())
+
+        def probe():
+            for volume in self.cinder_client.volumes.list(detailed=True):
+                if volume.id in pending and \
+                        volume.status in ('available', 'error'):
+                    pending.discard(volume.id)
+                    if volume.status == 'available':
+                        self.bootable.add(volume.id)
+            return pending
+
+        try:
+            waiters.wait_for(probe, lambda pending: not pending,
+                             timeout=VOLUME_TIMEOUT)
+        except waiters.WaitTimeout:
+            pass
+        except Exception as e:
+            self.logger.error('<*>create_volumes Failed %s', e)
+            self.success, self.failure = False, e
+
+        if len(self.bootable) < self.count:
+            self.logger.error('<*>create_volumes %s of %s volumes available',
+                              len(self.bootable), self.count)
+            self.success = False
+            self.failure = self.failure or 'Volumes not available'
+
+    def _boot(self, index):
+        kwargs = {}
+        image = self.image
+        if self.volume_size:
+            if self.boot_volumes.get(index) not in self.bootable:
+                raise Exception('No boot volume')
+            # <id>:<type>:<size>:<delete on terminate>
+            kwargs['block_device_mapping'] = {
+                'vda': '{0}:::1'.format(self.boot_volumes[index])}
+            image = None
+
+        st = time.time()
+        instance = self.nova_client.servers.create(
+            name='{0}-{1}'.format(self.name, index),
+            image=image,
+            flavor=self.flavor,
+            nics=[{'net-id': self.network['id']}],
+            key_name=self.key_pair.name,
+            availability_zone=self.zone,
+            **kwargs)
+        return instance.id, st
+
+    @monitoring.timeit
+    def boot(self):
+        """
+        Description - Send the create requests, self.concurrency at a time
+        """
+        self.success = True
+        for index, result, error in workers.run_concurrently(
+                self._boot, range(self.count), self.concurrency):
+            if error is None:
+                instance_id, st = result
+                self.requested[instance_id] = st
+            else:
+                self.success, self.failure = False, error
+                self.logger.error('<*>boot Failed %s', error)
+        self.logger.warning('Requested %s instances', len(self.requested))
+
+    @monitoring.timeit
+    def wait_active(self):
+        """
+        Description - Wait for every instance to be ACTIVE or ERROR,
+                      listing the servers of the storm once per poll
+        """
+        pending = set(self.requested)
+        self.timelines = dict(
+            (instance_id, Timeline(self, 'wait_active', instance_id, st))
+            for instance_id, st in self.requested.items())
+
+        def probe():
+            listed = self.nova_client.servers.list(
+                search_opts={'name': self.name})
+            observed_at = time.time()
+            for instance in listed:
+                if instance.id in pending:
+                    self.timelines[instance.id].observe(instance, observed_at)
+                if instance.id in pending and \
+                        instance.status in ('ACTIVE', 'ERROR'):
+                    pending.discard(instance.id)
+                    fault = getattr(instance, 'fault', None) or {}
+                    self.settled[instance.id] = (
+                        instance.status, observed_at,
+                        fault.get('message', ''))
+            self.logger.warning('%s of %s instances settled',
+                                len(self.settled), len(self.requested))
+            return pending
+
+        try:
+            self.success = True
+            waiters.wait_for(probe, lambda pending: not pending,
+                             timeout=servers.SERVER_TIMEOUT, max_interval=2)
+        except waiters.WaitTimeout:
+            self.success, self.overall_success = False, False
+            self.failure = 'TimeOut'
+            self.logger.error('<*>wait_active %s instances timed out',
+                              len(pending))
+        except Exception as e:
+            self.success, self.overall_success = False, False
+            self.failure = e
+            self.logger.error('<*>wait_active Failed %s', e)
+        finally:
+            for timeline in self.timelines.values():
+                timeline.close()
+
+    def report(self):
+        active = [observed_at - self.requested[instance_id]
+                  for instance_id, (status, observed_at, fault)
+                  in self.settled.items() if status == 'ACTIVE']
+        rejections = len([fault for status, observed_at, fault
+                          in self.settled.values()
+                          if status == 'ERROR' and REJECTED in fault])
+        errors = self.count - len(active)
+        error_rate = errors / float(self.count)
+
+        self.success = not errors
+        self.failure = None if not errors else \
+            '{0} of {1} instances not ACTIVE'.format(errors, self.count)
+        if errors:
+            self.overall_success = False
+
+        pcts = dict((pct, stats.percentile(active, pct))
+                    for pct in [50, 95, 99])
+        self.logger.warning(
+            '<*> boot_storm - {0} instances - {1} ACTIVE - {2:.1%} errors - '
+            '{3} rejected - p50 {4:.2f} p99 {5:.2f} sec'.format(
+                self.count, len(active), error_rate, rejections,
+                pcts[50] or 0.0, pcts[99] or 0.0))
+
+        for pct in [50, 95, 99]:
+            if pcts[pct] is not None:
+                monitoring.record(self, 'boot_active_p{0}'.format(pct),
+                                  pcts[pct])
+        phases = {}
+        for timeline in self.timelines.values():
+            for task_state, st, en in timeline.phases():
+                phases.setdefault(task_state, []).append(en - st)
+        for task_state, seconds in sorted(phases.items()):
+            for pct in [50, 95, 99]:
+                monitoring.record(self, 'boot_task_{0}_p{1}'.format(
+                    task_state, pct), stats.percentile(seconds, pct))
+        monitoring.record(self, 'boot_error_rate', error_rate)
+        monitoring.record(self, 'boot_rejections', rejections)
+        self.failure = None
+
+    def _delete_instance(self, instance_id):
+        try:
+            self.nova_client.servers.delete(instance_id)
+        except nova_exceptions.NotFound:
+            pass
+
+    def _delete_volume(self, volume_id):
+        try:
+            self.cinder_client.volumes.delete(volume_id)
+        except cinder_exceptions.NotFound:
+            pass
+
+    @monitoring.timeit
+    def delete_instances(self):
+        """
+        Description - Delete every instance of the storm and wait for them
+                      to be gone, then any boot volume they did not take
+                      with them
+        """
+        self.success = True
+        for instance_id, result, error in workers.run_concurrently(
+                self._delete_instance, list(self.requested),
+                self.concurrency):
+            if error is not None:
+                self.success, self.failure = False, error
+                self.logger.error('<*>delete_instances Failed %s %s',
+                                  instance_id, error)
+
+        try:
+            waiters.wait_for(
+                lambda: [instance for instance in
+                         self.nova_client.servers.list(
+                             search_opts={'name': self.name})
+                         if instance.id in self.requested],
+                lambda remaining: not remaining,
+                timeout=servers.SERVER_TIMEOUT)
+        except Exception as e:
+            self.success, self.failure = False, e
+            self.logger.error('<*>delete_instances Failed %s', e)
+
+        for volume_id, result, error in workers.run_concurrently(
+                self._delete_volume, self.boot_volumes.values(),
+                self.concurrency):
+            if error is not None:
+                self.logger.warning('Did not delete volume %s %s',
+                                    volume_id, error)
+
+    def run(self):
+        if self.image_ref:
+            self.select_image()
+        else:
+            images.select_image(self)
+        keypairs.select_keypair(self)
+        networks.select_network(self)
+
+        if self.overall_success is True:
+            st = time.time()
+            try:
+                if self.volume_size:
+                    self.create_volumes()
+                self.boot()
+                self.wait_active()
+                self.report()
+                monitoring.record(self, 'boot_storm', time.time() - st,
+                                  st=st, kind=monitoring.TIMER)
+            finally:
+                self.delete_instances()
+
+        if self.overall_success is True:
+            exit(0)
+        else:
+            exit(1)
@@ -1,5 +1,3 @@
-from keystoneclient.v2_0 import client as keystone_client
-from swiftclient import Connection
 from swiftclient import exceptions as cdn_exceptions
 import sys
 
@@ -8,6 +6,7 @@ import json
 
 from time import sleep
 import time
+import clients
 import monitoring
 
 
@@ -61,11 +60,7 @@ class CdnCheck:
     """
 
     def __init__(self, logger, exec_time, **kwargs):
-        self.keystone_client = keystone_client.Client(
-            username=kwargs['os_username'],
-            password=kwargs['os_password'],
-            tenant_name=kwargs['os_tenant_name'],
-            auth_url=kwargs['os_auth_url'])
+        self.keystone_client = clients.keystone(**kwargs)
         self.token = self.keystone_client.auth_ref['token']['id']
         self.tenant_id = self.keystone_client.auth_ref['token']['tenant']['id']
         self.end_points = self.keystone_client.service_catalog.get_endpoints()
@@ -81,22 +76,9 @@ class CdnCheck:
             self.region2: self.url2
         }
 
-        self.cdn_client = Connection(
-            user=kwargs['os_username'],
-            key=kwargs['os_password'],
-            tenant_name=kwargs['os_tenant_name'],
-            authurl=kwargs['os_auth_url'],
-            auth_version="2.0",
-            os_options={'region_name': kwargs['os_region'],
-                        'service_type': 'hpext:cdn'})
-
-        self.swift_client = Connection(
-            user=kwargs['os_username'],
-            key=kwargs['os_password'],
-            tenant_name=kwargs['os_tenant_name'],
-            authurl=kwargs['os_auth_url'],
-            auth_version="2.0",
-            os_options={'region_name': kwargs['os_region']})
+        self.cdn_client = clients.cdn(**kwargs)
+
+        self.swift_client = clients.swift(**kwargs)
 
         self.service = 'cdn'
         self.authurl = kwargs['os_auth_url']
@@ -3,10 +3,9 @@ import servers
 import keypairs
 import networks
 import volumes
+import clients
+import discovery
 
-from neutronclient.v2_0 import client as neutron_client
-from cinderclient.v1 import client as cinder_client
-from novaclient.v1_1 import client as nova_client
 from time import sleep
 
 
@@ -56,30 +55,11 @@ class CinderCheck:
     """
 
     def __init__(self, logger, exec_time, **kwargs):
-        self.cinder_client = cinder_client.Client(
-            kwargs['os_username'],
-            kwargs['os_password'],
-            kwargs['os_tenant_name'],
-            kwargs['os_auth_url'],
-            region_name=kwargs['os_region'],
-            service_type="volume"
-        )
-
-        self.nova_client = nova_client.Client(
-            kwargs['os_username'],
-            kwargs['os_password'],
-            kwargs['os_tenant_name'],
-            kwargs['os_auth_url'],
-            region_name=kwargs['os_region']
-        )
-
-        self.neutron_client = neutron_client.Client(
-            username=kwargs['os_username'],
-            password=kwargs['os_password'],
-            tenant_name=kwargs['os_tenant_name'],
-            auth_url=kwargs['os_auth_url'],
-            region_name=kwargs['os_region']
-        )
+        self.cinder_client = clients.cinder(**kwargs)
+
+        self.nova_client = clients.nova(**kwargs)
+
+        self.neutron_client = clients.neutron(**kwargs)
 
         self.logger = logger
         self.exec_time = exec_time
@@ -91,6 +71,7 @@ class CinderCheck:
         self.service = 'Block Storage'
         self.failure = None
         self.tenant_name = kwargs['os_tenant_name']
+        self.discovery = discovery.Cache(**kwargs)
 
     def run(self):
         volumes.list_volumes(self)
@@ -1,17 +1,16 @@
+import copy
+import math
+import clients
+import lbaas
 import monitoring
-import subprocess
+import servers
+import swift_purge
+import volumes
+import workers
 
-from subprocess import PIPE
-
-from neutronclient.v2_0 import client as neutron_client
-from novaclient.v1_1 import client as nova_client
-from cinderclient.v1 import client as cinder_client
 from cinderclient import exceptions as cinder_exceptions
-from designateclient.v1 import Client as Designate
 from novaclient import exceptions as nova_exceptions
-from troveclient.v1 import client as trove_client
-from keystoneclient.v2_0 import client as keystone_client
-from swiftclient import Connection, RequestException
+from swiftclient import RequestException
 
 from keystoneclient.openstack.common.apiclient.exceptions import EndpointNotFound
 
@@ -19,7 +18,12 @@ from keystoneclient.openstack.common.apiclient.exceptions import EndpointNotFoun
 class CleanupCheck:
     """
         Description - Purge left over elements created by each service.
-                      All routines are run during an execution.
+                      All routines are run during an execution.  Routines
+                      run concurrently once the routines listed in STAGES
+                      before them have finished, each on a copy of the
+                      check, and issue their deletes concurrently.  The
+                      --cleanup-concurrency deletes in flight are shared
+                      out between the routines running at once
         Basic workflow
 
             delete_cdn_containers
@@ -38,73 +42,57 @@ class CleanupCheck:
             delete_swift_containers
             delete_db
     """
+
+    # Stage -> stages that must finish before it starts.  Floating IPs and
+    # instances hold ports, ports must go before routers and subnets, those
+    # before their networks, and volumes once their snapshots are deleted
+    # and their instances are gone
+    STAGES = {
+        'delete_keypair': [],
+        'delete_floating': [],
+        'delete_instance': [],
+        'delete_snapshots': [],
+        'delete_volume': ['delete_snapshots', 'delete_instance'],
+        'delete_port': ['delete_floating', 'delete_instance'],
+        'delete_router': ['delete_port'],
+        'delete_subnet': ['delete_router'],
+        'delete_network': ['delete_subnet'],
+        'delete_db': [],
+        'delete_lb': [],
+        'delete_cdn_containers': [],
+        'delete_swift_containers': [],
+        'delete_domains': [],
+    }
+
     def __init__(self, logger, exec_time, **kwargs):
-        self.neutron_client = neutron_client.Client(
-            username=kwargs['os_username'],
-            password=kwargs['os_password'],
-            tenant_name=kwargs['os_tenant_name'],
-            auth_url=kwargs['os_auth_url'],
-            region_name=kwargs['os_region']
-        )
-        self.nova_client = nova_client.Client(
-            kwargs['os_username'],
-            kwargs['os_password'],
-            kwargs['os_tenant_name'],
-            kwargs['os_auth_url'],
-            region_name=kwargs['os_region']
-        )
-        self.cinder_client = cinder_client.Client(
-            kwargs['os_username'],
-            kwargs['os_password'],
-            kwargs['os_tenant_name'],
-            kwargs['os_auth_url'],
-            region_name=kwargs['os_region'],
-            service_type="volume"
-        )
-        self.trove_client = trove_client.Client(
-            kwargs['os_username'],
-            kwargs['os_password'],
-            kwargs['os_tenant_name'],
-            kwargs['os_auth_url'],
-            region_name=kwargs['os_region'],
-        )
-        self.keystone_client = keystone_client.Client(
-            username=kwargs['os_username'],
-            password=kwargs['os_password'],
-            tenant_name=kwargs['os_tenant_name'],
-            auth_url=kwargs['os_auth_url']
-        )
+        self.concurrency = int(kwargs.get('cleanup_concurrency') or 8)
+        self.http_timeout = clients.http_timeout(**kwargs)
+        self.stage_concurrency = self.concurrency
+
+        # Stages and the deletes inside them run on several threads, every
+        # thread gets its own clients
+        self.neutron_client = clients.PerThread(clients.neutron, **kwargs)
+        self.nova_client = clients.PerThread(clients.nova, **kwargs)
+        self.cinder_client = clients.PerThread(clients.cinder, **kwargs)
+        self.trove_client = clients.PerThread(clients.trove, **kwargs)
+        self.keystone_client = clients.keystone(**kwargs)
 
         try:
-            self.designate_client = Designate(
-                auth_url=kwargs['os_auth_url'],
-                username=kwargs['os_username'],
-                password=kwargs['os_password'],
-                tenant_name=kwargs['os_tenant_name'],
-                region_name=kwargs['os_region'],
-                service_type='hpext:dns'
-            )
+            self.designate_client = clients.designate(**kwargs)
         except EndpointNotFound:
             self.designate_client = None
 
-        self.cdn_client = Connection(
-            user=kwargs['os_username'],
-            key=kwargs['os_password'],
-            tenant_name=kwargs['os_tenant_name'],
-            authurl=kwargs['os_auth_url'],
-            auth_version="2.0",
-            os_options={'region_name': kwargs['os_region'],
-                        'service_type': 'hpext:cdn'}
-        )
-
-        self.swift_client = Connection(
-            user=kwargs['os_username'],
-            key=kwargs['os_password'],
-            tenant_name=kwargs['os_tenant_name'],
-            authurl=kwargs['os_auth_url'],
-            auth_version="2.0",
-            os_options={'region_name': kwargs['os_region']}
-        )
+        try:
+            # Shared by the concurrent deletes of delete_lb
+            self.libra_client = clients.libra(**dict(
+                kwargs, http_pool_size=max(
+                    self.concurrency, int(kwargs.get('http_pool_size') or 0))))
+        except EndpointNotFound:
+            self.libra_client = None
+
+        self.cdn_client = clients.PerThread(clients.cdn, **kwargs)
+
+        self.swift_client = clients.PerThread(clients.swift, **kwargs)
 
         self.region = kwargs['os_region']
         self.zone = kwargs['os_zone']
@@ -118,16 +106,49 @@ class CleanupCheck:
         self.failure = None
         self.tenant_name = kwargs['os_tenant_name']
 
+    def _run_stage(self, name):
+        """
+        Description - Run the routine name on a shallow copy of the check so
+                      the success, failure and resources it sets are its
+                      own, with its share of the deletes in flight
+
+                      Returns the overall_success of the copy, routines
+                      leave it True on the failures cleanup tolerates
+        """
+        stage = copy.copy(self)
+        stage.concurrency = self.stage_concurrency
+        stage.overall_success = True
+        getattr(stage, name)()
+        return stage.overall_success
+
+    def _delete_concurrently(self, delete, resources, describe):
+        """
+        Description - Call delete on every resource with at most
+                      self.concurrency deletes in flight and log the ones
+                      that failed.  Returns the resources deleted
+        """
+        deleted = []
+        for resource, result, error in workers.run_concurrently(
+                delete, resources, self.concurrency):
+            if error is None:
+                deleted.append(resource)
+            else:
+                self.logger.warning("Did not delete %s %s",
+                                    describe(resource), error)
+        return deleted
+
     @monitoring.timeit
     def delete_keypair(self):
         """
         Description - Delete all keypairs where OSfunctest is part of the name
         """
         try:
-            for kp in self.nova_client.keypairs.list():
-                if 'OSfuncTest' in kp.name:
-                    self.keypair = self.nova_client.keypairs.delete(kp.name)
-                    self.success = True
+            keypairs = [kp for kp in self.nova_client.keypairs.list()
+                        if 'OSfuncTest' in kp.name]
+            self.success = True
+            self._delete_concurrently(
+                lambda kp: self.nova_client.keypairs.delete(kp.name),
+                keypairs, lambda kp: kp.name)
         except nova_exceptions.NotFound as e:
             self.success, self.overall_success = False, True
             self.failure = e
@@ -143,20 +164,21 @@ class CleanupCheck:
         Description - Delete all floating IPs where floatingip['port_id'] is
                         none and floatingip['fixed_ip_address'] is none
         """
+
+        def delete(floatingip):
+            self.neutron_client.delete_floatingip(floatingip['id'])
+            self.logger.warning('Delete ' + floatingip['id'])
+
         try:
-            floatingips = self.neutron_client.list_floatingips()['floatingips']
+            floatingips = [
+                floatingip for floatingip in
+                self.neutron_client.list_floatingips()['floatingips']
+                if floatingip['port_id'] is None and
+                floatingip['fixed_ip_address'] is None]
             self.success = True
             self.logger.warning('Delete Floating IP:')
-            for floatingip in floatingips:
-                if floatingip['port_id'] is None:
-                    if floatingip['fixed_ip_address'] is None:
-                        try:
-                            floating_ips = self.neutron_client.delete_floatingip(
-                                floatingip['id'])
-                            self.logger.warning(
-                                'Delete ' + floatingip['id'])
-                        except Exception as e:
-                            self.logger.warning('Did not delete floating IP')
+            self._delete_concurrently(delete, floatingips,
+                                      lambda floatingip: floatingip['id'])
         except Exception as e:
             self.logger.error("<*>delete_floating Failed %s", e)
             self.success, self.overall_success = False, False
@@ -168,21 +190,21 @@ class CleanupCheck:
         Description - Delete all networks where network['name'] is new_network
                         or contains 'neutroncheck'
         """
+
+        def delete(network):
+            self.neutron_client.delete_network(network['id'])
+            self.logger.warning(
+                'Delete ' + network['id'] + " " + network['name'])
+
         try:
-            networks = self.neutron_client.list_networks()['networks']
+            networks = [network for network in
+                        self.neutron_client.list_networks()['networks']
+                        if network['name'] == 'new_network' or
+                        'neutroncheck' in network['name']]
             self.success = True
             self.logger.warning('Deleting Networks:')
-            for network in networks:
-                try:
-                    if network['name'] == 'new_network' or \
-                            'neutroncheck' in network['name']:
-                        self.neutron_client.delete_network(network['id'])
-                        self.logger.warning(
-                            'Delete ' + network['id'] + " " + network['name'])
-                    else:
-                        self.logger.warning("Did not delete %s", network['id'])
-                except Exception as e:
-                    self.logger.warning("Did not delete %s", network['id'])
+            self._delete_concurrently(delete, networks,
+                                      lambda network: network['id'])
         except Exception as e:
             self.logger.error("<*>delete_network Failed %s", e)
             self.success, self.overall_success = False, False
@@ -192,22 +214,21 @@ class CleanupCheck:
     def delete_port(self):
         """
         Description - Delete all ports where port['name'] contains
-                        'neutroncheck'
+                        'neutroncheck' or 'new_port'
         """
+
+        def delete(port):
+            self.neutron_client.delete_port(port['id'])
+            self.logger.warning(
+                'Deleting ' + port['id'] + " " + port['name'])
+
         try:
-            ports = self.neutron_client.list_ports()['ports']
+            ports = [port for port in self.neutron_client.list_ports()['ports']
+                     if 'neutroncheck' in port['name'] or
+                     'new_port' in port['name']]
             self.logger.warning('Deleting Ports:')
             self.success = True
-            for port in ports:
-                try:
-                    if 'neutroncheck' or 'new_port' in port['name']:
-                        self.neutron_client.delete_port(port['id'])
-                        self.logger.warning(
-                            'Deleting ' + port['id'] + " " + port['name'])
-                    else:
-                        self.logger.warning("Did not delete " + port['id'])
-                except:
-                    self.logger.warning("Did not delete %s", port['id'])
+            self._delete_concurrently(delete, ports, lambda port: port['id'])
         except Exception as e:
             self.logger.error("<*>delete_port Failed %s", e)
             self.success, self.overall_success = False, False
@@ -219,20 +240,20 @@ class CleanupCheck:
         Description - Delete all routers where router['name'] contains
                         'neutroncheck'
         """
+
+        def delete(router):
+            self.neutron_client.delete_router(router['id'])
+            self.logger.warning(
+                'Deleting ' + router['id'] + " " + router['name'])
+
         try:
-            routers = self.neutron_client.list_routers()['routers']
+            routers = [router for router in
+                       self.neutron_client.list_routers()['routers']
+                       if 'neutroncheck' in router['name']]
             self.success = True
             self.logger.warning('Deleting Routers:')
-            for router in routers:
-                try:
-                    if 'neutroncheck' in router['name']:
-                        self.neutron_client.delete_router(router['id'])
-                        self.logger.warning(
-                            'Deleting ' + router['id'] + " " + router['name'])
-                    else:
-                        self.logger.warning("Did not delete %s", router['id'])
-                except:
-                    self.logger.warning("Did not delete %s", router['id'])
+            self._delete_concurrently(delete, routers,
+                                      lambda router: router['id'])
         except Exception as e:
             self.logger.error("<*>delete_router Failed %s", e)
             self.success, self.overall_success = False, False
@@ -244,20 +265,20 @@ class CleanupCheck:
         Description - Delete all subnets where subnet['name'] contains
                         'neutroncheck'
         """
+
+        def delete(subnet):
+            self.neutron_client.delete_subnet(subnet['id'])
+            self.logger.warning(
+                'Delete ' + subnet['id'] + " " + subnet['name'])
+
         try:
-            subnets = self.neutron_client.list_subnets()['subnets']
+            subnets = [subnet for subnet in
+                       self.neutron_client.list_subnets()['subnets']
+                       if 'neutroncheck' in subnet['name']]
             self.success = True
             self.logger.warning('Deleting Subnets:')
-            for subnet in subnets:
-                try:
-                    if 'neutroncheck' in subnet['name']:
-                        self.neutron_client.delete_subnet(subnet['id'])
-                        self.logger.warning(
-                            'Delete ' + subnet['id'] + " " + subnet['name'])
-                    else:
-                        self.logger.warning("Did not delete %s", subnet['id'])
-                except:
-                    self.logger.warning("Did not delete %s", subnet['id'])
+            self._delete_concurrently(delete, subnets,
+                                      lambda subnet: subnet['id'])
         except Exception as e:
             self.logger.error("<*>list_subnet Failed %s", e)
             self.success, self.overall_success = False, False
@@ -269,23 +290,16 @@ class CleanupCheck:
         Description - Delete all volumes where volume.display_name contains
                         'cinder'
         """
-        volumes = self.cinder_client.volumes.list()
         try:
             self.logger.warning('Deleting Volumes:')
-            for volume in volumes:
-                self.success = True
-                if 'cinder' in volume.display_name:
-                    if self.cinder_client.volumes.get(volume.id).status\
-                            == 'available':
-                        try:
-                            volume.delete()
-                            self.logger.warning('Deleting unused volume: %s' %
-                                                volume.id)
-                        except Exception as e:
-                            self.logger.error('Unable to delete volume: {}'
-                                              .format(e))
-                    else:
-                        self.logger.warning('Did not delete ' + volume.id)
+            self.success = True
+            deleted, failed, remaining = volumes.purge(
+                self.cinder_client, 'cinder', self.logger,
+                max_workers=self.concurrency)
+            if failed or remaining:
+                self.success, self.overall_success = False, False
+                self.failure = '{0} volumes not deleted'.format(
+                    len(failed) + len(remaining))
         except cinder_exceptions.NotFound:
             self.logger.error("No Volumes found to delete")
             self.success, self.overall_success = False, True
@@ -301,16 +315,17 @@ class CleanupCheck:
         """
         Description - Delete all snapshots
         """
+
+        def delete(snapshot):
+            self.cinder_client.volume_snapshots.delete(snapshot.id)
+            self.logger.warning("Deleting snapshot %s", snapshot.id)
+
         try:
             snapshots = self.cinder_client.volume_snapshots.list()
             self.success = True
             self.logger.warning("deleting snapshots")
-            for snapshot in snapshots:
-                try:
-                    snapshot.delete()
-                    self.logger.warning("Deleting snapshot %s", snapshot.id)
-                except Exception as e:
-                    self.logger.error("Delete snapshot failed %s", e)
+            self._delete_concurrently(delete, snapshots,
+                                      lambda snapshot: snapshot.id)
         except cinder_exceptions.NotFound:
             self.logger.error("No Snapshots found")
             self.success, self.overall_success = False, True
@@ -326,19 +341,18 @@ class CleanupCheck:
         Description - Delete all instances where instance.name contains
                         'novacheck' or 'cindercheck'
         """
+
+        def delete(instance):
+            self.nova_client.servers.delete(instance.id)
+            self.logger.warning("delete %s", instance.id)
+
         try:
-            instances = self.nova_client.servers.list()
+            instances = list(servers.iter_servers(
+                self.nova_client, name='novacheck|cindercheck',
+                status='ACTIVE'))
             self.success = True
-            for instance in instances:
-                if instance.status == 'ACTIVE':
-                    if 'novacheck' in instance.name or \
-                        'cindercheck' in instance.name:
-                        instance.delete()
-                        self.logger.warning("delete %s", instance.id)
-                    else:
-                        self.logger.warning("did not delete " + instance.id)
-                else:
-                    self.logger.warning('Instance not active %s', instance.id)
+            self._delete_concurrently(delete, instances,
+                                      lambda instance: instance.id)
         except nova_exceptions.NotFound:
             self.logger.error("No Instances found")
             self.success, self.overall_success = False, True
@@ -354,28 +368,26 @@ class CleanupCheck:
         Description - Delete all databases where instance.name contains
                         'DBaas' and the instance.status is active
         """
-        try:
-            instances = self.trove_client.instances.list()
 
-            print instances
+        def delete(instance):
+            self.logger.warning("delete %s", instance.id)
+            self.trove_client.instances.delete(instance.id)
+            self.logger.warning(instance.id + ' ' + str(instance.name))
 
+        try:
+            instances = []
+            for instance in self.trove_client.instances.list():
+                if instance.status != "ACTIVE" and instance.status != 'ERROR':
+                    self.logger.warning('Not active %s', instance.name)
+                elif 'DBaaS' in instance.name:
+                    instances.append(instance)
+                else:
+                    self.logger.warning('did not delete %s', instance.name)
 
             self.logger.warning('Delete db instances')
             self.success = True
-            for instance in instances:
-                if instance.status == "ACTIVE" or instance.status == 'ERROR':
-                    if 'DBaaS' in instance.name:
-                        self.logger.warning("delete %s", instance.id)
-                        try:
-                            instance.delete()
-                            self.logger.warning(
-                                instance.id + ' ' + str(instance.name))
-                        except Exception as e:
-                            self.logger.error('could not delete %s', instance.name)
-                    else:
-                        self.logger.warning('did not delete %s', instance.name)
-                else:
-                    self.logger.warning('Not active %s', instance.name)
+            self._delete_concurrently(delete, instances,
+                                      lambda instance: instance.name)
         except Exception as e:
             self.success = False
             self.failure = e
@@ -384,38 +396,12 @@ class CleanupCheck:
     @monitoring.timeit
     def delete_lb(self):
         """
-        Description - Delete all loadbalancers where name equals TestLB
+        Description - Delete all loadbalancers where name starts with TestLB
         """
-        name = "TestLB"
         try:
             self.success = True
-            proc = subprocess.Popen(['libra',
-                                     '--insecure',
-                                     '--os-region-name',
-                                     self.region,
-                                     'list'], stdout=PIPE)
-            proc.wait()
-            outs, err = proc.communicate()
-            sum_output = ''
-            for lists in outs:
-                sum_output = sum_output + lists
-                if lists == '\n':
-                    sum_output = ''
-                if name in sum_output:
-                    sum_split = sum_output.split()
-                    proc = subprocess.Popen(['libra',
-                                             '--insecure',
-                                             '--os-region-name',
-                                             self.region,
-                                             'delete', sum_split[1]])
-                    sum_output = ''
-                    proc.wait()
-                    if proc.returncode == 0:
-                        self.logger.warning('deleting %s', sum_split[1])
-                    else:
-                        self.failure = "Return code " + str(proc.returncode)
-                        self.logger.error("did not delete lb return code %s",
-                                          proc.returncode)
+            lbaas.purge(self.libra_client, "TestLB", self.concurrency,
+                        self.logger)
         except Exception as e:
             self.success, self.overall_success = False, True
             self.failure = e
@@ -430,7 +416,8 @@ class CleanupCheck:
         try:
             self.success = True
             try:
-                self.cdn_containers = self.cdn_client.get_account()[1]
+                self.cdn_containers = self.cdn_client.get_account(
+                    full_listing=True)[1]
             except Exception as e:
                 self.logger.error('Unable to fetch account {}'.format(e))
 
@@ -443,8 +430,8 @@ class CleanupCheck:
 
             self.cdn_container_names = []
             for i in self.cdn_containers:
-                if str(i['name']).startswith('cdncheck'):
-                    self.cdn_container_names.append(str(i['name']))
+                if i['name'].startswith('cdncheck'):
+                    self.cdn_container_names.append(i['name'])
 
             if len(self.cdn_container_names) == 0:
                 self.logger.warning(
@@ -452,47 +439,18 @@ class CleanupCheck:
                 return
 
             for self.container_name in self.cdn_container_names:
-
-                try:
-                    self.objects = self.swift_client.get_container(
-                        self.container_name)[1]
-                except Exception:
-                    self.logger.warning(
-                        "Couldn't retrieve objects for %s", self.container_name)
-                    self.logger.warning("Deleting the container directly")
-                    self.cdn_client.delete_container(self.container_name)
-                    continue
-
-                if len(self.objects) == 0:
-                    self.logger.warning(
-                        'No objects found for %s', self.container_name)
-                    self.logger.warning(
-                        'Deleting CDN container %s', self.container_name)
-                    try:
-                        self.swift_client.delete_container(self.container_name)
-                        self.cdn_client.delete_container(self.container_name)
-                    except:
-                        self.logger.warning(
-                            "Couldn't delete the container %s. Skipping...",
-                            self.container_name)
-                    continue
-
-                self.object_names = []
-                for i in self.swift_client.get_container(self.container_name)[1]:
-                    self.object_names.append(str(i['name']))
-
-                self.logger.warning(
-                    'Deleting objects for %s', self.container_name)
-
-                for i in self.object_names:
-                    self.logger.warning('    Deleting object %s', i)
-                    self.swift_client.delete_object(self.container_name, i)
-
                 self.logger.warning(
                     'Deleting CDN container %s', self.container_name)
-
                 try:
-                    self.swift_client.delete_container(self.container_name)
+                    swift_purge.purge_container(
+                        self.swift_client, self.container_name,
+                        self.concurrency, self.logger,
+                        timeout=self.http_timeout)
+                except Exception as e:
+                    self.logger.warning(
+                        "Couldn't purge the container %s %s",
+                        self.container_name, e)
+                try:
                     self.cdn_client.delete_container(self.container_name)
                 except:
                     self.logger.warning(
@@ -512,7 +470,8 @@ class CleanupCheck:
         """
         try:
             self.success = True
-            self.swift_containers = self.swift_client.get_account()[1]
+            self.swift_containers = self.swift_client.get_account(
+                full_listing=True)[1]
             if len(self.swift_containers) == 0:
                 self.logger.warning('No Swift containers to delete')
                 return
@@ -520,34 +479,15 @@ class CleanupCheck:
             self.swift_container_names = []
             for i in self.swift_containers:
                 if i['name'].startswith('swiftcheck'):
-                    self.swift_container_names.append(str(i['name']))
+                    self.swift_container_names.append(i['name'])
 
             for self.container_name in self.swift_container_names:
-                self.logger.warning('Container: %s', self.container_name)
-                self.objects = self.swift_client.get_container(
-                    self.container_name)[1]
-                if len(self.objects) == 0:
-                    self.logger.warning(
-                        'No objects found for %s', self.container_name)
-                    self.logger.warning(
-                        'Deleting container: %s', self.container_name)
-                    self.swift_client.delete_container(self.container_name)
-                    continue
-
-                self.object_names = []
-                for i in self.swift_client.get_container(self.container_name)[1]:
-                    self.object_names.append(str(i['name']))
-
-                self.logger.warning(
-                    'Deleting objects for %s', self.container_name)
-
-                for i in self.object_names:
-                    self.logger.warning('   Deleting %s', i)
-                    self.swift_client.delete_object(self.container_name, i)
-
                 self.logger.warning(
                     'Deleting container: %s', self.container_name)
-                self.swift_client.delete_container(self.container_name)
+                swift_purge.purge_container(
+                    self.swift_client, self.container_name,
+                    self.concurrency, self.logger,
+                    timeout=self.http_timeout)
 
         except Exception as e:
             self.success, self.overall_success = False, False
@@ -572,22 +512,24 @@ class CleanupCheck:
             self.logger.error('<*>Domain Deletion Failed: {}'.format(e))
 
     def run(self):
-        self.delete_keypair()
-        self.delete_floating()
-        self.delete_port()
-        self.delete_router()
-        self.delete_subnet()
-        self.delete_network()
-        self.delete_snapshots()
-        self.delete_volume()
-        self.delete_instance()
-        self.delete_db()
-        self.delete_lb()
-        self.delete_cdn_containers()
-        self.delete_swift_containers()
-
-        if self.designate_client is not None:
-            self.delete_domains()
+        stages = dict(self.STAGES)
+        if self.designate_client is None:
+            del stages['delete_domains']
+        if self.libra_client is None:
+            del stages['delete_lb']
+
+        # Stages and the deletes within them share self.concurrency threads
+        stage_workers = max(1, int(math.sqrt(self.concurrency)))
+        self.stage_concurrency = max(1, self.concurrency // stage_workers)
+
+        results = workers.run_graph(self._run_stage, stages, stage_workers)
+        for name, (stage_overall_success, error) in sorted(results.items()):
+            if error is not None:
+                self.logger.error("<*>%s Failed %s", name, error)
+                self.overall_success = False
+            elif stage_overall_success is not True:
+                self.overall_success = False
+
         if self.overall_success is True:
             exit(0)
         else:
@@ -0,0 +1,241 @@
+# Client factories shared by the checks - each one reuses the token and
+# service catalog cached by auth.get_auth_ref, and still carries the
+# credentials so the client can re-authenticate if the token is rejected
+#
+# Client libraries are imported inside each factory so a process only pays
+# for the libraries of the services it actually runs
+
+import threading
+
+import auth
+
+
+class PerThread(object):
+    """
+    Description - Proxy that builds a separate client for every thread
+                  using it.  neutronclient (httplib2) and swiftclient keep
+                  a single connection per client which must not be shared
+                  between threads, the cached token keeps each extra
+                  client free of any Keystone round trip
+
+        neutron_client = clients.PerThread(clients.neutron, **kwargs)
+    """
+
+    def __init__(self, factory, **kwargs):
+        self._factory = factory
+        self._kwargs = kwargs
+        self._local = threading.local()
+
+    def __getattr__(self, name):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self._factory(**self._kwargs)
+        return getattr(client, name)
+
+
+def _preauth(http_client, auth_ref, service_type, region):
+    """
+    Description - Seed a novaclient style HTTPClient with a token and
+                  management url so its first request skips authenticate()
+    """
+    http_client.auth_token = auth_ref.auth_token
+    http_client.management_url = auth.endpoint(auth_ref, service_type,
+                                               region)
+
+
+def keystone(**kwargs):
+    from keystoneclient.v2_0 import client as keystone_client
+
+    auth_ref = auth.get_auth_ref(**kwargs)
+    return keystone_client.Client(
+        username=kwargs['os_username'],
+        password=kwargs['os_password'],
+        tenant_name=kwargs['os_tenant_name'],
+        auth_url=kwargs['os_auth_url'],
+        auth_ref=auth_ref
+    )
+
+
+def nova(**kwargs):
+    from novaclient.v1_1 import client as nova_client
+
+    auth_ref = auth.get_auth_ref(**kwargs)
+    client = nova_client.Client(
+        kwargs['os_username'],
+        kwargs['os_password'],
+        kwargs['os_tenant_name'],
+        kwargs['os_auth_url'],
+        region_name=kwargs['os_region']
+    )
+    _preauth(client.client, auth_ref, 'compute', kwargs['os_region'])
+    return client
+
+
+def neutron(**kwargs):
+    from neutronclient.v2_0 import client as neutron_client
+
+    auth_ref = auth.get_auth_ref(**kwargs)
+    return neutron_client.Client(
+        username=kwargs['os_username'],
+        password=kwargs['os_password'],
+        tenant_name=kwargs['os_tenant_name'],
+        auth_url=kwargs['os_auth_url'],
+        region_name=kwargs['os_region'],
+        token=auth_ref.auth_token,
+        endpoint_url=auth.endpoint(auth_ref, 'network', kwargs['os_region'])
+    )
+
+
+def cinder(**kwargs):
+    from cinderclient.v1 import client as cinder_client
+
+    auth_ref = auth.get_auth_ref(**kwargs)
+    client = cinder_client.Client(
+        kwargs['os_username'],
+        kwargs['os_password'],
+        kwargs['os_tenant_name'],
+        kwargs['os_auth_url'],
+        region_name=kwargs['os_region'],
+        service_type="volume"
+    )
+    _preauth(client.client, auth_ref, 'volume', kwargs['os_region'])
+    return client
+
+
+def trove(**kwargs):
+    from troveclient.v1 import client as trove_client
+
+    auth_ref = auth.get_auth_ref(**kwargs)
+    client = trove_client.Client(
+        kwargs['os_username'],
+        kwargs['os_password'],
+        kwargs['os_tenant_name'],
+        kwargs['os_auth_url'],
+        region_name=kwargs['os_region'],
+    )
+    _preauth(client.client, auth_ref, 'database', kwargs['os_region'])
+    return client
+
+
+def designate(**kwargs):
+    """
+    Raises EndpointNotFound when the catalog has no hpext:dns endpoint
+    """
+    from designateclient.exceptions import Forbidden
+    from designateclient.v1 import Client as Designate
+
+    auth_ref = auth.get_auth_ref(**kwargs)
+    client = Designate(
+        endpoint=auth.endpoint(auth_ref, 'hpext:dns', kwargs['os_region']),
+        token=auth_ref.auth_token
+    )
+    wrap_api_call = client.wrap_api_call
+
+    def reauthenticating(func, *args, **kw):
+        try:
+            return wrap_api_call(func, *args, **kw)
+        except Forbidden:
+            # 401 is raised as Forbidden too, the token may have expired -
+            # renew it once as the libra client does
+            auth.invalidate(**kwargs)
+            client.requests.headers['X-Auth-Token'] = \
+                auth.get_auth_ref(**kwargs).auth_token
+            return wrap_api_call(func, *args, **kw)
+
+    client.wrap_api_call = reauthenticating
+    return client
+
+
+def swift(service_type='object-store', **kwargs):
+    from swiftclient import Connection
+
+    auth_ref = auth.get_auth_ref(**kwargs)
+    os_options = {'region_name': kwargs['os_region']}
+    if service_type != 'object-store':
+        os_options['service_type'] = service_type
+
+    return Connection(
+        user=kwargs['os_username'],
+        key=kwargs['os_password'],
+        tenant_name=kwargs['os_tenant_name'],
+        authurl=kwargs['os_auth_url'],
+        auth_version="2.0",
+        os_options=os_options,
+        preauthurl=auth.endpoint(auth_ref, service_type, kwargs['os_region']),
+        preauthtoken=auth_ref.auth_token
+    )
+
+
+def cdn(**kwargs):
+    return swift(service_type='hpext:cdn', **kwargs)
+
+
+def libra(**kwargs):
+    """
+    Raises EndpointNotFound when the catalog has no hpext:lbaas endpoint
+    """
+    from lbaas import LibraClient
+
+    def reauth():
+        auth.invalidate(**kwargs)
+        return auth.get_auth_ref(**kwargs).auth_token
+
+    auth_ref = auth.get_auth_ref(**kwargs)
+    return LibraClient(
+        auth.endpoint(auth_ref, 'hpext:lbaas', kwargs['os_region']),
+        auth_ref.auth_token,
+        http_session(**kwargs),
+        timeout=http_timeout(**kwargs),
+        reauth=reauth
+    )
+
+
+def http_session(**kwargs):
+    """
+    Description - requests.Session keeping up to --http-pool-size keep-alive
+                  connections per host, so the TCP and TLS handshakes are
+                  paid once per host rather than by every call
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    pool_size = int(kwargs.get('http_pool_size') or 4)
+    session = requests.Session()
+    for prefix in ['http://', 'https://']:
+        session.mount(prefix, HTTPAdapter(pool_connections=pool_size,
+                                          pool_maxsize=pool_size))
+    return session
+
+
+def http_timeout(**kwargs):
+    """
+    Description - (connect, read) timeout in seconds for http_session calls
+    """
+    return (float(kwargs.get('http_connect_timeout') or 5),
+            float(kwargs.get('http_read_timeout') or 30))
+
+
+def connect(session, url, timeout):
+    """
+    Description - Open a connection to the host of url and leave it idle in
+                  the pool of session, without sending any request, so the
+                  TCP and TLS setup can be timed on its own
+
+                  Returns False when the pool already held a live
+                  connection and nothing was opened
+    """
+    adapter = session.get_adapter(url)
+    pool = adapter.get_connection(url)
+    adapter.cert_verify(pool, url, session.verify, session.cert)
+
+    # urllib3 only connects lazily on the first request, take a connection
+    # from the pool, connect it and give it back for that request to reuse
+    conn = pool._get_conn()
+    try:
+        if getattr(conn, 'sock', None) is not None:
+            return False
+        conn.timeout = timeout
+        conn.connect()
+        return True
+    finally:
+        pool._put_conn(conn)
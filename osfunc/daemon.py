@@ -0,0 +1,238 @@
+import datetime
+import json
+import random
+import signal
+import threading
+import time
+
+import monitoring
+import runner
+
+from exporters import PrometheusExporter
+
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from SocketServer import ThreadingMixIn
+
+
+def _timestamp(value):
+    if value is None:
+        return None
+    return datetime.datetime.utcfromtimestamp(value).strftime(
+        '%Y-%m-%dT%H:%M:%SZ')
+
+
+class ServiceSchedule:
+    """
+    Description - Run the check of one service every interval seconds,
+                  each start shifted by up to +/- jitter * interval
+
+                  A run that overruns its interval is never overlapped by
+                  the next one, the start times that were missed are
+                  counted as skipped.  The check is built once and reused
+                  so its clients, token and connections stay warm, it is
+                  rebuilt after a failed run to drop whatever state the
+                  failure left behind
+    """
+
+    def __init__(self, name, build, interval, jitter, slots, logger):
+        self.name = name
+        self.build = build
+        self.interval = float(interval)
+        self.jitter = float(jitter)
+        self.slots = slots
+        self.logger = logger
+
+        self.check = None
+        self.lock = threading.Lock()
+        self.runs = 0
+        self.failures = 0
+        self.skipped = 0
+        self.running = False
+        self.last = None
+        self.next_run = None
+
+    def _delay(self):
+        return self.interval * random.uniform(-self.jitter, self.jitter)
+
+    def run_once(self):
+        st = time.time()
+        with self.lock:
+            self.running = True
+        try:
+            with self.slots:
+                exec_time = datetime.datetime.now()
+                if self.check is None:
+                    self.check = self.build(self.name, exec_time)
+                else:
+                    self.check.exec_time = exec_time
+                    self.check.overall_success = True
+                    self.check.failure = None
+                status = runner.run_check(self.check)
+                error = None
+        except (Exception, SystemExit) as e:
+            self.logger.error('<*>%s setup Failed %s', self.name, e)
+            status, error = 1, str(e)
+
+        en = time.time()
+        if status != 0:
+            self.check = None
+        with self.lock:
+            self.running = False
+            self.runs += 1
+            self.failures += 0 if status == 0 else 1
+            self.last = {'status': status, 'success': status == 0,
+                         'started': _timestamp(st),
+                         'finished': _timestamp(en),
+                         'duration': round(en - st, 2), 'error': error}
+        self.logger.warning('<*> {0} - Exit status {1} - {2:.2f} sec'
+                            .format(self.name, status, en - st))
+
+    def loop(self, stop):
+        # Spread the first runs over one interval so services started
+        # together do not all hit the cloud at once
+        tick = time.time() + random.uniform(0, self.interval * self.jitter)
+        while not stop.is_set():
+            self.next_run = tick + self._delay()
+            stop.wait(max(self.next_run - time.time(), 0))
+            if stop.is_set():
+                break
+            self.run_once()
+
+            tick += self.interval
+            now = time.time()
+            if tick < now:
+                missed = int((now - tick) // self.interval) + 1
+                with self.lock:
+                    self.skipped += missed
+                self.logger.warning('<*> %s - Skipped %s overlapping runs',
+                                    self.name, missed)
+                tick += missed * self.interval
+
+    def status(self):
+        with self.lock:
+            return {'interval': self.interval,
+                    'running': self.running,
+                    'runs': self.runs,
+                    'failures': self.failures,
+                    'skipped': self.skipped,
+                    'next_run': _timestamp(self.next_run),
+                    'last': self.last}
+
+
+class _StatusHandler(BaseHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        scheduler = self.server.scheduler
+        path = self.path.split('?')[0].strip('/')
+        if path == 'metrics':
+            body = scheduler.metrics.render()
+            self.send_response(200)
+            self.send_header('Content-Type',
+                             'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        elif path == '':
+            body = scheduler.status()
+        elif path in scheduler.schedules:
+            body = scheduler.schedules[path].status()
+        else:
+            self.send_error(404)
+            return
+
+        body = json.dumps(body, indent=2, sort_keys=True)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _StatusServer(ThreadingMixIn, HTTPServer):
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class Daemon:
+    """
+    Description - Keep osfunc resident and run every service on its own
+                  schedule, at most max_workers checks at a time.  The last
+                  result of each service is served as JSON on
+                  http://<status_host>:<status_port>/ and /<service>, the
+                  measurements of every step in the Prometheus text format
+                  on /metrics
+
+        osfunc --os-service nova,swift,cinder --daemon --interval 300
+
+                  SIGTERM and SIGINT stop scheduling, runs in progress are
+                  allowed to finish
+    """
+
+    def __init__(self, services, build, logger, interval, jitter=0.1,
+                 max_workers=4, status_port=None, status_host='0.0.0.0'):
+        self.logger = logger
+        self.started = time.time()
+        self.stop_event = threading.Event()
+        slots = threading.BoundedSemaphore(max(1, int(max_workers)))
+
+        self.schedules = dict(
+            (name, ServiceSchedule(name, build, interval, jitter, slots,
+                                   logger))
+            for name in services)
+
+        self.httpd = None
+        self.metrics = None
+        if status_port is not None:
+            self.metrics = PrometheusExporter()
+            monitoring.observers.append(self.metrics)
+            self.httpd = _StatusServer((status_host, int(status_port)),
+                                       _StatusHandler)
+            self.httpd.scheduler = self
+
+    def status(self):
+        return {'started': _timestamp(self.started),
+                'uptime': round(time.time() - self.started, 2),
+                'services': dict((name, schedule.status()) for
+                                 name, schedule in self.schedules.items())}
+
+    def stop(self, *args):
+        self.logger.warning('<*> Stopping, waiting for running checks')
+        self.stop_event.set()
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        threads = []
+        if self.httpd is not None:
+            thread = threading.Thread(target=self.httpd.serve_forever,
+                                      name='osfunc-status')
+            thread.daemon = True
+            thread.start()
+            self.logger.warning('<*> Status on port %s',
+                                self.httpd.server_address[1])
+
+        for name, schedule in sorted(self.schedules.items()):
+            thread = threading.Thread(target=schedule.loop,
+                                      args=(self.stop_event,),
+                                      name='osfunc-' + name)
+            thread.daemon = True
+            thread.start()
+            threads.append(thread)
+
+        # Signals are only delivered to the main thread while it is
+        # running Python code, so wait in short slices
+        while not self.stop_event.is_set():
+            self.stop_event.wait(1)
+
+        for thread in threads:
+            thread.join()
+        if self.httpd is not None:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+        return 0
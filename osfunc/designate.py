@@ -1,19 +1,32 @@
+import socket
+import time
+
 from datetime import datetime
 from random import randint
-from time import sleep
 from sys import exit
 
-from designateclient.v1 import Client
 from designateclient.v1.records import Record
 from designateclient.v1.domains import Domain
 
 from dns import resolver
 from dns.exception import DNSException
-from dns.resolver import NXDOMAIN
+
+import clients
+import monitoring
+import waiters
+import workers
 
 from monitoring import timeit
 
 
+def _address(nameserver):
+    """
+    Description - (ip, port) of a nameserver given as host or host:port
+    """
+    host, _, port = nameserver.strip().partition(':')
+    return socket.gethostbyname(host.rstrip('.')), int(port or 53)
+
+
 class DNSaaSCheck:
     """
 
@@ -23,11 +36,14 @@ class DNSaaSCheck:
     Create domain
     Create record
     List records
-    Query record
+    Query record - on every nameserver of the domain concurrently
     Delete record
     Delete domain
 
-    Specify the nameserver to be used on the CLI, or export OS_NAMESERVER
+    query_record records propagation_<nameserver>, the seconds from the
+    creation of the record until the nameserver answered with it, for the
+    nameservers given on the CLI (export OS_NAMESERVER, comma separated) or
+    else for those Designate serves the domain from
 
     NOTE: Currently, the IP associated with the A record is hardset below in self_ip - this behaviour will change
     to be specified on the CLI or through an environment variable
@@ -35,14 +51,7 @@ class DNSaaSCheck:
     """
 
     def __init__(self, logger, exec_time, **kwargs):
-        self.client = Client(
-            auth_url=kwargs['os_auth_url'],
-            username=kwargs['os_username'],
-            password=kwargs['os_password'],
-            tenant_name=kwargs['os_tenant_name'],
-            region_name=kwargs['os_region'],
-            service_type='hpext:dns'
-        )
+        self.client = clients.designate(**kwargs)
 
         self.logger = logger
         self.exec_time = exec_time
@@ -56,7 +65,12 @@ class DNSaaSCheck:
         self.failure = None
         self.success = None
         self.overall_success = True
-        self.nameserver = kwargs['nameserver']
+        self.nameservers = [nameserver for nameserver in
+                            (kwargs.get('nameserver') or '').split(',')
+                            if nameserver.strip()]
+        self.propagation_timeout = float(
+            kwargs.get('dns_propagation_timeout') or 120)
+        self.record_created_at = None
         self.zone = None
         self.region = kwargs['os_region']
         self.tenant_name = kwargs['os_tenant_name']
@@ -139,6 +153,7 @@ class DNSaaSCheck:
         try:
             self.new_record = self.client.records.create(self.new_domain.id,
                                                          record)
+            self.record_created_at = time.time()
             self.logger.warning('Created Record: {}'
                                 .format(self.new_record.name))
         except Exception as e:
@@ -148,32 +163,84 @@ class DNSaaSCheck:
             exit(1)
         self.success = True
 
+    def find_nameservers(self):
+        """
+        Addresses of the nameservers to query, --nameserver when given,
+        otherwise the nameservers of the new domain
+        """
+        names = self.nameservers or \
+            [server.name for server in
+             self.client.domains.list_domain_servers(self.new_domain.id)]
+        if not names:
+            raise Exception('No nameserver for domain {}'
+                            .format(self.new_domain.name))
+        return [_address(name) for name in names]
+
+    def wait_visible(self, address):
+        """
+        Query the nameserver at address, with backoff, until it answers
+        with the IP of the new record and return the time it did
+        """
+        res = resolver.Resolver(configure=False)
+        res.nameservers = [address[0]]
+        res.port = address[1]
+        res.timeout = res.lifetime = 2
+
+        def probe():
+            try:
+                return [str(answer) for answer in
+                        res.query(self.new_record.name, 'A')]
+            except DNSException:
+                return []
+
+        remaining = self.record_created_at + self.propagation_timeout - \
+            time.time()
+        answers, observed_at = waiters.wait_for(
+            probe, lambda answers: self.set_ip in answers,
+            max(remaining, 0), initial=0.25, max_interval=2)
+        return observed_at
+
     @timeit
     def query_record(self):
         """
-        Query the newly created record to ensure the nameserver returns the correct IP originally specified
+        Query every nameserver concurrently until each returns the IP of the
+        new record, the step lasts until the record is visible on all of them
         """
-
-        res = resolver.Resolver()
-        res.nameservers = [self.nameserver]
-        query_domain = str({}).format(self.new_record.name[:-1])
-
-        self.logger.warning('Using nameserver {}'.format(self.nameserver))
-        query_ip = None
-        sleep(5)
+        self.success = True
         try:
-            query = res.query(query_domain, 'A')
-            query_ip = str(query[0])
+            nameservers = self.find_nameservers()
         except Exception as e:
-            self.logger.error('Query failed %s', e)
-            self.logger.error('Check to see if nameserver parm is present')
+            self.logger.error('<*>query_record Failed %s', e)
             self.success, self.overall_success = False, False
             self.failure = e
+            return False
 
-        if self.set_ip == query_ip:
-            self.logger.warning('Query Results {}'.format(query_ip))
-            self.success = True
-
+        results = workers.run_concurrently(self.wait_visible, nameservers,
+                                           len(nameservers))
+        observed = []
+        for (host, port), observed_at, error in results:
+            label = 'propagation_' + (host if port == 53 else
+                                      '{0}:{1}'.format(host, port))
+            if error is not None:
+                self.logger.error('<*>%s Failed %s', label, error)
+                self.success, self.overall_success = False, False
+                self.failure = error
+                monitoring.record(self, label, self.propagation_timeout,
+                                  success=False, failure=error,
+                                  kind=monitoring.TIMER)
+                continue
+
+            self.logger.warning('<*> {0} - Visible after {1:.2f} sec'.format(
+                label, observed_at - self.record_created_at))
+            monitoring.record(self, label,
+                              observed_at - self.record_created_at,
+                              st=self.record_created_at, en=observed_at,
+                              success=True, failure=None,
+                              kind=monitoring.TIMER)
+            observed.append(observed_at)
+
+        if self.success and observed:
+            self.observed_at = max(observed)
             return True
 
     @timeit
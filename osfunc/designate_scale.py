@@ -0,0 +1,178 @@
+import time
+
+from designateclient.v1.records import Record
+
+import clients
+import monitoring
+import stats
+import workers
+
+from designate import DNSaaSCheck
+from sys import exit
+
+
+class DesignateScaleCheck(DNSaaSCheck):
+    """
+    Scale test for DNSaaS - grow a test domain to --designate-scale-records
+    A records and remove them again
+
+    Create domain
+    Create the records, --designate-scale-concurrency at a time, in ten
+    batches, listing the records of the domain after each batch
+    Delete the records, --designate-scale-concurrency at a time
+    Delete domain
+
+    Record create_records and delete_records (seconds), their _ops rate and
+    _p50/_p90/_p99 latency per record, create_records_<n>_ops the create
+    rate of the batch ending at n records and list_records_<n> the time to
+    list the domain once it holds n records.  The domain is deleted even
+    when a stage fails, taking any record left with it
+
+    """
+
+    def __init__(self, logger, exec_time, **kwargs):
+        DNSaaSCheck.__init__(self, logger, exec_time, **kwargs)
+
+        # The API calls run on several threads, each needs its own client
+        self.scale_client = clients.PerThread(clients.designate, **kwargs)
+
+        self.service = 'DNSaaS Scale'
+        self.records = int(kwargs.get('designate_scale_records') or 1000)
+        self.concurrency = int(kwargs.get('designate_scale_concurrency') or 8)
+        self.created = []
+
+    def _record_name(self, index):
+        return 'scale{0:06d}.{1}'.format(index, self.new_domain.name)
+
+    def _create(self, index):
+        st = time.time()
+        record = self.scale_client.records.create(
+            self.new_domain.id,
+            Record(name=self._record_name(index), type='A', data=self.set_ip))
+        self.created.append(record.id)
+        return time.time() - st
+
+    def _delete(self, record_id):
+        st = time.time()
+        self.scale_client.records.delete(self.new_domain.id, record_id)
+        return time.time() - st
+
+    def apply(self, label, func, items):
+        """
+        Description - Run func on every item concurrently, returning the
+                      seconds it took and the latency of every call that
+                      succeeded
+        """
+        st = time.time()
+        results = workers.run_concurrently(func, items, self.concurrency)
+        elapsed = time.time() - st
+
+        errors = [error for item, latency, error in results
+                  if error is not None]
+        if errors:
+            self.success, self.overall_success = False, False
+            self.failure = errors[0]
+            self.logger.error('<*>%s Failed %s of %s %s', label, len(errors),
+                              len(results), errors[0])
+        return elapsed, [latency for item, latency, error in results
+                         if error is None]
+
+    def report(self, label, st, elapsed, latencies):
+        """
+        Description - Record the duration, rate and latency percentiles of
+                      a stage
+        """
+        summary = stats.summarize(latencies)
+        ops = len(latencies) / elapsed if elapsed else 0.0
+        self.logger.warning(
+            '<*> {0} - {1} records in {2:.2f} sec - {3:.1f} records/s - '
+            'p50 {4:.4f} p99 {5:.4f} sec'.format(
+                label, len(latencies), elapsed, ops,
+                summary['p50'] or 0.0, summary['p99'] or 0.0))
+
+        monitoring.record(self, label, elapsed, st=st, en=st + elapsed,
+                          kind=monitoring.TIMER)
+        monitoring.record(self, label + '_ops', ops)
+        for pct in ['p50', 'p90', 'p99']:
+            if summary[pct] is not None:
+                monitoring.record(self, '{0}_{1}'.format(label, pct),
+                                  summary[pct])
+        self.failure = None
+
+    def list_all(self):
+        """
+        Description - Time listing every record of the domain, recorded
+                      as list_records_<number of records>
+        """
+        st = time.time()
+        try:
+            count = len(self.scale_client.records.list(self.new_domain.id))
+        except Exception as e:
+            self.logger.error('<*>list_records Failed %s', e)
+            self.success, self.overall_success = False, False
+            self.failure = e
+            return
+        en = time.time()
+
+        self.success = True
+        label = 'list_records_{0}'.format(count)
+        self.logger.warning('<*> {0} - Executed in: {1:.2f} sec'
+                            .format(label, en - st))
+        monitoring.record(self, label, en - st, st=st, en=en,
+                          kind=monitoring.TIMER)
+
+    def create_records(self):
+        """
+        Description - Create the records in ten batches, recording the
+                      create rate of each batch as create_records_<n>_ops
+                      so a slowdown as the domain grows shows, and listing
+                      the domain after each of them
+        """
+        st = time.time()
+        elapsed = 0.0
+        latencies = []
+        batches = min(10, self.records)
+        for batch in range(batches):
+            first = self.records * batch // batches
+            last = self.records * (batch + 1) // batches
+            self.success = True
+            batch_elapsed, batch_latencies = self.apply(
+                'create_records', self._create, range(first, last))
+            monitoring.record(self, 'create_records_{0}_ops'.format(last),
+                              len(batch_latencies) / batch_elapsed
+                              if batch_elapsed else 0.0)
+            elapsed += batch_elapsed
+            latencies += batch_latencies
+            if self.overall_success is not True:
+                break
+            self.list_all()
+
+        self.success = self.overall_success
+        self.report('create_records', st, elapsed, latencies)
+
+    def delete_records(self):
+        created, self.created = self.created, []
+        st = time.time()
+        self.success = True
+        elapsed, latencies = self.apply('delete_records', self._delete,
+                                        created)
+        self.report('delete_records', st, elapsed, latencies)
+
+    def run(self):
+        self.create_domain()
+
+        if self.overall_success is True:
+            try:
+                self.create_records()
+                if self.overall_success is True:
+                    self.delete_records()
+            finally:
+                try:
+                    self.delete_domain()
+                except SystemExit:
+                    self.overall_success = False
+
+        if self.overall_success is True:
+            exit(0)
+        else:
+            exit(1)
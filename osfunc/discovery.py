@@ -0,0 +1,128 @@
+import json
+import os
+import threading
+import time
+
+import auth
+
+# Selections are discovered again once they are this many seconds old
+DEFAULT_TTL = 3600
+
+DEFAULT_CACHE_DIR = os.path.join('~', '.osfunc', 'discovery')
+
+_lock = threading.Lock()
+_entries = {}
+
+
+class Cache(object):
+    """
+    Description - The image, network and keypair a check selected, kept
+                  for ttl seconds per auth url, user, tenant and region so
+                  the next runs reuse them without listing the inventory
+
+                  Entries live in process and, unless cache_dir is empty,
+                  in a JSON file of cache_dir shared by the processes
+                  using the same credentials.  A ttl of 0 disables the
+                  cache
+
+        self.discovery = discovery.Cache(**kwargs)
+    """
+
+    def __init__(self, **kwargs):
+        self.key = auth.cache_key(**kwargs)
+        self.cache_dir = kwargs.get('discovery_cache_dir', DEFAULT_CACHE_DIR)
+        self.ttl = float(kwargs.get('discovery_ttl', DEFAULT_TTL) or 0)
+
+    def _path(self):
+        return os.path.join(os.path.expanduser(self.cache_dir),
+                            self.key + '.json')
+
+    def _load(self):
+        entries = _entries.get(self.key)
+        if entries is None:
+            entries = {}
+            if self.cache_dir:
+                try:
+                    with open(self._path()) as cache_file:
+                        entries = json.load(cache_file)
+                except (IOError, ValueError):
+                    pass
+            _entries[self.key] = entries
+        return entries
+
+    def _save(self, entries):
+        if not self.cache_dir:
+            return
+        path = self._path()
+        directory = os.path.dirname(path)
+        if not os.path.isdir(directory):
+            os.makedirs(directory, 0700)
+
+        # Written as the token cache is, see auth._save
+        tmp_path = '{0}.{1}'.format(path, os.getpid())
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0600)
+        with os.fdopen(fd, 'w') as cache_file:
+            json.dump(entries, cache_file)
+        os.rename(tmp_path, path)
+
+    def get(self, kind):
+        """
+        Description - The value stored for kind, None when there is none
+                      younger than ttl
+        """
+        if self.ttl <= 0:
+            return None
+        with _lock:
+            entry = self._load().get(kind)
+        if entry is None or time.time() - entry['stored_at'] > self.ttl:
+            return None
+        return entry['value']
+
+    def put(self, kind, value):
+        if self.ttl <= 0:
+            return
+        with _lock:
+            entries = dict(self._load())
+            entries[kind] = {'value': value, 'stored_at': time.time()}
+            _entries[self.key] = entries
+            self._save(entries)
+
+    def invalidate(self):
+        """
+        Description - Forget every selection, the next run discovers them
+                      again
+        """
+        with _lock:
+            _entries[self.key] = {}
+            if self.cache_dir:
+                try:
+                    os.remove(self._path())
+                except OSError:
+                    pass
+
+
+def cached(self, kind):
+    """
+    Description - The kind of selection cached for check self, None when
+                  the check keeps no discovery cache or it holds none
+    """
+    cache = getattr(self, 'discovery', None)
+    if cache is None:
+        return None
+    return cache.get(kind)
+
+
+def store(self, kind, value):
+    cache = getattr(self, 'discovery', None)
+    if cache is not None:
+        cache.put(kind, value)
+
+
+def invalidate(self):
+    """
+    Description - Forget the selections of check self after a step using
+                  them failed, one of them may be gone
+    """
+    cache = getattr(self, 'discovery', None)
+    if cache is not None:
+        cache.invalidate()
@@ -0,0 +1,192 @@
+import json
+import logging
+import os
+import re
+import socket
+import threading
+import Queue
+
+_logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+def _measurement(run, st, en):
+    """
+    Description - (value, is_timer) of a recorded measurement, as marked by
+                  the kind given to monitoring.record.  Timed steps are
+                  measured from their boundaries, rounded in run_time
+    """
+    # Imported here, monitoring imports this module when it loads
+    import monitoring
+
+    if run['payload']['kind'] != monitoring.TIMER:
+        return float(run['payload']['run_time']), False
+    if en > st:
+        return en - st, True
+    return float(run['payload']['run_time']), True
+
+
+def _metric_name(text):
+    return re.sub(r'[^a-zA-Z0-9_]+', '_', str(text or 'none')).strip('_') \
+        .lower() or 'none'
+
+
+class StatsdExporter:
+    """
+    Description - Send every measurement to a StatsD server over UDP
+
+                  <prefix>.<region>.<service>.<name>:<ms>|ms for timed steps,
+                  |g gauges for other measurements and a .failures counter
+                  for failed ones.  The socket is non-blocking, a datagram
+                  that cannot be sent is dropped
+    """
+
+    def __init__(self, address, prefix='osfunc'):
+        host, _, port = address.rpartition(':')
+        self.address = (host or 'localhost', int(port or 8125))
+        self.prefix = prefix
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setblocking(0)
+
+    def __call__(self, check, run, st, en):
+        value, timer = _measurement(run, st, en)
+        payload = run['payload']
+        key = '.'.join([self.prefix, _metric_name(check.region),
+                        _metric_name(payload['service']),
+                        _metric_name(payload['name'])])
+
+        lines = ['{0}:{1:.3f}|ms'.format(key, value * 1000) if timer else
+                 '{0}:{1:.6g}|g'.format(key, value)]
+        if not payload['success']:
+            lines.append('{0}.failures:1|c'.format(key))
+        try:
+            self.socket.sendto('\n'.join(lines), self.address)
+        except socket.error as e:
+            _logger.debug('Dropped StatsD metric %s: %s', key, e)
+
+
+class JsonLinesExporter:
+    """
+    Description - Append the run envelope of every measurement to path as
+                  one JSON document per line
+
+                  Lines are written by a background thread, a full queue
+                  drops the measurement rather than stalling the step
+    """
+
+    def __init__(self, path, max_queue=10000):
+        self.path = os.path.expanduser(path)
+        self.queue = Queue.Queue(max_queue)
+        self.dropped = 0
+        self.thread = threading.Thread(target=self._run,
+                                       name='osfunc-jsonl')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def __call__(self, check, run, st, en):
+        document = dict(run, region=check.region, zone=check.zone,
+                        start=st, end=en)
+        try:
+            self.queue.put_nowait(json.dumps(document))
+        except Queue.Full:
+            self.dropped += 1
+
+    def close(self, timeout=30):
+        if not self.thread.is_alive():
+            return
+        try:
+            self.queue.put(_STOP, timeout=timeout)
+        except Queue.Full:
+            pass
+        self.thread.join(timeout)
+
+    def _run(self):
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        with open(self.path, 'a') as output:
+            while True:
+                line = self.queue.get()
+                if line is _STOP:
+                    break
+                lines = [line]
+                # Write whatever else is queued before flushing once
+                while True:
+                    try:
+                        line = self.queue.get_nowait()
+                    except Queue.Empty:
+                        break
+                    if line is _STOP:
+                        break
+                    lines.append(line)
+                output.write('\n'.join(lines) + '\n')
+                output.flush()
+                if line is _STOP:
+                    break
+
+
+class PrometheusExporter:
+    """
+    Description - Aggregate measurements in memory for a Prometheus scrape,
+                  render() returns them in the text exposition format
+
+                  osfunc_step_seconds_sum/_count and osfunc_step_last_seconds
+                  for timed steps, osfunc_measurement for other values and
+                  osfunc_step_failures_total, labelled by service, name,
+                  region and zone
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.steps = {}
+        self.measurements = {}
+        self.failures = {}
+
+    def __call__(self, check, run, st, en):
+        value, timer = _measurement(run, st, en)
+        payload = run['payload']
+        labels = (payload['service'], payload['name'], check.region,
+                  check.zone)
+
+        with self.lock:
+            if timer:
+                total, count, _ = self.steps.get(labels, (0.0, 0, None))
+                self.steps[labels] = (total + value, count + 1, value)
+            else:
+                self.measurements[labels] = value
+            if not payload['success']:
+                self.failures[labels] = self.failures.get(labels, 0) + 1
+
+    def _labels(self, labels):
+        return ','.join('{0}="{1}"'.format(
+            key, str(value or '').replace('\\', '\\\\').replace('"', '\\"'))
+            for key, value in zip(['service', 'name', 'region', 'zone'],
+                                  labels))
+
+    def render(self):
+        with self.lock:
+            steps = sorted(self.steps.items())
+            measurements = sorted(self.measurements.items())
+            failures = sorted(self.failures.items())
+
+        lines = ['# TYPE osfunc_step_seconds summary']
+        for labels, (total, count, _) in steps:
+            lines.append('osfunc_step_seconds_sum{{{0}}} {1:.6f}'.format(
+                self._labels(labels), total))
+            lines.append('osfunc_step_seconds_count{{{0}}} {1}'.format(
+                self._labels(labels), count))
+        lines.append('# TYPE osfunc_step_last_seconds gauge')
+        for labels, (_, _, last) in steps:
+            lines.append('osfunc_step_last_seconds{{{0}}} {1:.6f}'.format(
+                self._labels(labels), last))
+        lines.append('# TYPE osfunc_measurement gauge')
+        for labels, value in measurements:
+            lines.append('osfunc_measurement{{{0}}} {1:.6g}'.format(
+                self._labels(labels), value))
+        lines.append('# TYPE osfunc_step_failures_total counter')
+        for labels, count in failures:
+            lines.append('osfunc_step_failures_total{{{0}}} {1}'.format(
+                self._labels(labels), count))
+        return '\n'.join(lines) + '\n'
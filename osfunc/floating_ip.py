@@ -1,4 +1,3 @@
-import paramiko
 import os
 import monitoring
 
@@ -96,6 +95,8 @@ def ssh_to_instance(self):
     """
     Description - SSH to the current floating_ip.ip address
     """
+    # paramiko is only needed when --ssh-to-instance is set
+    import paramiko
 
     ssh_client = paramiko.SSHClient()
     ssh_client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
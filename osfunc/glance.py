@@ -2,12 +2,11 @@ import images
 import servers
 import keypairs
 import networks
+import clients
+import discovery
 
 from sys import exit
 
-from novaclient.v1_1 import client as nova_client
-from neutronclient.v2_0 import client as neutron_client
-
 
 class GlanceCheck:
     """
@@ -28,21 +27,9 @@ class GlanceCheck:
     """
 
     def __init__(self, logger, exec_time, **kwargs):
-        self.nova_client = nova_client.Client(
-            kwargs['os_username'],
-            kwargs['os_password'],
-            kwargs['os_tenant_name'],
-            kwargs['os_auth_url'],
-            region_name=kwargs['os_region']
-        )
+        self.nova_client = clients.nova(**kwargs)
 
-        self.neutron_client = neutron_client.Client(
-            username=kwargs['os_username'],
-            password=kwargs['os_password'],
-            tenant_name=kwargs['os_tenant_name'],
-            auth_url=kwargs['os_auth_url'],
-            region_name=kwargs['os_region']
-        )
+        self.neutron_client = clients.neutron(**kwargs)
 
         self.logger = logger
         self.exec_time = exec_time
@@ -54,6 +41,7 @@ class GlanceCheck:
         self.failure = None
         self.overall_success = True
         self.tenant_name = kwargs['os_tenant_name']
+        self.discovery = discovery.Cache(**kwargs)
 
     def run(self):
 
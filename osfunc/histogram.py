@@ -0,0 +1,88 @@
+import json
+
+# Values are recorded as integers of this many units per second
+UNITS_PER_SECOND = 10 ** 6
+
+# Every power of two is split into 2 ** (SUB_BUCKET_BITS - 1) linear buckets,
+# bounding the relative error of any percentile to 2 ** -(SUB_BUCKET_BITS - 1)
+SUB_BUCKET_BITS = 8
+
+
+def _bucket(value):
+    """
+    Description - Lowest value of the bucket value falls in
+    """
+    shift = max(value.bit_length() - SUB_BUCKET_BITS, 0)
+    return (value >> shift) << shift
+
+
+def _midpoint(bucket):
+    shift = max(bucket.bit_length() - SUB_BUCKET_BITS, 0)
+    return bucket + ((1 << shift) - 1) / 2.0
+
+
+class Histogram(object):
+    """
+    Description - Sparse log-linear histogram in the style of
+                  HdrHistogram.  Any value from a microsecond to hours is
+                  kept with under 1% error in a few hundred buckets at
+                  most, and histograms merge exactly, so percentiles can be
+                  computed over any combination of them
+
+        histogram = Histogram()
+        histogram.record(0.25)
+        histogram.percentile(99)
+    """
+
+    def __init__(self, counts=None, maximum=0):
+        self.counts = dict(counts or {})
+        self.count = sum(self.counts.values())
+        self.maximum = maximum
+
+    def record(self, value):
+        """
+        Description - Add a value in seconds, negative values count as 0
+        """
+        value = max(int(round(value * UNITS_PER_SECOND)), 0)
+        bucket = _bucket(value)
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.count += 1
+        self.maximum = max(self.maximum, value)
+
+    def merge(self, other):
+        for bucket, count in other.counts.items():
+            self.counts[bucket] = self.counts.get(bucket, 0) + count
+        self.count += other.count
+        self.maximum = max(self.maximum, other.maximum)
+        return self
+
+    def percentile(self, pct):
+        """
+        Description - Value in seconds below which pct percent of the
+                      recorded values fall, None when nothing was recorded
+        """
+        if not self.count:
+            return None
+        rank = max(pct / 100.0 * self.count, 1)
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                value = min(_midpoint(bucket), self.maximum)
+                return value / float(UNITS_PER_SECOND)
+        return self.max()
+
+    def max(self):
+        return self.maximum / float(UNITS_PER_SECOND) if self.count else None
+
+    def dumps(self):
+        return json.dumps({'max': self.maximum,
+                           'counts': sorted(self.counts.items())},
+                          separators=(',', ':'))
+
+    @classmethod
+    def loads(cls, text):
+        data = json.loads(text)
+        return cls(dict((int(bucket), count)
+                        for bucket, count in data['counts']),
+                   data['max'])
@@ -1,10 +1,12 @@
+import discovery
 import monitoring
 import random
+import waiters
 
 from sys import exit
-from time import sleep
 
 from novaclient import exceptions as nova_exceptions
+from novaclient.v1_1.images import Image
 
 
 @monitoring.timeit
@@ -13,8 +15,14 @@ def select_image(self):
     Description - Pull full list of images except for Blu Age,
                   Partner Image and that contains Ubuntu and
                   then randomly select a image from the list of
-                  active images
+                  active images, or reuse the one cached by an earlier run
     """
+    cached = discovery.cached(self, 'image')
+    if cached is not None:
+        self.success = True
+        self.image = Image(self.nova_client.images, cached, loaded=True)
+        return
+
     try:
         images = []
         for image in self.nova_client.images.list():
@@ -29,6 +37,7 @@ def select_image(self):
                     and image.status == "ACTIVE":
                 images.append(image)
         self.image = self.nova_client.images.get(random.choice(images))
+        discovery.store(self, 'image', self.image._info)
     except nova_exceptions.NotFound:
         self.logger.error("No Images found")
         self.success, self.overall_success = False, False
@@ -145,29 +154,35 @@ def list_images(self):
         self.logger.error("<*>list_image Failed %s", e)
 
 
+# Longest time to wait for a snapshot image to become active
+IMAGE_TIMEOUT = 300
+
+
 @monitoring.timeit
 def check_image_status(self):
     """
     Wait for image status to become active
     """
 
-    try:
-        for time in range(1, 31):
-            sleep(10)
-            try:
-                check_active = self.nova_client.images.get(self.image_new.id)
-            except nova_exceptions.NotFound:
-                pass
+    def probe():
+        try:
+            image = self.nova_client.images.get(self.image_new.id)
+        except nova_exceptions.NotFound:
+            return None
+        self.logger.warning('Image status: {}'.format(image.status))
+        return image
 
-            self.logger.warning('Image status: {}'.format(check_active.status))
-
-            if check_active.status == u'ACTIVE':
-                self.success = True
+    try:
+        image, self.observed_at = waiters.wait_for(
+            probe, lambda image: image is not None and
+            image.status == u'ACTIVE', timeout=IMAGE_TIMEOUT)
+        self.success = True
 
-                return True
+        return True
 
+    except waiters.WaitTimeout:
         self.success, self.overall_success = False, False
-        self.logger.error('<*>Image Status to Active Exceeded {} minutes'.format(str(len(range(1, 31)) * 10 / 60)))
+        self.logger.error('<*>Image Status to Active Exceeded {} minutes'.format(IMAGE_TIMEOUT / 60))
         exit(1)
 
     except Exception as e:
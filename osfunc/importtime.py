@@ -0,0 +1,64 @@
+import __builtin__
+import sys
+import time
+
+
+class ImportTimer:
+    """
+    Description - Context manager recording how long each module first
+                  imported inside the block took to load, in the spirit of
+                  python -X importtime
+
+        with ImportTimer() as timer:
+            import nova
+        for line in timer.report():
+            print line
+    """
+
+    def __init__(self):
+        self.records = []
+        self._stack = []
+        self._real_import = None
+        self.started = None
+        self.elapsed = None
+
+    def __enter__(self):
+        self._real_import = __builtin__.__import__
+        __builtin__.__import__ = self._import
+        self.started = time.time()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.elapsed = time.time() - self.started
+        __builtin__.__import__ = self._real_import
+
+    def _import(self, name, *args, **kwargs):
+        loaded = len(sys.modules)
+        self._stack.append(0.0)
+        st = time.time()
+        try:
+            return self._real_import(name, *args, **kwargs)
+        finally:
+            cumulative = time.time() - st
+            children = self._stack.pop()
+            # Only imports that actually loaded something are interesting,
+            # cache hits in sys.modules are skipped
+            if len(sys.modules) > loaded:
+                self.records.append((len(self._stack), name,
+                                     cumulative - children, cumulative))
+            if self._stack:
+                self._stack[-1] += cumulative
+
+    def report(self):
+        """
+        Description - Lines of 'self | cumulative | module' in microseconds,
+                      nested imports indented below the module that
+                      triggered them
+        """
+        lines = ['import time: self [us] | cumulative | imported package']
+        for depth, name, own, cumulative in self.records:
+            lines.append('import time: {0:>9} | {1:>10} | {2}{3}'.format(
+                int(own * 1e6), int(cumulative * 1e6), '  ' * depth, name))
+        if self.elapsed is not None:
+            lines.append('import time: {0:.3f} sec total'.format(self.elapsed))
+        return lines
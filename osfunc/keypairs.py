@@ -1,5 +1,7 @@
+import discovery
 import monitoring
 from novaclient import exceptions as nova_exceptions
+from novaclient.v1_1.keypairs import Keypair
 
 from random import randint
 from sys import exit
@@ -8,8 +10,15 @@ from sys import exit
 @monitoring.timeit
 def select_keypair(self):
     """
-    Descrtiption - Select the last kepair from the keypair list
+    Descrtiption - Select the last kepair from the keypair list, or reuse
+                   the one cached by an earlier run
     """
+    cached = discovery.cached(self, 'key_pair')
+    if cached is not None:
+        self.success = True
+        self.key_pair = Keypair(self.nova_client.keypairs, cached, loaded=True)
+        return
+
     try:
         self.key_pairs = self.nova_client.keypairs.list()
         self.success = True
@@ -17,6 +26,7 @@ def select_keypair(self):
             if 'OSfuncTest' not in self.key_pair.name:
 
                 break
+        discovery.store(self, 'key_pair', self.key_pair._info)
     except IndexError:
         self.success, self.overall_success = False, False
         self.logger.error('<*>No Keypairs available - Cannot continue')
@@ -2,7 +2,7 @@ from keystoneclient.v2_0 import client as keystone_client_2
 from keystoneclient.v3 import client as keystone_client_3
 
 import sys
-import requests
+import clients
 import monitoring
 
 
@@ -24,6 +24,12 @@ class KeystoneCheck:
         self.overall_success = True
         self.tenant_name = kwargs['os_tenant_name']
 
+        # The REST steps share keep-alive connections, the connection to
+        # the identity endpoint is opened and timed by connect_identity so
+        # the steps after it measure the requests alone
+        self.session = clients.http_session(**kwargs)
+        self.timeout = clients.http_timeout(**kwargs)
+
     @monitoring.timeit
     def authenticate_v2(self):
         try:
@@ -71,12 +77,24 @@ class KeystoneCheck:
             self.logger.error(
                 "Authentication V3.0 Failed %s", sys.exc_info()[1])
 
+    @monitoring.timeit
+    def connect_identity(self):
+        try:
+            self.success = True
+            clients.connect(self.session, self.v3_url, self.timeout[0])
+        except Exception as e:
+            self.success, self.overall_success = False, False
+            self.failure = e
+            self.logger.error(
+                "Connecting to identity Failed %s", sys.exc_info()[1])
+
     @monitoring.timeit
     def list_credentials(self):
         try:
 
-            r = requests.get(self.v3_url + 'credentials',
-                             headers=self.v3_headers)
+            r = self.session.get(self.v3_url + 'credentials',
+                                 headers=self.v3_headers,
+                                 timeout=self.timeout)
             self.user_id = r.json()['credentials'][0]['user_id']
 
             if r.status_code == 200:
@@ -91,9 +109,10 @@ class KeystoneCheck:
     @monitoring.timeit
     def list_user_projects(self):
         try:
-            r = requests.get(self.v3_url +
-                             'users/{}/projects'.format(self.user_id),
-                             headers=self.v3_headers)
+            r = self.session.get(self.v3_url +
+                                 'users/{}/projects'.format(self.user_id),
+                                 headers=self.v3_headers,
+                                 timeout=self.timeout)
             try:
                 self.project_id = r.json()['projects'][0]['id']
             except Exception as e:
@@ -114,9 +133,10 @@ class KeystoneCheck:
     @monitoring.timeit
     def get_project(self):
         try:
-            r = requests.get(self.v3_url +
-                             '/projects/{}'.format(self.project_id),
-                             headers=self.v3_headers)
+            r = self.session.get(self.v3_url +
+                                 '/projects/{}'.format(self.project_id),
+                                 headers=self.v3_headers,
+                                 timeout=self.timeout)
             if r.status_code == 200:
                 return True
 
@@ -133,6 +153,7 @@ class KeystoneCheck:
     def run(self):
         self.authenticate_v2()
         self.authenticate_v3()
+        self.connect_identity()
         self.list_credentials()
         self.list_user_projects()
         self.get_project()
@@ -0,0 +1,194 @@
+import json
+import threading
+import time
+import Queue
+
+import monitoring
+import stats
+
+from keystone import KeystoneCheck
+from sys import exit
+
+OPERATIONS = ['v2', 'v3', 'validate']
+
+
+class KeystoneLoadCheck(KeystoneCheck):
+    """
+    Load test for Keystone - issue v2 and v3 tokens and validate a v3 token
+
+    Requests are started at a fixed --keystone-load-rate per second, taking
+    turns between --keystone-load-operations, for --keystone-load-duration
+    seconds on --keystone-load-concurrency threads sharing one keep-alive
+    pool.  The rate is kept whatever the response times, so latency is
+    measured from the time each request was due: once the identity tier
+    saturates the requests queue up and their latency grows instead of the
+    load easing off
+
+    Record load_<op>_tps, load_<op>_error_rate and load_<op>_p50/_p90/_p99
+    for every operation, load_tps, load_error_rate and load_lag (mean
+    seconds requests started late) for all of them
+
+    """
+
+    def __init__(self, logger, exec_time, **kwargs):
+        self.rate = float(kwargs.get('keystone_load_rate') or 10)
+        self.duration = float(kwargs.get('keystone_load_duration') or 60)
+        self.concurrency = int(kwargs.get('keystone_load_concurrency') or 8)
+        self.operations = [operation.strip() for operation in
+                           (kwargs.get('keystone_load_operations') or
+                            ','.join(OPERATIONS)).split(',')
+                           if operation.strip()]
+        unknown = set(self.operations) - set(OPERATIONS)
+        if unknown:
+            raise ValueError('Unknown keystone load operation(s) {0}'
+                             .format(', '.join(sorted(unknown))))
+
+        kwargs = dict(kwargs, http_pool_size=max(
+            self.concurrency, int(kwargs.get('http_pool_size') or 0)))
+        KeystoneCheck.__init__(self, logger, exec_time, **kwargs)
+        self.service = 'Identity Load'
+
+        self.v3_auth_url = self.auth_url.replace('v2.0', 'v3').rstrip('/')
+        self.v2_body = json.dumps({'auth': {
+            'passwordCredentials': {'username': self.username,
+                                    'password': self.password},
+            'tenantName': self.tenant}})
+        self.v3_body = json.dumps({'auth': {
+            'identity': {'methods': ['password'],
+                         'password': {'user': {
+                             'name': self.username,
+                             'password': self.password,
+                             'domain': {'id': self.domain_id}}}},
+            'scope': {'domain': {'id': self.domain_id}}}})
+
+    def issue_v2(self):
+        r = self.session.post(self.auth_url.rstrip('/') + '/tokens',
+                              data=self.v2_body, timeout=self.timeout,
+                              headers={'Content-Type': 'application/json',
+                                       'Accept': 'application/json'})
+        if r.status_code != 200:
+            raise Exception('HTTP {0}'.format(r.status_code))
+        if not r.json()['access']['token']['id']:
+            raise Exception('No token issued')
+
+    def issue_v3(self):
+        r = self.session.post(self.v3_auth_url + '/auth/tokens',
+                              data=self.v3_body, timeout=self.timeout,
+                              headers={'Content-Type': 'application/json',
+                                       'Accept': 'application/json'})
+        if r.status_code != 201 or not r.headers.get('X-Subject-Token'):
+            raise Exception('HTTP {0}'.format(r.status_code))
+
+    def validate(self):
+        r = self.session.get(self.v3_auth_url + '/auth/tokens',
+                             timeout=self.timeout,
+                             headers={'Accept': 'application/json',
+                                      'X-Auth-Token': self.v3_token,
+                                      'X-Subject-Token': self.v3_token})
+        if r.status_code != 200:
+            raise Exception('HTTP {0}'.format(r.status_code))
+
+    def drive(self):
+        """
+        Description - Run the load, returning (operation, lag, latency,
+                      error) for every request started
+        """
+        calls = {'v2': self.issue_v2, 'v3': self.issue_v3,
+                 'validate': self.validate}
+        count = int(self.rate * self.duration)
+        start = time.time() + 0.1
+        due = Queue.Queue()
+        for index in range(count):
+            due.put((start + index / self.rate,
+                     self.operations[index % len(self.operations)]))
+
+        results = []
+        lock = threading.Lock()
+
+        def work():
+            while True:
+                try:
+                    scheduled, operation = due.get_nowait()
+                except Queue.Empty:
+                    return
+                time.sleep(max(scheduled - time.time(), 0))
+                st = time.time()
+                error = None
+                try:
+                    calls[operation]()
+                except Exception as e:
+                    error = e
+                en = time.time()
+                with lock:
+                    results.append((operation, st - scheduled,
+                                    en - scheduled, error))
+
+        threads = [threading.Thread(target=work, name='osfunc-load')
+                   for _ in range(self.concurrency)]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def report(self, label, results, elapsed):
+        latencies = [latency for _, _, latency, error in results
+                     if error is None]
+        errors = [error for _, _, _, error in results if error is not None]
+        summary = stats.summarize(latencies)
+        tps = len(latencies) / elapsed if elapsed else 0.0
+        error_rate = len(errors) / float(len(results)) if results else 0.0
+
+        self.success = not errors
+        self.failure = errors[0] if errors else None
+        if errors:
+            self.overall_success = False
+            self.logger.error('<*>%s Failed %s of %s %s', label, len(errors),
+                              len(results), errors[0])
+
+        self.logger.warning(
+            '<*> {0} - {1} requests - {2:.1f} tokens/s - {3:.1%} errors - '
+            'p50 {4:.4f} p99 {5:.4f} sec'.format(
+                label, len(results), tps, error_rate,
+                summary['p50'] or 0.0, summary['p99'] or 0.0))
+
+        monitoring.record(self, label + '_tps', tps)
+        monitoring.record(self, label + '_error_rate', error_rate)
+        for pct in ['p50', 'p90', 'p99']:
+            if summary[pct] is not None:
+                monitoring.record(self, '{0}_{1}'.format(label, pct),
+                                  summary[pct])
+
+    def load(self):
+        st = time.time()
+        results = self.drive()
+        en = time.time()
+        elapsed = en - st
+
+        for operation in self.operations:
+            self.report('load_' + operation,
+                        [result for result in results
+                         if result[0] == operation], elapsed)
+        self.report('load', results, elapsed)
+
+        lags = [lag for _, lag, _, _ in results]
+        monitoring.record(self, 'load_lag',
+                          sum(lags) / len(lags) if lags else 0.0)
+        monitoring.record(self, 'load', elapsed, st=st, en=en,
+                          kind=monitoring.TIMER)
+        self.failure = None
+
+    def run(self):
+        # The v3 token validated by the load, and a check of the
+        # credentials before loading the identity tier with them
+        self.authenticate_v3()
+
+        if self.overall_success is True:
+            self.connect_identity()
+            self.load()
+
+        if self.overall_success is True:
+            exit(0)
+        else:
+            exit(1)
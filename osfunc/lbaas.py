@@ -0,0 +1,147 @@
+import json
+import time
+
+import workers
+
+
+class LibraError(Exception):
+
+    def __init__(self, status_code, message):
+        Exception.__init__(self, 'HTTP {0}: {1}'.format(status_code, message))
+        self.status_code = status_code
+
+
+class LibraClient(object):
+    """
+    Description - Client for the Libra load balancer API (v1.1), called in
+                  process over a keep-alive session with the token shared
+                  by the other clients, see clients.libra
+
+                  Resources are returned as the dicts of the API, errors
+                  raised as LibraError.  A rejected token is renewed once
+                  through reauth, a callable returning a new token
+
+        libra_client = clients.libra(**kwargs)
+        lb = libra_client.create('TestLB', 443, 'TCP', 'ROUND_ROBIN',
+                                 [{'address': '15.125.5.8', 'port': 443}])
+    """
+
+    def __init__(self, endpoint, token, session, timeout=None, reauth=None):
+        self.endpoint = endpoint.rstrip('/')
+        self.token = token
+        self.session = session
+        self.timeout = timeout
+        self.reauth = reauth
+
+    def _request(self, method, path, body=None):
+        for attempt in range(2):
+            response = self.session.request(
+                method, self.endpoint + path,
+                data=None if body is None else json.dumps(body),
+                headers={'Accept': 'application/json',
+                         'Content-Type': 'application/json',
+                         'X-Auth-Token': self.token},
+                timeout=self.timeout)
+            if response.status_code == 401 and attempt == 0 and \
+                    self.reauth is not None:
+                self.token = self.reauth()
+                continue
+            break
+
+        if response.status_code >= 400:
+            try:
+                message = response.json().get('message') or response.text
+            except ValueError:
+                message = response.text
+            raise LibraError(response.status_code, message)
+        if response.content:
+            return response.json()
+        return None
+
+    # Load balancers
+
+    def list(self):
+        return self._request('GET', '/loadbalancers')['loadBalancers']
+
+    def get(self, lb_id):
+        return self._request('GET', '/loadbalancers/{0}'.format(lb_id))
+
+    def create(self, name, port, protocol, algorithm, nodes):
+        """
+        Description - Create a load balancer in front of nodes, a list of
+                      {'address': ..., 'port': ...}
+        """
+        return self._request('POST', '/loadbalancers', {
+            'name': name, 'port': str(port), 'protocol': protocol,
+            'algorithm': algorithm,
+            'nodes': [dict(node, port=str(node['port'])) for node in nodes]})
+
+    def update(self, lb_id, **fields):
+        return self._request('PUT', '/loadbalancers/{0}'.format(lb_id),
+                             fields)
+
+    def delete(self, lb_id):
+        return self._request('DELETE', '/loadbalancers/{0}'.format(lb_id))
+
+    # Nodes
+
+    def list_nodes(self, lb_id):
+        return self._request('GET', '/loadbalancers/{0}/nodes'
+                             .format(lb_id))['nodes']
+
+    def create_nodes(self, lb_id, nodes):
+        return self._request('POST', '/loadbalancers/{0}/nodes'.format(lb_id),
+                             {'nodes': [dict(node, port=str(node['port']))
+                                        for node in nodes]})['nodes']
+
+    def update_node(self, lb_id, node_id, **fields):
+        return self._request('PUT', '/loadbalancers/{0}/nodes/{1}'
+                             .format(lb_id, node_id), fields)
+
+    def delete_node(self, lb_id, node_id):
+        return self._request('DELETE', '/loadbalancers/{0}/nodes/{1}'
+                             .format(lb_id, node_id))
+
+    # Health monitor
+
+    def get_monitor(self, lb_id):
+        return self._request('GET', '/loadbalancers/{0}/healthmonitor'
+                             .format(lb_id))
+
+    def update_monitor(self, lb_id, **fields):
+        return self._request('PUT', '/loadbalancers/{0}/healthmonitor'
+                             .format(lb_id), fields)
+
+    def delete_monitor(self, lb_id):
+        return self._request('DELETE', '/loadbalancers/{0}/healthmonitor'
+                             .format(lb_id))
+
+
+def purge(client, prefix, max_workers, logger):
+    """
+    Description - Delete every load balancer whose name starts with prefix,
+                  found in a single listing, with at most max_workers
+                  deletes in flight
+
+                  Returns the number deleted, raises once all were tried
+                  when any of them could not be deleted
+    """
+    lbs = [lb for lb in client.list() if lb['name'].startswith(prefix)]
+
+    st = time.time()
+    results = workers.run_concurrently(lambda lb: client.delete(lb['id']),
+                                       lbs, max_workers)
+    failed = []
+    for lb, result, error in results:
+        if error is None:
+            logger.warning('deleting %s', lb['id'])
+        else:
+            failed.append(lb['id'])
+            logger.error('did not delete lb %s %s', lb['id'], error)
+
+    logger.warning('Purged %s of %s load balancers in %.2f sec',
+                   len(lbs) - len(failed), len(lbs), time.time() - st)
+    if failed:
+        raise Exception('Could not delete load balancers {0}'
+                        .format(', '.join(failed)))
+    return len(lbs)
@@ -1,9 +1,16 @@
-from libraclient.v1_1 import client as libra_client
-from subprocess import PIPE
-from time import sleep
+from sys import exit
 
-import subprocess
+import clients
 import monitoring
+import waiters
+
+# Longest time to wait for a load balancer to become ACTIVE or DEGRADED,
+# the libra CLI based check polled 29 times every 15 seconds
+LB_TIMEOUT = 435
+
+LB_NAME = 'TestLB'
+LB_NODE = {'address': '15.125.5.8', 'port': 443}
+EXTRA_NODE = {'address': '15.125.5.9', 'port': 443}
 
 
 class LibraCheck:
@@ -21,17 +28,21 @@ class LibraCheck:
         node_create_lb
         check_status
         node_update_lb
+        check_status
         node_delete_lb
         monitor_show
         monitor_update
         monitor_delete
         delete_lb
+
+                  Every step is a call to the load balancer API made in
+                  process by lbaas.LibraClient.  A node update leaves the
+                  loadbalancer in PENDING_UPDATE like any other change, so
+                  check_status runs before the node is deleted
     """
 
     def __init__(self, logger, exec_time, **kwargs):
-        self.libra_client = libra_client.LoadBalancerManager(
-            kwargs['os_tenant_name']
-        )
+        self.libra_client = clients.libra(**kwargs)
 
         # Setup logging
         self.logger = logger
@@ -42,6 +53,22 @@ class LibraCheck:
         self.failure = None
         self.overall_success = True
         self.tenant_name = kwargs['os_tenant_name']
+        self.lb_id = None
+        self.node_id = None
+
+    def _failed(self, step, e):
+        self.success, self.overall_success = False, False
+        self.failure = e
+        self.logger.error("<*>%s Failed %s", step, e)
+
+    def _extra_node(self):
+        """
+        Description - Id of the node added by node_create_lb
+        """
+        for node in self.libra_client.list_nodes(self.lb_id):
+            if node['address'] == EXTRA_NODE['address']:
+                return node['id']
+        raise Exception('Node {0} not found'.format(EXTRA_NODE['address']))
 
     @monitoring.timeit
     def list_lb(self):
@@ -51,21 +78,11 @@ class LibraCheck:
         """
         try:
             self.success = True
-            proc = subprocess.Popen(['libra', '--insecure', '--os-region-name',
-                                    self.region, 'list'])
-            proc.wait()
-            if proc.returncode == 0:
-                self.success = True
-            else:
-                self.success, self.overall_success = False, False
-                self.failure = "Return code " + str(proc.returncode)
-                self.logger.error(
-                    "<*>list_lb Failed return code %s", proc.returncode)
-
+            for lb in self.libra_client.list():
+                self.logger.warning('%s %s %s', lb['id'], lb['name'],
+                                    lb['status'])
         except Exception as e:
-            self.success, self.overall_success = False, False
-            self.failure = e
-            self.logger.error("<*>list_lb Failed %s", e)
+            self._failed('list_lb', e)
 
     @monitoring.timeit
     def create_lb(self):
@@ -73,45 +90,14 @@ class LibraCheck:
         Description - Creates a loadbalancer using the values provided
                       below
         """
-        name = "TestLB"
-        port = "443"
-        protocol = "TCP"
-        algorithm = "ROUND_ROBIN"
-        node = "15.125.5.8:443"
         try:
             self.success = True
-            proc = subprocess.Popen(['libra',
-                                     '--insecure',
-                                     '--os-region-name', self.region,
-                                     'create',
-                                     '--name', name,
-                                     '--port', port,
-                                     '--protocol', protocol,
-                                     '--algorithm', algorithm,
-                                     '--node', node], stdout=PIPE)
-            proc.wait()
-            outs, err = proc.communicate()
-            sum_output = ''
-            for lists in outs:
-                sum_output = sum_output + lists
-                if lists == '\n':
-                    if "Id" in sum_output:
-                        sum_split = sum_output.split()
-                        self.lb_id = sum_split[3]
-                        sum_output = ""
-                    else:
-                        sum_output = ""
-            if proc.returncode == 0:
-                self.success = True
-            else:
-                self.success, self.overall_success = False, False
-                self.failure = "Return code " + str(proc.returncode)
-                self.logger.error("<*>create_lb Failed return code %s",
-                                  proc.returncode)
+            lb = self.libra_client.create(LB_NAME, 443, 'TCP', 'ROUND_ROBIN',
+                                          [LB_NODE])
+            self.lb_id = lb['id']
+            self.logger.warning('Created loadbalancer %s', self.lb_id)
         except Exception as e:
-            self.success, self.overall_success = False, False
-            self.failure = e
-            self.logger.error("<*>create_lb Failed %s", e)
+            self._failed('create_lb', e)
 
     @monitoring.timeit
     def check_status(self):
@@ -119,59 +105,39 @@ class LibraCheck:
         Description - Wait for newly created instance to change to active
                        or degraded status or to fail
         """
-        self.lb_status = ""
-        for x in range(1, 30):
-            try:
-                self.success = True
-                proc = subprocess.Popen(['libra',
-                                         '--insecure',
-                                         '--os-region-name', self.region,
-                                         'show', self.lb_id], stdout=PIPE)
-                proc.wait()
-                outs, err = proc.communicate()
-                sum_output = ''
-                for lists in outs:
-                    sum_output = sum_output + lists
-                    if lists == '\n':
-                        if "Status" in sum_output:
-                            sum_split = sum_output.split()
-                            self.lb_status = sum_split[3]
-                            self.logger.warning("Status %s", self.lb_status)
-                            sum_output = ""
-                        else:
-                            sum_output = ""
-                        if self.lb_status == "ACTIVE" or \
-                            self.lb_status == "DEGRADED":
-                                return True
-                sleep(15)
-            except Exception as e:
-                self.success, self.overall_success = False, False
-                self.failure = e
-                self.logger.error("<*>check_status Failed %s", e)
-                exit(1)
 
-        self.success, self.overall_success = False, False
-        self.logger.error("<*>check_status timed out")
-        exit(1)
+        def probe():
+            status = self.libra_client.get(self.lb_id)['status']
+            self.logger.warning("Status %s", status)
+            return status
+
+        try:
+            self.success = True
+            self.lb_status, self.observed_at = waiters.wait_for(
+                probe,
+                lambda status: status in ('ACTIVE', 'DEGRADED', 'ERROR'),
+                timeout=LB_TIMEOUT, max_interval=15)
+        except waiters.WaitTimeout:
+            self.success, self.overall_success = False, False
+            self.failure = 'TimeOut'
+            self.logger.error("<*>check_status timed out")
+            exit(1)
+        except Exception as e:
+            self._failed('check_status', e)
+            exit(1)
+
+        if self.lb_status == 'ERROR':
+            self._failed('check_status', 'ErrorStatus')
+            exit(1)
+        return True
 
     @monitoring.timeit
     def delete_lb(self):
         try:
-            proc = subprocess.Popen(['libra', '--insecure',
-                                     '--os-region-name', self.region,
-                                     'delete', self.lb_id])
-            proc.wait()
-            if proc.returncode == 0:
-                self.success = True
-            else:
-                self.success, self.overall_success = False, False
-                self.failure = "Return code " + str(proc.returncode)
-                self.logger.error("<*>delete_lb Failed return code %s",
-                                  proc.returncode)
+            self.success = True
+            self.libra_client.delete(self.lb_id)
         except Exception as e:
-            self.success, self.overall_success = False, False
-            self.failure = e
-            self.logger.error("<*>delete_lb Failed %s", e)
+            self._failed('delete_lb', e)
 
     @monitoring.timeit
     def update_lb(self):
@@ -179,44 +145,23 @@ class LibraCheck:
         Description - Updates the algorithm value the loadbalancer matching
                       self.lb_id
         """
-        algorithm = "LEAST_CONNECTIONS"
         try:
             self.success = True
-            proc = subprocess.Popen(['libra', '--insecure',
-                                     '--os-region-name', self.region,
-                                     'update', '--algorithm',
-                                     algorithm, self.lb_id])
-            proc.wait()
-            if proc.returncode == 0:
-                self.success = True
-            else:
-                self.success, self.overall_success = False, False
-                self.failure = "Return code " + str(proc.returncode)
-                self.logger.error("<*>update_lb Failed return code %s",
-                                  proc.returncode)
+            self.libra_client.update(self.lb_id,
+                                     algorithm='LEAST_CONNECTIONS')
         except Exception as e:
-            self.success, self.overall_success = False, False
-            self.failure = e
-            self.logger.error("<*>update_lb Failed %s", e)
+            self._failed('update_lb', e)
 
     @monitoring.timeit
     def node_list_lb(self):
         try:
-            proc = subprocess.Popen(['libra', '--insecure',
-                                     '--os-region-name', self.region,
-                                     'node-list', self.lb_id])
-            proc.wait()
-            if proc.returncode == 0:
-                self.success = True
-            else:
-                self.success, self.overall_success = False, False
-                self.failure = "Return code " + str(proc.returncode)
-                self.logger.error("<*>node_list_lb Failed return code %s",
-                                  proc.returncode)
+            self.success = True
+            for node in self.libra_client.list_nodes(self.lb_id):
+                self.logger.warning('%s %s:%s %s', node['id'],
+                                    node['address'], node['port'],
+                                    node['condition'])
         except Exception as e:
-            self.success, self.overall_success = False, False
-            self.failure = e
-            self.logger.error("<*>node_list_lb Failed %s", e)
+            self._failed('node_list_lb', e)
 
     @monitoring.timeit
     def node_create_lb(self):
@@ -224,23 +169,10 @@ class LibraCheck:
         Description - Creates a node on the loadbalancer self.lb_id
         """
         try:
-            proc = subprocess.Popen(
-                ['libra', '--insecure', '--os-region-name', self.region,
-                 'node-create', '--node',
-                 '15.125.5.9:443', self.lb_id], stdout=PIPE)
-            proc.wait()
-            if proc.returncode == 0:
-                self.success = True
-            else:
-                self.success, self.overall_success = False, False
-                self.failure = "Return code " + str(proc.returncode)
-                self.logger.error("<*>node_create_lb Failed return code %s",
-                                  proc.returncode)
-                exit(1)
+            self.success = True
+            self.libra_client.create_nodes(self.lb_id, [EXTRA_NODE])
         except Exception as e:
-            self.success, self.overall_success = False, False
-            self.failure = e
-            self.logger.error("<*>node_create_lb Failed %s", e)
+            self._failed('node_create_lb', e)
             exit(1)
 
     @monitoring.timeit
@@ -251,38 +183,10 @@ class LibraCheck:
         """
         try:
             self.success = True
-            proc = subprocess.Popen(['libra', '--insecure',
-                                     '--os-region-name', self.region,
-                                     'node-list', self.lb_id],
-                                    stdout=PIPE)
-            proc.wait()
-            outs, err = proc.communicate()
-            sum_output = ''
-            for lists in outs:
-                sum_output = sum_output + lists
-                if lists == '\n':
-                    sum_output = ''
-                if '15.125.5.9' in sum_output:
-                    sum_split = sum_output.split()
-                    self.node_id = sum_split[1]
-                    proc = subprocess.Popen(['libra', '--insecure',
-                                             '--os-region-name',
-                                             self.region, 'node-delete',
-                                             self.lb_id, self.node_id])
-                    proc.wait()
-                    if proc.returncode == 0:
-                        self.success = True
-                    else:
-                        self.success, self.overall_success = False, False
-                        self.failure = "Return code " + str(proc.returncode)
-                        self.logger.error(
-                            "<*>node_delete_lb Failed return code %s",
-                            proc.returncode)
-                    break
+            self.node_id = self._extra_node()
+            self.libra_client.delete_node(self.lb_id, self.node_id)
         except Exception as e:
-            self.success, self.overall_success = False, False
-            self.failure = e
-            self.logger.error("<*>node_delete_lb Failed %s", e)
+            self._failed('node_delete_lb', e)
 
     @monitoring.timeit
     def node_update_lb(self):
@@ -292,39 +196,11 @@ class LibraCheck:
         """
         try:
             self.success = True
-            proc = subprocess.Popen(['libra', '--insecure',
-                                     '--os-region-name', self.region,
-                                     'node-list', self.lb_id],
-                                    stdout=PIPE)
-            proc.wait()
-            outs, err = proc.communicate()
-            sum_output = ''
-            for lists in outs:
-                sum_output = sum_output + lists
-                if lists == '\n':
-                    sum_output = ''
-                if '15.125.5.9' in sum_output:
-                    sum_split = sum_output.split()
-                    self.node_id = sum_split[1]
-                    proc = subprocess.Popen(
-                        ['libra', '--insecure',
-                         '--os-region-name', self.region,
-                         'node-update', self.lb_id,
-                         self.node_id, '--condition', 'ENABLED'])
-                    proc.wait()
-                    if proc.returncode == 0:
-                        self.success = True
-                    else:
-                        self.success, self.overall_success = False, False
-                        self.failure = "Return code " + str(proc.returncode)
-                        self.logger.error(
-                            "<*>node_update_lb Failed return code %s",
-                            proc.returncode)
-                    break
+            self.node_id = self._extra_node()
+            self.libra_client.update_node(self.lb_id, self.node_id,
+                                          condition='ENABLED')
         except Exception as e:
-            self.success, self.overall_success = False, False
-            self.failure = e
-            self.logger.error("<*>node_update_lb Failed %s", e)
+            self._failed('node_update_lb', e)
 
     @monitoring.timeit
     def monitor_show(self):
@@ -333,21 +209,11 @@ class LibraCheck:
                       self.lb_id
         """
         try:
-            proc = subprocess.Popen(['libra', '--insecure',
-                                     '--os-region-name', self.region,
-                                     'monitor-show', self.lb_id])
-            proc.wait()
-            if proc.returncode == 0:
-                self.success = True
-            else:
-                self.success, self.overall_success = False, False
-                self.failure = "Return code " + str(proc.returncode)
-                self.logger.error("<*>monitor_show_lb Failed return code %s",
-                                  proc.returncode)
+            self.success = True
+            self.logger.warning('Monitor %s',
+                                self.libra_client.get_monitor(self.lb_id))
         except Exception as e:
-            self.success, self.overall_success = False, False
-            self.failure = e
-            self.logger.error("<*>monitor_show_lb Failed %s", e)
+            self._failed('monitor_show_lb', e)
 
     @monitoring.timeit
     def monitor_update(self):
@@ -356,22 +222,12 @@ class LibraCheck:
                       self.lb_id
         """
         try:
-            proc = subprocess.Popen(['libra', '--insecure',
-                                     '--os-region-name', self.region,
-                                     'monitor-update', self.lb_id])
-            proc.wait()
-            if proc.returncode == 0:
-                self.success = True
-            else:
-                self.success, self.overall_success = False, False
-                self.failure = "Return code " + str(proc.returncode)
-                self.logger.error(
-                    "<*>monitor_update_lb Failed return code %s",
-                    proc.returncode)
+            self.success = True
+            self.libra_client.update_monitor(
+                self.lb_id, type='CONNECT', delay='30', timeout='30',
+                attemptsBeforeDeactivation='2')
         except Exception as e:
-            self.success, self.overall_success = False, False
-            self.failure = e
-            self.logger.error("<*>monitor_update_lb Failed %s", e)
+            self._failed('monitor_update_lb', e)
 
     @monitoring.timeit
     def monitor_delete(self):
@@ -380,21 +236,10 @@ class LibraCheck:
                       self.lb_id and create a new one
         """
         try:
-            proc = subprocess.Popen(['libra', '--insecure',
-                                     '--os-region-name', self.region,
-                                     'monitor-delete', self.lb_id])
-            proc.wait()
-            if proc.returncode == 0:
-                self.success = True
-            else:
-                self.success, self.overall_success = False, False
-                self.failure = "Return code " + str(proc.returncode)
-                self.logger.error("<*>monitor_delete_lb Failed return code %s",
-                                  proc.returncode)
+            self.success = True
+            self.libra_client.delete_monitor(self.lb_id)
         except Exception as e:
-            self.success, self.overall_success = False, False
-            self.failure = e
-            self.logger.error("<*>monitor_delete_lb Failed %s", e)
+            self._failed('monitor_delete_lb', e)
 
     def run(self):
 
@@ -407,6 +252,7 @@ class LibraCheck:
         self.node_create_lb()
         self.check_status()
         self.node_update_lb()
+        self.check_status()
         self.node_delete_lb()
         self.monitor_show()
         self.monitor_update()
@@ -0,0 +1,106 @@
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy import (Column, Float, Integer, String, Text, DateTime,
+                        Boolean, Index)
+
+Base = declarative_base()
+
+
+class ModuleRecs(Base):
+
+    """
+    This class is responsible for creating the DB tables - if they don't already exist
+
+    Database Configuration
+    To log to a DB, export OS_DB_STRING as defined in:
+    http://docs.sqlalchemy.org/en/rel_0_9/core/engines.html
+    For example: export OS_DB_STRING=mysql://<user>:<password>@<host>/<db_name>
+
+    Reports filter on service and step or on region and zone over a range of
+    exec_time, both are served by an index.  Tables created before the
+    indexes existed are migrated with osfunc schema migrate, see schema.py
+
+    """
+
+    __tablename__ = 'module_recs'
+    __table_args__ = (
+        Index('ix_module_recs_service_name_exec_time',
+              'service', 'name', 'exec_time'),
+        Index('ix_module_recs_region_zone_exec_time',
+              'region', 'zone', 'exec_time'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    service = Column(String(128))
+    exec_time = Column(DateTime)
+    name = Column(String(128))
+    run_time = Column(Float)
+    success = Column(Boolean)
+    failure_reason = Column(Text)
+    zone = Column(String(64))
+    region = Column(String(64))
+    tenant_name = Column(String(64))
+    function_run_time = Column(DateTime)
+
+
+class ModuleRollups(Base):
+
+    """
+    Latency rollups of module_recs, one row per service, step, region, zone
+    and time bucket written by each osfunc process.  histogram holds the
+    serialised histogram.Histogram so rows of the same bucket can be merged
+    exactly, see rollups.query
+
+    """
+
+    __tablename__ = 'module_rollups'
+    __table_args__ = (
+        Index('ix_module_rollups_service_name_bucket_start',
+              'service', 'name', 'bucket_start'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    service = Column(String(128))
+    name = Column(String(128))
+    region = Column(String(64))
+    zone = Column(String(64))
+    bucket_start = Column(DateTime)
+    bucket_seconds = Column(Integer)
+    count = Column(Integer)
+    failures = Column(Integer)
+    p50 = Column(Float)
+    p90 = Column(Float)
+    p99 = Column(Float)
+    max = Column(Float)
+    histogram = Column(Text)
+
+
+class ServerTimeline(Base):
+
+    """
+    Every change of status, task_state and vm_state seen while waiting on
+    a server, one row per change, see timeline.Timeline.  elapsed is the
+    time in seconds since the wait, or the boot request, began and keeps
+    the sub-second precision observed_at may lose on some databases
+
+    """
+
+    __tablename__ = 'server_timeline'
+    __table_args__ = (
+        Index('ix_server_timeline_service_name_observed_at',
+              'service', 'name', 'observed_at'),
+        Index('ix_server_timeline_instance_id', 'instance_id'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    service = Column(String(128))
+    exec_time = Column(DateTime)
+    name = Column(String(128))
+    instance_id = Column(String(64))
+    status = Column(String(32))
+    task_state = Column(String(64))
+    vm_state = Column(String(32))
+    observed_at = Column(DateTime)
+    elapsed = Column(Float)
+    zone = Column(String(64))
+    region = Column(String(64))
+    tenant_name = Column(String(64))
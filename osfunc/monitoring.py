@@ -1,3 +1,4 @@
+import atexit
 import time
 import datetime
 
@@ -5,61 +6,92 @@ from os import environ
 
 from functools import wraps
 from random import randint
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import (Column, Float, Integer, String, Sequence,
-                        Text, DateTime, ForeignKey, Boolean)
-from sqlalchemy.exc import OperationalError
 
 try:
     db_string = environ['OS_DB_STRING']
 except KeyError:
     db_string = None
 
-sql_conn = False
-Base = declarative_base()
+# Results are queued and bulk inserted by a background thread, see
+# writer.BufferedWriter - rows that cannot be written are spilled to
+# OS_DB_SPILL and replayed once the database is reachable again
+db_spill = environ.get('OS_DB_SPILL', '~/.osfunc/module_recs.spill')
+db_batch_size = int(environ.get('OS_DB_BATCH_SIZE', 100))
+db_flush_interval = float(environ.get('OS_DB_FLUSH_INTERVAL', 5))
+db_queue_size = int(environ.get('OS_DB_QUEUE_SIZE', 10000))
 
-if db_string is not None:
-    engine = create_engine(db_string,
-                           connect_args={'connect_timeout': 5})
+# Step latencies are also summarised into module_rollups histograms per time
+# bucket of this many seconds, 0 disables them
+db_rollup_seconds = int(environ.get('OS_DB_ROLLUP_SECONDS', 300))
 
-    Session = sessionmaker(bind=engine)
-    session = Session()
-    sql_conn = True
+sql_conn = False
 
+# Kinds of measurement passed to record, a timer is the duration of a step
+# or of an operation, a gauge any other value such as a rate, a count or a
+# percentile computed by the check
+TIMER = 'timer'
+GAUGE = 'gauge'
 
-class ModuleRecs(Base):
+# Callables run as observer(check, run, st, en) after every timed step with
+# the run envelope built by timeit and the time.time() the step started and
+# ended, see bench.BenchCheck
+observers = []
 
-    """
-    This class is responsible for creating the DB tables - if they don't already exist
+# Every measurement is also streamed as a StatsD metric to OS_STATSD
+# (host:port) and as a JSON line to OS_METRICS_FILE when they are set, see
+# exporters.py - in daemon mode --status-port serves them on /metrics too
+statsd_address = environ.get('OS_STATSD')
+statsd_prefix = environ.get('OS_STATSD_PREFIX', 'osfunc')
+metrics_file = environ.get('OS_METRICS_FILE')
 
-    Database Configuration
-    To log to a DB, export OS_DB_STRING as defined in:
-    http://docs.sqlalchemy.org/en/rel_0_9/core/engines.html
-    For example: export OS_DB_STRING=mysql://<user>:<password>@<host>/<db_name>
+if statsd_address:
+    from exporters import StatsdExporter
 
-    """
+    observers.append(StatsdExporter(statsd_address, statsd_prefix))
 
-    __tablename__ = 'module_recs'
+if metrics_file:
+    from exporters import JsonLinesExporter
 
-    id = Column(Integer, primary_key=True)
-    service = Column(String(128))
-    exec_time = Column(DateTime)
-    name = Column(String(128))
-    run_time = Column(Float)
-    success = Column(Boolean)
-    failure_reason = Column(Text)
-    zone = Column(Text)
-    region = Column(Text)
-    tenant_name = Column(Text)
-    function_run_time = Column(DateTime)
+    metrics_exporter = JsonLinesExporter(metrics_file)
+    observers.append(metrics_exporter)
+    atexit.register(metrics_exporter.close)
 
+# SQLAlchemy is only imported when results are logged to a database, it is
+# one of the slowest imports of a short lived osfunc process
 if db_string is not None:
+    from sqlalchemy import create_engine
+    from sqlalchemy.exc import OperationalError
+
+    from models import Base, ModuleRecs
+    from writer import BufferedWriter
+
+    engine = create_engine(db_string,
+                           connect_args={'connect_timeout': 5})
+    sql_conn = True
+
+    tables_created = False
     try:
         Base.metadata.create_all(engine)
+        tables_created = True
     except OperationalError:
-        sql_conn = False
+        # The database is unreachable, results are spilled by the writer
+        # which creates the tables before replaying them once it is back
+        pass
+
+    writer = BufferedWriter(engine, Base.metadata, db_spill,
+                            batch_size=db_batch_size,
+                            flush_interval=db_flush_interval,
+                            max_queue=db_queue_size,
+                            tables_created=tables_created)
+
+    if db_rollup_seconds > 0:
+        from rollups import Rollups
+
+        rollups = Rollups(writer, db_rollup_seconds)
+        observers.append(rollups.observe)
+        # Registered after the writer so it runs, and queues the open
+        # buckets, before the writer is closed
+        atexit.register(rollups.flush)
 
 
 def timeit(f):
@@ -67,64 +99,104 @@ def timeit(f):
 
     Decorator function which times the function being
     decorated and displays a boolean for success or failure
-    The function optionally inserts the timestamp, service name,
-    run time, and success / failure into the DB
+    The function optionally queues the timestamp, service name,
+    run time, and success / failure for insertion into the DB
+
+    A step that waits on a resource may set self.observed_at to the
+    time.time() at which the state it waited for was first seen, the
+    step is then timed up to that point rather than to its return
 
     """
 
     @wraps(f)
     def timed(self):
         st = time.time()
+        self.observed_at = None
         result = f(self)
-        en = time.time()
-
-        function_run_time = datetime.datetime.now()
+        en = self.observed_at or time.time()
+        self.observed_at = None
 
         self.logger.warn('<*> {0} - Executed in: {1:.2f} sec - {2}'.
                          format(f.__name__, en - st, self.success))
 
-        message = {
-            'service': self.service,
-            'exec_time': str(self.exec_time),
-            'name': f.__name__,
-            'run_time': '{0:.2f}'.format(en - st),
-            'success': self.success,
-            'failure_reason': str(self.failure)
-        }
-
-        run = {
-            'msg_type': 'snapshot',
-            'record_id': self.service + '_OperationalMonitoring-{}'.format(randint(1, 10**10)),
-            'source':
-                {
-                    'system': 'jenkins.noctesting.com',
-                    'type': 'jenkins',
-                    'location': 'AE1'
-                },
-            'batch_ts': int(self.exec_time.strftime('%s')),
-            'record_ts': int(self.exec_time.strftime('%s')),
-            'version':
-                {
-                    'major': '0.0.1'
-                },
-            'payload': message
-        }
-        if sql_conn:
-            entry = ModuleRecs(service=self.service,
-                               exec_time=self.exec_time,
-                               name=f.__name__,
-                               run_time='{0:.2f}'.format(en - st),
-                               success=self.success,
-                               failure_reason=self.failure,
-                               zone=self.zone,
-                               region=self.region,
-                               tenant_name=self.tenant_name,
-                               function_run_time=function_run_time)
-
-            session.add(entry)
-            session.commit()
+        record(self, f.__name__, round(en - st, 2), st=st, en=en,
+               kind=TIMER)
 
         self.failure = None
 
         return result
     return timed
+
+
+def record(self, name, value, st=None, en=None, success=None, failure=None,
+           kind=GAUGE):
+    """
+
+    Publish a measurement named name taken by check self to the observers
+    and queue it for insertion into the DB as a module_recs row, value is
+    stored in the run_time column.  timeit records the duration of every
+    step this way, benchmarks use it for rates and percentiles
+
+    success and failure default to self.success and self.failure, st and
+    en to the time.time() the measurement was taken.  kind is TIMER for
+    durations, which the observers summarise as latencies, GAUGE otherwise
+
+    """
+    if en is None:
+        en = time.time()
+    if st is None:
+        st = en
+    if success is None:
+        success = self.success
+    if failure is None:
+        failure = self.failure
+
+    function_run_time = datetime.datetime.now()
+
+    message = {
+        'service': self.service,
+        'exec_time': str(self.exec_time),
+        'name': name,
+        'run_time': '{0:.6g}'.format(value),
+        'success': success,
+        'failure_reason': str(failure),
+        'kind': kind
+    }
+
+    run = {
+        'msg_type': 'snapshot',
+        'record_id': self.service + '_OperationalMonitoring-{}'.format(randint(1, 10**10)),
+        'source':
+            {
+                'system': 'jenkins.noctesting.com',
+                'type': 'jenkins',
+                'location': 'AE1'
+            },
+        'batch_ts': int(self.exec_time.strftime('%s')),
+        'record_ts': int(self.exec_time.strftime('%s')),
+        'version':
+            {
+                'major': '0.0.1'
+            },
+        'payload': message
+    }
+    for observer in observers:
+        try:
+            observer(self, run, st, en)
+        except Exception as e:
+            self.logger.error('Observer %s Failed %s', observer, e)
+
+    if sql_conn:
+        entry = {'service': self.service,
+                 'exec_time': self.exec_time,
+                 'name': name,
+                 'run_time': value,
+                 'success': success,
+                 'failure_reason': None if failure is None
+                 else str(failure),
+                 'zone': self.zone,
+                 'region': self.region,
+                 'tenant_name': self.tenant_name,
+                 'function_run_time': function_run_time}
+
+        writer.put(ModuleRecs.__tablename__, entry)
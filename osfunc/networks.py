@@ -1,3 +1,4 @@
+import discovery
 import monitoring
 from neutronclient.common import exceptions as neutron_exceptions
 import time
@@ -13,8 +14,16 @@ def select_network(self):
                   'neutron'
 
                   This is done to ensure that one of the networks Created
-                  by these scripts are not used.
+                  by these scripts are not used.  The network cached by an
+                  earlier run is reused
     """
+    cached = discovery.cached(self, 'network')
+    if cached is not None:
+        self.success = True
+        self.network = cached
+        self.logger.warning('Selected network {}'.format(self.network['name']))
+        return
+
     try:
         for network in self.neutron_client.list_networks()['networks']:
             self.success = True
@@ -26,6 +35,7 @@ def select_network(self):
                 self.network = network
                 break
         self.logger.warning('Selected network {}'.format(self.network['name']))
+        discovery.store(self, 'network', self.network)
     except neutron_exceptions.NotFound as e:
         self.success, self.overall_success = False, False
         self.failure = e
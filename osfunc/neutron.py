@@ -3,9 +3,7 @@ import subnets
 import ports
 import routers
 import floating_ip
-
-from novaclient.v1_1 import client as nova_client
-from neutronclient.v2_0 import client as neutron_client
+import clients
 
 
 class NeutronCheck:
@@ -43,20 +41,8 @@ class NeutronCheck:
         delete_network
     """
     def __init__(self, logger, exec_time, **kwargs):
-        self.neutron_client = neutron_client.Client(
-            username=kwargs['os_username'],
-            password=kwargs['os_password'],
-            tenant_name=kwargs['os_tenant_name'],
-            auth_url=kwargs['os_auth_url'],
-            region_name=kwargs['os_region']
-        )
-        self.nova_client = nova_client.Client(
-            kwargs['os_username'],
-            kwargs['os_password'],
-            kwargs['os_tenant_name'],
-            kwargs['os_auth_url'],
-            region_name=kwargs['os_region']
-        )
+        self.neutron_client = clients.neutron(**kwargs)
+        self.nova_client = clients.nova(**kwargs)
 
         self.logger = logger
         self.exec_time = exec_time
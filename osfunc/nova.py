@@ -4,13 +4,33 @@ import servers
 import keypairs
 import networks
 import floating_ip
+import clients
+import discovery
+import copy
+import logging
+import monitoring
+import workers
 
-from novaclient.v1_1 import client as nova_client
 from novaclient import exceptions as nova_exceptions
-from neutronclient.v2_0 import client as neutron_client
 from sys import exit
 from time import sleep
 
+# Zone recorded for the steps the zones of --nova-zones share, the zone
+# column only ever holds real zones otherwise
+ALL_ZONES = 'all'
+
+
+class _ZoneLogger(logging.LoggerAdapter):
+    """
+    Description - Append the zone to the messages of a zone's workflow so
+                  the concurrent workflows can be told apart
+    """
+
+    warn = logging.LoggerAdapter.warning
+
+    def process(self, msg, kwargs):
+        return '{0} [{1}]'.format(msg, self.extra['zone']), kwargs
+
 
 class NovaCheck:
     """
@@ -75,24 +95,27 @@ class NovaCheck:
         Cleanup routines
             delete_floating
             delete_instance
+
+                  With --nova-zones, a comma separated list of zones or
+                  'all' for every available zone, the checks up to the
+                  image, keypair and network selection run once and the
+                  instance workflow, from create instance on, then runs in
+                  every zone concurrently.  Their steps are recorded with
+                  the zone they ran in, the shared ones with the list of
+                  zones
     """
 
     def __init__(self, logger, exec_time, **kwargs):
-        self.nova_client = nova_client.Client(
-            kwargs['os_username'],
-            kwargs['os_password'],
-            kwargs['os_tenant_name'],
-            kwargs['os_auth_url'],
-            region_name=kwargs['os_region']
-        )
-
-        self.neutron_client = neutron_client.Client(
-            username=kwargs['os_username'],
-            password=kwargs['os_password'],
-            tenant_name=kwargs['os_tenant_name'],
-            auth_url=kwargs['os_auth_url'],
-            region_name=kwargs['os_region']
-        )
+        self.nova_zones = kwargs.get('nova_zones')
+        if self.nova_zones:
+            # The zones run on threads of their own, each needs its own
+            # clients - they share the cached token
+            self.nova_client = clients.PerThread(clients.nova, **kwargs)
+            self.neutron_client = clients.PerThread(clients.neutron,
+                                                    **kwargs)
+        else:
+            self.nova_client = clients.nova(**kwargs)
+            self.neutron_client = clients.neutron(**kwargs)
 
         self.logger = logger
         self.exec_time = exec_time
@@ -106,8 +129,38 @@ class NovaCheck:
         self.region = kwargs['os_region']
         self.ssh_timeout = kwargs['ssh_timeout']
         self.tenant_name = kwargs['os_tenant_name']
+        self.discovery = discovery.Cache(**kwargs)
+
+    @monitoring.timeit
+    def select_zones(self):
+        """
+        Description - Set self.zones to the zones of --nova-zones, listing
+                      the available ones for 'all'
+        """
+        try:
+            self.success = True
+            if self.nova_zones.strip() == 'all':
+                self.zones = [
+                    zone.zoneName for zone in
+                    self.nova_client.availability_zones.list(detailed=False)
+                    if zone.zoneState.get('available')]
+            else:
+                self.zones = [zone.strip() for zone in
+                              self.nova_zones.split(',') if zone.strip()]
+            if not self.zones:
+                raise Exception('No availability zone')
+            self.logger.warning('Selected zones %s', ', '.join(self.zones))
+        except Exception as e:
+            self.success, self.overall_success = False, False
+            self.failure = e
+            self.logger.error("<*>select_zones Failed %s", e)
+            exit(1)
 
-    def run(self):
+    def check_shared(self):
+        """
+        Description - The checks that do not depend on the zone and the
+                      selections the instance workflow uses
+        """
 
         # Add sec_group rule
         floating_ip.create_delete_security_group(self)
@@ -127,6 +180,11 @@ class NovaCheck:
         keypairs.select_keypair(self)
         networks.select_network(self)
 
+    def check_instance(self):
+        """
+        Description - Create an instance in self.zone and take it through
+                      its lifecycle
+        """
         servers.create_instance(self)
         servers.check_active(self)
 
@@ -165,6 +223,44 @@ class NovaCheck:
 
         sleep(5)
 
+    def check_zone(self, zone):
+        """
+        Description - Run the instance workflow in zone on a copy of this
+                      check sharing its clients and selections, returning
+                      whether it succeeded
+        """
+        check = copy.copy(self)
+        check.zone = zone
+        check.logger = _ZoneLogger(self.logger, {'zone': zone})
+        try:
+            check.check_instance()
+        except SystemExit:
+            # A step that cannot continue exits the zone's workflow only
+            check.overall_success = False
+        return check.overall_success is True
+
+    def check_zones(self):
+        self.zone = ALL_ZONES
+        self.select_zones()
+        self.check_shared()
+        if self.overall_success is not True:
+            return
+
+        for zone, success, error in workers.run_concurrently(
+                self.check_zone, self.zones, len(self.zones)):
+            if error is not None:
+                self.logger.error('<*>%s Failed %s', zone, error)
+            if success is not True:
+                self.overall_success = False
+
+    def run(self):
+
+        if self.nova_zones:
+            self.check_zones()
+        else:
+            self.check_shared()
+            self.check_instance()
+
         if self.overall_success is True:
             exit(0)
         else:
@@ -1,18 +1,13 @@
+import clients
+import lbaas
 import monitoring
-import subprocess
 import cdn
+import servers
+import volumes
 
-from subprocess import PIPE
-
-from neutronclient.v2_0 import client as neutron_client
-from novaclient.v1_1 import client as nova_client
-from cinderclient.v1 import client as cinder_client
 from cinderclient import exceptions as cinder_exceptions
-from designateclient.v1 import Client as Designate
 from novaclient import exceptions as nova_exceptions
-from troveclient.v1 import client
-from keystoneclient.v2_0 import client as keystone_client
-from swiftclient import Connection, RequestException
+from swiftclient import RequestException
 
 
 class PurgeCheck:
@@ -50,69 +45,17 @@ class PurgeCheck:
     """
 
     def __init__(self, logger, exec_time, **kwargs):
-        self.neutron_client = neutron_client.Client(
-            username=kwargs['os_username'],
-            password=kwargs['os_password'],
-            tenant_name=kwargs['os_tenant_name'],
-            auth_url=kwargs['os_auth_url'],
-            region_name=kwargs['os_region']
-        )
-        self.nova_client = nova_client.Client(
-            kwargs['os_username'],
-            kwargs['os_password'],
-            kwargs['os_tenant_name'],
-            kwargs['os_auth_url'],
-            region_name=kwargs['os_region']
-        )
-        self.cinder_client = cinder_client.Client(
-            kwargs['os_username'],
-            kwargs['os_password'],
-            kwargs['os_tenant_name'],
-            kwargs['os_auth_url'],
-            region_name=kwargs['os_region'],
-            service_type="volume"
-        )
-        self.client = client.Client(
-            kwargs['os_username'],
-            kwargs['os_password'],
-            kwargs['os_tenant_name'],
-            kwargs['os_auth_url'],
-            region_name=kwargs['os_region'],
-        )
-        self.keystone_client = keystone_client.Client(
-            username=kwargs['os_username'],
-            password=kwargs['os_password'],
-            tenant_name=kwargs['os_tenant_name'],
-            auth_url=kwargs['os_auth_url']
-        )
-
-        self.designate_client = Designate(
-            auth_url=kwargs['os_auth_url'],
-            username=kwargs['os_username'],
-            password=kwargs['os_password'],
-            tenant_name=kwargs['os_tenant_name'],
-            region_name=kwargs['os_region'],
-            service_type='hpext:dns'
-        )
-
-        self.swift_cdn_client = Connection(
-            user=kwargs['os_username'],
-            key=kwargs['os_password'],
-            tenant_name=kwargs['os_tenant_name'],
-            authurl=kwargs['os_auth_url'],
-            auth_version="2.0",
-            os_options={'region_name': kwargs['os_region'],
-                        'service_type': 'hpext:cdn'}
-        )
-
-        self.swift_client = Connection(
-            user=kwargs['os_username'],
-            key=kwargs['os_password'],
-            tenant_name=kwargs['os_tenant_name'],
-            authurl=kwargs['os_auth_url'],
-            auth_version="2.0",
-            os_options={'region_name': kwargs['os_region']}
-        )
+        self.neutron_client = clients.neutron(**kwargs)
+        self.nova_client = clients.nova(**kwargs)
+        self.cinder_client = clients.cinder(**kwargs)
+        self.client = clients.trove(**kwargs)
+        self.keystone_client = clients.keystone(**kwargs)
+
+        self.designate_client = clients.designate(**kwargs)
+
+        self.swift_cdn_client = clients.cdn(**kwargs)
+
+        self.swift_client = clients.swift(**kwargs)
 
         #self.cdn_client = cdn.Client(
         #    self.token, self.tenant_id, kwargs['os_region'], self.END_POINTS
@@ -127,6 +70,14 @@ class PurgeCheck:
         self.success = True
         self.overall_success = True
         self.purge_service = kwargs['os_purge_service']
+        self.concurrency = int(kwargs.get('cleanup_concurrency') or 8)
+
+        # Only built when needed, not every cloud has a Libra endpoint
+        self.libra_client = None
+        if self.purge_service == 'libra':
+            self.libra_client = clients.libra(**dict(
+                kwargs, http_pool_size=max(
+                    self.concurrency, int(kwargs.get('http_pool_size') or 0))))
         self.service = 'Purge Service'
         self.failure = None
         self.tenant_name = kwargs['os_tenant_name']
@@ -281,23 +232,16 @@ class PurgeCheck:
         Description - Delete all volumes where volume.display_name contains
                         'cinder'
         """
-        volumes = self.cinder_client.volumes.list()
         try:
             self.logger.warning('Deleting Volumes:')
-            for volume in volumes:
-                self.success = True
-                if 'cinder' in volume.display_name:
-                    if self.cinder_client.volumes.get(volume.id).status\
-                            == 'available':
-                        try:
-                            volume.delete()
-                            self.logger.warning('Deleting unused volume: %s' %
-                                                volume.id)
-                        except Exception as e:
-                            self.logger.error('Unable to delete volume: {}'
-                                .format(e))
-                    else:
-                        self.logger.warning('Did not delete ' + volume.id)
+            self.success = True
+            deleted, failed, remaining = volumes.purge(
+                self.cinder_client, 'cinder', self.logger,
+                max_workers=self.concurrency)
+            if failed or remaining:
+                self.success, self.overall_success = False, False
+                self.failure = '{0} volumes not deleted'.format(
+                    len(failed) + len(remaining))
         except cinder_exceptions.NotFound:
             self.logger.error("No Volumes found to delete")
             self.success, self.overall_success = False, True
@@ -340,15 +284,13 @@ class PurgeCheck:
                         'novacheck'
         """
         try:
-            instances = self.nova_client.servers.list()
+            instances = list(servers.iter_servers(self.nova_client,
+                                                  name='novacheck'))
             self.success = True
             self.logger.warning("Deleting instances")
             for instance in instances:
-                if 'novacheck' in instance.name:
-                    instance.delete()
-                    self.logger.warning("delete %s", instance.id)
-                else:
-                    self.logger.warning("did not delete " + instance.id)
+                instance.delete()
+                self.logger.warning("delete %s", instance.id)
         except Exception as e:
             self.success, self.overall_success = False, False
             self.failure = e
@@ -385,39 +327,13 @@ class PurgeCheck:
     @monitoring.timeit
     def delete_lb(self):
         """
-        Description - Delete all loadbalancers where name equals TestLB
+        Description - Delete all loadbalancers where name starts with TestLB
         """
-        name = "TestLB"
         try:
             self.logger.warning('Delete Load Balancers:')
             self.success = True
-            proc = subprocess.Popen(['libra',
-                                     '--insecure',
-                                     '--os-region-name',
-                                     self.region,
-                                     'list'], stdout=PIPE)
-            proc.wait()
-            outs, err = proc.communicate()
-            sum_output = ''
-            for lists in outs:
-                sum_output = sum_output + lists
-                if lists == '\n':
-                    sum_output = ''
-                if name in sum_output:
-                    sum_split = sum_output.split()
-                    proc = subprocess.Popen(['libra',
-                                             '--insecure',
-                                             '--os-region-name',
-                                             self.region,
-                                             'delete', sum_split[1]])
-                    sum_output = ''
-                    proc.wait()
-                    if proc.returncode == 0:
-                        self.logger.warning('deleting %s', sum_split[1])
-                    else:
-                        self.failure = "Return code " + str(proc.returncode)
-                        self.logger.error("did not delete lb return code %s",
-                                          proc.returncode)
+            lbaas.purge(self.libra_client, "TestLB", self.concurrency,
+                        self.logger)
         except Exception as e:
             self.success, self.overall_success = False, True
             self.failure = e
@@ -0,0 +1,172 @@
+import argparse
+import datetime
+import os
+import threading
+import time
+
+from histogram import Histogram
+from models import ModuleRollups
+
+
+class Rollups:
+    """
+    Description - monitoring observer keeping one histogram of the timed
+                  measurements per service, step, region, zone and
+                  bucket_seconds time bucket.  The histograms of a bucket
+                  are queued on writer as module_rollups rows once a later
+                  bucket is observed, and the rest by flush() on exit
+    """
+
+    def __init__(self, writer, bucket_seconds):
+        self.writer = writer
+        self.bucket_seconds = int(bucket_seconds)
+        self.lock = threading.Lock()
+        self.buckets = {}
+
+    def observe(self, check, run, st, en):
+        # Imported here, monitoring imports this module when it loads
+        import monitoring
+
+        payload = run['payload']
+        # Rates, counts and percentiles are not latencies
+        if payload['kind'] != monitoring.TIMER:
+            return
+        # timeit rounds run_time, the step boundaries are more precise
+        value = en - st if en > st else float(payload['run_time'])
+        bucket = int(en // self.bucket_seconds) * self.bucket_seconds
+        key = (payload['service'], payload['name'], check.region, check.zone,
+               bucket)
+
+        with self.lock:
+            histogram, failures = self.buckets.get(key, (None, 0))
+            if histogram is None:
+                histogram = Histogram()
+            histogram.record(value)
+            if not payload['success']:
+                failures += 1
+            self.buckets[key] = (histogram, failures)
+
+        self.flush(before=bucket)
+
+    def flush(self, before=None):
+        """
+        Description - Queue the rows of every bucket starting before
+                      before, of every bucket when it is None
+        """
+        with self.lock:
+            keys = [key for key in self.buckets
+                    if before is None or key[-1] < before]
+            closed = [(key, self.buckets.pop(key)) for key in keys]
+
+        for (service, name, region, zone, bucket), (histogram, failures) \
+                in closed:
+            self.writer.put(ModuleRollups.__tablename__, {
+                'service': service,
+                'name': name,
+                'region': region,
+                'zone': zone,
+                'bucket_start': datetime.datetime.fromtimestamp(bucket),
+                'bucket_seconds': self.bucket_seconds,
+                'count': histogram.count,
+                'failures': failures,
+                'p50': histogram.percentile(50),
+                'p90': histogram.percentile(90),
+                'p99': histogram.percentile(99),
+                'max': histogram.max(),
+                'histogram': histogram.dumps()})
+
+
+def query(engine, service=None, name=None, region=None, zone=None,
+          since=None, bucket_seconds=None):
+    """
+    Description - Merge the module_rollups rows matching the filters into
+                  one result per service, step, region, zone and bucket,
+                  optionally re-bucketed to bucket_seconds
+
+                  Returns a list of dicts sorted by bucket
+    """
+    from sqlalchemy import select
+
+    table = ModuleRollups.__table__
+    statement = select([table])
+    for column, value in [('service', service), ('name', name),
+                          ('region', region), ('zone', zone)]:
+        if value is not None:
+            statement = statement.where(table.c[column] == value)
+    if since is not None:
+        statement = statement.where(table.c.bucket_start >= since)
+
+    merged = {}
+    for row in engine.execute(statement):
+        bucket_start = row.bucket_start
+        if bucket_seconds:
+            epoch = time.mktime(bucket_start.timetuple())
+            bucket_start = datetime.datetime.fromtimestamp(
+                int(epoch // bucket_seconds) * bucket_seconds)
+        key = (bucket_start, row.service, row.name, row.region, row.zone)
+        histogram, failures = merged.get(key, (Histogram(), 0))
+        histogram.merge(Histogram.loads(row.histogram))
+        merged[key] = (histogram, failures + (row.failures or 0))
+
+    results = []
+    for key, (histogram, failures) in sorted(merged.items()):
+        bucket_start, service, name, region, zone = key
+        results.append({'bucket_start': bucket_start, 'service': service,
+                        'name': name, 'region': region, 'zone': zone,
+                        'count': histogram.count, 'failures': failures,
+                        'p50': histogram.percentile(50),
+                        'p90': histogram.percentile(90),
+                        'p99': histogram.percentile(99),
+                        'max': histogram.max()})
+    return results
+
+
+def main(argv):
+    """
+    Description - osfunc rollups - print the latency rollups of the steps
+                  matching the filters
+
+        osfunc rollups --service Compute --name check_active --hours 24 \
+            --bucket 3600
+    """
+    parser = argparse.ArgumentParser(prog='osfunc rollups')
+    parser.add_argument('--db-string',
+                        help='Connection string of the results database - \
+                                defaults to env[OS_DB_STRING]',
+                        default=os.environ.get('OS_DB_STRING'))
+    parser.add_argument('--service', help='Service, e.g. Compute')
+    parser.add_argument('--name', help='Step name, e.g. check_active')
+    parser.add_argument('--region', help='Region')
+    parser.add_argument('--zone', help='Availability zone')
+    parser.add_argument('--hours',
+                        help='Only show the last HOURS hours - defaults to 24',
+                        type=float,
+                        default=24)
+    parser.add_argument('--bucket',
+                        help='Merge rollups into buckets of BUCKET seconds',
+                        type=int)
+    args = parser.parse_args(argv)
+
+    if not args.db_string:
+        parser.error('--db-string or env[OS_DB_STRING] is required')
+
+    from sqlalchemy import create_engine
+
+    engine = create_engine(args.db_string)
+    since = datetime.datetime.now() - datetime.timedelta(hours=args.hours)
+    results = query(engine, service=args.service, name=args.name,
+                    region=args.region, zone=args.zone, since=since,
+                    bucket_seconds=args.bucket)
+
+    line = '{0:<19} {1:<20} {2:<28} {3:<16} {4:<8} {5:>7} {6:>5} ' \
+           '{7:>9} {8:>9} {9:>9} {10:>9}'
+    print line.format('bucket', 'service', 'name', 'region', 'zone',
+                      'count', 'fail', 'p50', 'p90', 'p99', 'max')
+    for result in results:
+        print line.format(
+            result['bucket_start'].strftime('%Y-%m-%d %H:%M:%S'),
+            result['service'], result['name'], result['region'] or '-',
+            result['zone'] or '-', result['count'], result['failures'],
+            *['{0:.3f}'.format(result[pct])
+              for pct in ['p50', 'p90', 'p99', 'max']])
+    return 0
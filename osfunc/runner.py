@@ -0,0 +1,66 @@
+import time
+
+import workers
+
+
+def exit_status(code):
+    """
+    Description - Translate a SystemExit code into a process exit status
+    """
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code
+    return 1
+
+
+def run_check(check):
+    """
+    Description - Run the workflow of a single check and return its exit
+                  status rather than letting it terminate the process
+    """
+    try:
+        check.run()
+    except SystemExit as e:
+        return exit_status(e.code)
+    except Exception as e:
+        check.logger.error('<*>%s run Failed %s', check.service, e)
+        return 1
+
+    if check.overall_success is True:
+        return 0
+    return 1
+
+
+def run_services(services, build, logger, max_workers):
+    """
+    Description - Build and run the check for every service name in
+                  services concurrently, at most max_workers at a time.
+                  build is called with the service name and must return
+                  a check object exposing run()
+
+                  Returns a dict of service name to exit status
+    """
+
+    def _run(name):
+        st = time.time()
+        try:
+            check = build(name)
+        except (Exception, SystemExit) as e:
+            logger.error('<*>%s setup Failed %s', name, e)
+            return 1, time.time() - st
+        return run_check(check), time.time() - st
+
+    statuses = {}
+    for name, result, error in workers.run_concurrently(
+            _run, services, max_workers):
+        if error is not None:
+            logger.error('<*>%s Failed %s', name, error)
+            status, elapsed = 1, 0.0
+        else:
+            status, elapsed = result
+        statuses[name] = status
+        logger.warning('<*> {0} - Exit status {1} - {2:.2f} sec'
+                       .format(name, status, elapsed))
+
+    return statuses
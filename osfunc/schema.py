@@ -0,0 +1,295 @@
+import argparse
+import datetime
+import logging
+import os
+
+from sqlalchemy import (String, Text, create_engine, func, inspect, select,
+                        text)
+from sqlalchemy.schema import CreateIndex
+
+from models import Base, ModuleRecs, ModuleRollups, ServerTimeline
+
+# Column holding the time of each row, used to partition and prune
+TIME_COLUMNS = {ModuleRecs.__tablename__: 'exec_time',
+                ModuleRollups.__tablename__: 'bucket_start',
+                ServerTimeline.__tablename__: 'observed_at'}
+
+logger = logging.getLogger(__name__)
+
+
+def _quote(engine, name):
+    return engine.dialect.identifier_preparer.quote(name)
+
+
+def _unbounded(column_type):
+    return isinstance(column_type, Text) or \
+        (isinstance(column_type, String) and not column_type.length)
+
+
+def _execute(engine, statement, **params):
+    """
+    Description - Log and run statement in its own transaction, returning
+                  the rows it selected
+    """
+    logger.info('%s', statement)
+    with engine.begin() as conn:
+        result = conn.execute(text(statement), **params)
+        return result.fetchall() if result.returns_rows else []
+
+
+def migrate(engine):
+    """
+    Description - Bring the tables of an existing results database up to
+                  models.py in place: create missing tables, narrow Text
+                  columns to their bounded String type, cutting longer
+                  values first, and add missing indexes
+
+                  MySQL gets one ALTER TABLE per table so that a large
+                  table is only rebuilt once.  SQLite does not enforce
+                  column types, only its indexes are added and its values
+                  are left whole
+    """
+    Base.metadata.create_all(engine)
+    inspector = inspect(engine)
+    dialect = engine.dialect.name
+
+    for table in Base.metadata.sorted_tables:
+        existing_columns = dict((column['name'], column['type'])
+                                for column in inspector.get_columns(table.name))
+        existing_indexes = set(index['name'] for index in
+                               inspector.get_indexes(table.name))
+        quoted_table = _quote(engine, table.name)
+
+        # Only the databases enforcing column lengths get narrowed columns,
+        # elsewhere cutting the values would lose them for nothing
+        narrowed = [column for column in table.columns
+                    if dialect in ('mysql', 'postgresql') and
+                    isinstance(column.type, String) and
+                    column.type.length and column.name in existing_columns and
+                    _unbounded(existing_columns[column.name])]
+        indexes = [index for index in table.indexes
+                   if index.name not in existing_indexes]
+
+        # Values longer than a narrowed column are cut before it is altered
+        for column in narrowed:
+            quoted = _quote(engine, column.name)
+            _execute(engine,
+                     'UPDATE {0} SET {1} = SUBSTR({1}, 1, {2}) '
+                     'WHERE LENGTH({1}) > {2}'.format(
+                         quoted_table, quoted, column.type.length))
+
+        if dialect == 'mysql':
+            clauses = ['MODIFY {0} {1} {2}'.format(
+                _quote(engine, column.name),
+                column.type.compile(dialect=engine.dialect),
+                'NULL' if column.nullable else 'NOT NULL')
+                for column in narrowed]
+            clauses += ['ADD INDEX {0} ({1})'.format(
+                _quote(engine, index.name),
+                ', '.join(_quote(engine, column.name)
+                          for column in index.columns))
+                for index in indexes]
+            if clauses:
+                _execute(engine, 'ALTER TABLE {0} {1}'.format(
+                    quoted_table, ', '.join(clauses)))
+            continue
+
+        if dialect == 'postgresql':
+            for column in narrowed:
+                _execute(engine, 'ALTER TABLE {0} ALTER COLUMN {1} TYPE {2}'
+                         .format(quoted_table, _quote(engine, column.name),
+                                 column.type.compile(dialect=engine.dialect)))
+        for index in indexes:
+            _execute(engine, str(CreateIndex(index).compile(
+                dialect=engine.dialect)))
+
+
+def _month(value):
+    return datetime.date(value.year, value.month, 1)
+
+
+def _next_month(value):
+    if value.month == 12:
+        return datetime.date(value.year + 1, 1, 1)
+    return datetime.date(value.year, value.month + 1, 1)
+
+
+def _partition_clause(month):
+    return "PARTITION p{0} VALUES LESS THAN (TO_DAYS('{1}'))".format(
+        month.strftime('%Y%m'), _next_month(month).isoformat())
+
+
+def _partitions(engine, table):
+    """
+    Description - Names of the partitions of table, oldest first, an
+                  empty list when it is not partitioned
+    """
+    rows = _execute(engine,
+                    'SELECT partition_name FROM information_schema.partitions '
+                    'WHERE table_schema = DATABASE() AND table_name = :table '
+                    'AND partition_name IS NOT NULL '
+                    'ORDER BY partition_ordinal_position', table=table)
+    return [row[0] for row in rows]
+
+
+def partition(engine, months=3, table=ModuleRecs.__tablename__):
+    """
+    Description - Partition table by month of its time column, with
+                  partitions created up to months ahead so inserts never
+                  fall in the catch all pmax partition.  Run it again, e.g.
+                  monthly from cron, to add the partitions of the coming
+                  months
+
+                  Only MySQL can partition an existing table in place.  Its
+                  partition key must be part of the primary key, which
+                  becomes (id, <time column>)
+    """
+    if engine.dialect.name != 'mysql':
+        logger.warning('Partitioning is not supported on %s, prune deletes '
+                       'old rows in batches instead', engine.dialect.name)
+        return
+
+    time_column = TIME_COLUMNS[table]
+    quoted_table = _quote(engine, table)
+    quoted_column = _quote(engine, time_column)
+    last = _month(datetime.date.today())
+    for _ in range(months):
+        last = _next_month(last)
+
+    existing = _partitions(engine, table)
+    if existing:
+        newest = [name for name in existing if name != 'pmax'][-1]
+        month = _next_month(datetime.datetime.strptime(newest, 'p%Y%m'))
+        clauses = []
+        while month <= last:
+            clauses.append(_partition_clause(month))
+            month = _next_month(month)
+        if clauses:
+            _execute(engine,
+                     'ALTER TABLE {0} REORGANIZE PARTITION pmax INTO '
+                     '({1}, PARTITION pmax VALUES LESS THAN MAXVALUE)'
+                     .format(quoted_table, ', '.join(clauses)))
+        return
+
+    _execute(engine, 'UPDATE {0} SET {1} = function_run_time '
+             'WHERE {1} IS NULL'.format(quoted_table, quoted_column)
+             if table == ModuleRecs.__tablename__ else
+             'DELETE FROM {0} WHERE {1} IS NULL'.format(quoted_table,
+                                                        quoted_column))
+    _execute(engine, 'ALTER TABLE {0} MODIFY {1} DATETIME NOT NULL, '
+             'DROP PRIMARY KEY, ADD PRIMARY KEY (id, {1})'
+             .format(quoted_table, quoted_column))
+
+    oldest = _execute(engine, 'SELECT MIN({0}) FROM {1}'.format(
+        quoted_column, quoted_table))[0][0]
+    month = _month(oldest or datetime.date.today())
+    clauses = []
+    while month <= last:
+        clauses.append(_partition_clause(month))
+        month = _next_month(month)
+    _execute(engine,
+             'ALTER TABLE {0} PARTITION BY RANGE (TO_DAYS({1})) '
+             '({2}, PARTITION pmax VALUES LESS THAN MAXVALUE)'
+             .format(quoted_table, quoted_column, ', '.join(clauses)))
+
+
+def prune(engine, days, batch_size=10000):
+    """
+    Description - Delete the rows older than days from every table
+
+                  Monthly partitions entirely older than the cutoff are
+                  dropped, which is instant.  The remaining rows are
+                  deleted in primary key ranges of batch_size so every
+                  delete is short and uses the primary key, the walk stops
+                  at the first range holding no row older than the cutoff
+                  since rows are inserted in time order
+
+                  Returns the number of rows deleted by batch
+    """
+    cutoff = datetime.datetime.now() - datetime.timedelta(days=days)
+    deleted = 0
+
+    for table in Base.metadata.sorted_tables:
+        if table.name not in TIME_COLUMNS:
+            continue
+        time_column = table.c[TIME_COLUMNS[table.name]]
+
+        if engine.dialect.name == 'mysql':
+            expired = [name for name in _partitions(engine, table.name)
+                       if name != 'pmax' and _next_month(
+                           datetime.datetime.strptime(name, 'p%Y%m')) <=
+                       cutoff.date()]
+            if expired:
+                _execute(engine, 'ALTER TABLE {0} DROP PARTITION {1}'.format(
+                    _quote(engine, table.name), ', '.join(expired)))
+
+        with engine.begin() as conn:
+            low = conn.execute(select([func.min(table.c.id)])).scalar()
+        while low is not None:
+            high = low + batch_size
+            in_range = (table.c.id >= low) & (table.c.id < high)
+            with engine.begin() as conn:
+                oldest = conn.execute(select([func.min(time_column)])
+                                      .where(in_range)).scalar()
+                if oldest is not None and oldest >= cutoff:
+                    break
+                deleted += conn.execute(table.delete().where(
+                    in_range & (time_column < cutoff))).rowcount
+                low = conn.execute(select([func.min(table.c.id)])
+                                   .where(table.c.id >= high)).scalar()
+
+        logger.info('Pruned %s rows older than %s', table.name, cutoff)
+
+    logger.info('Deleted %s rows', deleted)
+    return deleted
+
+
+def main(argv):
+    """
+    Description - osfunc schema - manage the results database
+
+        osfunc schema migrate
+        osfunc schema partition --months 3
+        osfunc schema prune --days 365
+    """
+    parser = argparse.ArgumentParser(prog='osfunc schema')
+    parser.add_argument('--db-string',
+                        help='Connection string of the results database - \
+                                defaults to env[OS_DB_STRING]',
+                        default=os.environ.get('OS_DB_STRING'))
+    commands = parser.add_subparsers(dest='command')
+    commands.add_parser('migrate',
+                        help='Add missing tables, indexes and column bounds')
+    partition_parser = commands.add_parser(
+        'partition', help='Partition module_recs by month - MySQL only')
+    partition_parser.add_argument('--months',
+                                  help='Months of partitions to create ahead \
+                                          - defaults to 3',
+                                  type=int,
+                                  default=3)
+    prune_parser = commands.add_parser('prune',
+                                       help='Delete rows older than --days')
+    prune_parser.add_argument('--days',
+                              help='Rows to keep, in days',
+                              type=float,
+                              required=True)
+    prune_parser.add_argument('--batch-size',
+                              help='Rows deleted per statement - \
+                                      defaults to 10000',
+                              type=int,
+                              default=10000)
+    args = parser.parse_args(argv)
+
+    if not args.db_string:
+        parser.error('--db-string or env[OS_DB_STRING] is required')
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    engine = create_engine(args.db_string)
+
+    if args.command == 'migrate':
+        migrate(engine)
+    elif args.command == 'partition':
+        partition(engine, args.months)
+    else:
+        prune(engine, args.days, args.batch_size)
+    return 0
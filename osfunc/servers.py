@@ -1,10 +1,50 @@
+import logging
 import time
+import discovery
 import monitoring
+import waiters
 
-from time import sleep
 from sys import exit
 
 from novaclient import exceptions as nova_exceptions
+from timeline import TASK_STATE, Timeline
+
+# Servers fetched per request by iter_servers
+PAGE_SIZE = 100
+
+logger = logging.getLogger(__name__)
+
+
+def iter_servers(nova_client, page_size=PAGE_SIZE, **search_opts):
+    """
+    Description - Yield the servers matching search_opts (name regex,
+                  status ...) as filtered by the API, fetching page_size
+                  of them at a time with limit and marker so a caller that
+                  stops early does not fetch the rest of the tenant's
+                  servers
+
+                  Nova looks the marker up among live servers on some
+                  releases, collect the servers before deleting any of them
+    """
+    marker = None
+    previous = None
+    while True:
+        page = nova_client.servers.list(search_opts=dict(
+            search_opts, limit=page_size, marker=marker))
+        ids = [server.id for server in page]
+        # An API or proxy ignoring the marker would return the same page
+        # forever
+        if marker is not None and ids and \
+                (ids[-1] == marker or ids == previous):
+            logger.warning('Server listing ignored marker %s, stopping',
+                           marker)
+            return
+        for server in page:
+            yield server
+        # A short page is the last, a long one means limit is not supported
+        if len(page) != page_size:
+            return
+        marker, previous = ids[-1], ids
 
 
 @monitoring.timeit
@@ -63,6 +103,8 @@ def create_instance(self):
         self.success, self.overall_success = False, False
         self.failure = e
         self.logger.error("<*>create_instance Failed %s", e)
+        # The image, network or keypair selected may be gone
+        discovery.invalidate(self)
         exit(1)
 
 
@@ -102,6 +144,8 @@ def create_volume_instance(self):
         self.success, self.overall_success = False, False
         self.failure = e
         self.logger.error("<*>create_instance Failed %s", e)
+        # The image, network or keypair selected may be gone
+        discovery.invalidate(self)
         exit(1)
 
 
@@ -144,9 +188,47 @@ def create_instance_with_bdm(self):
         self.success, self.overall_success = False, False
         self.failure = e
         self.logger.error("<*>create_instance_with_bdm Failed %s", e)
+        # The image, network or keypair selected may be gone
+        discovery.invalidate(self)
         exit(1)
 
 
+# Longest time to wait for an instance to reach a requested status
+SERVER_TIMEOUT = 435
+
+
+def _wait_for_status(self, target, name):
+    """
+    Description - Poll self.instance until its status is target or ERROR,
+                   returns the final status and sets self.observed_at
+
+                   Every change of status, task_state and vm_state seen on
+                   the way is stored as a server_timeline row of step name,
+                   and the time spent in each task_state is recorded as
+                   task_<task_state>
+    """
+    timeline = Timeline(self, name, self.instance.id)
+
+    def probe():
+        server = self.nova_client.servers.get(self.instance.id)
+        timeline.observe(server)
+        status = str(server.status)
+        self.logger.warning('Instance Status %s %s', status,
+                            getattr(server, TASK_STATE, None))
+        return status
+
+    try:
+        status, self.observed_at = waiters.wait_for(
+            probe, lambda status: status in (target, 'ERROR'),
+            timeout=SERVER_TIMEOUT)
+    finally:
+        timeline.close()
+    for task_state, st, en in timeline.phases():
+        monitoring.record(self, 'task_' + task_state, en - st, st=st, en=en,
+                          success=True, kind=monitoring.TIMER)
+    return status
+
+
 @monitoring.timeit
 def check_active(self):
     """
@@ -154,29 +236,28 @@ def check_active(self):
                    status or to fail
     """
 
-    for x in range(1, 30):
-        try:
-            status = \
-                str(self.nova_client.servers.get(self.instance.id).status)
-            self.logger.warning('Instance Status %s', status)
-            if status == 'ACTIVE':
-                self.success = True
-                return True
-            if status == 'ERROR':
-                self.success, self.overall_success = False, False
-                self.failure = 'ErrorStatus'
-                self.instance.delete()
-                self.logger.error("Deleting instance")
-                exit(1)
-        except nova_exceptions.NotFound:
-            self.success, self.overall_success = False, False
-            self.failure = 'Instance Not Found'
-            self.logger.error('<*>check_active Failed - Instance Not Found - {}'.format(nova_exceptions.NotFound.http_status))
-            exit(1)
-        sleep(15)
+    try:
+        status = _wait_for_status(self, 'ACTIVE', 'check_active')
+    except nova_exceptions.NotFound:
+        self.success, self.overall_success = False, False
+        self.failure = 'Instance Not Found'
+        self.logger.error('<*>check_active Failed - Instance Not Found - {}'.format(nova_exceptions.NotFound.http_status))
+        exit(1)
+    except waiters.WaitTimeout:
+        self.success, self.overall_success = False, False
+        self.failure = 'TimeOut'
+        self.logger.error("<*>check_active Failed TimeOut - Exiting")
+        self.instance.delete()
+        self.logger.error("Deleting instance")
+        exit(1)
+
+    if status == 'ACTIVE':
+        self.success = True
+        return True
+
     self.success, self.overall_success = False, False
-    self.failure = 'TimeOut'
-    self.logger.error("<*>check_active Failed TimeOut - Exiting")
+    self.failure = 'ErrorStatus'
+    discovery.invalidate(self)
     self.instance.delete()
     self.logger.error("Deleting instance")
     exit(1)
@@ -189,29 +270,27 @@ def check_stopped(self):
                    shutoff status or to fail
     """
 
-    for x in range(1, 30):
-        try:
-            status = \
-                str(self.nova_client.servers.get(self.instance.id).status)
-            self.logger.warning('Instance Status %s', status)
-            if status == 'SHUTOFF':
-                self.success = True
-                return True
-            if status == 'ERROR':
-                self.success, self.overall_success = False, False
-                self.failure = 'ErrorStatus'
-                self.instance.delete()
-                self.logger.error("Deleting instance")
-                exit(1)
-        except nova_exceptions.NotFound:
-            self.success, self.overall_success = False, False
-            self.failure = 'NotFound'
-            self.logger.error("<*>check_stopped Failed NotFound")
-            exit(1)
-        sleep(15)
+    try:
+        status = _wait_for_status(self, 'SHUTOFF', 'check_stopped')
+    except nova_exceptions.NotFound:
+        self.success, self.overall_success = False, False
+        self.failure = 'NotFound'
+        self.logger.error("<*>check_stopped Failed NotFound")
+        exit(1)
+    except waiters.WaitTimeout:
+        self.success, self.overall_success = False, False
+        self.failure = "TimeOut"
+        self.logger.error("<*>check_stopped Failed TimeOut")
+        self.instance.delete()
+        self.logger.error("Deleting instance")
+        exit(1)
+
+    if status == 'SHUTOFF':
+        self.success = True
+        return True
+
     self.success, self.overall_success = False, False
-    self.failure = "TimeOut"
-    self.logger.error("<*>check_stopped Failed TimeOut")
+    self.failure = 'ErrorStatus'
     self.instance.delete()
     self.logger.error("Deleting instance")
     exit(1)
@@ -375,12 +454,13 @@ def select_instance(self):
     """
 
     try:
-        for instance in self.nova_client.servers.list():
-            if 'novacheck' in str(instance.name) \
-                and getattr(instance, 'OS-EXT-AZ:availability_zone') \
-                == self.zone and \
-                    instance.status == 'ACTIVE':
+        # The availability zone is not a filter ordinary users may use
+        for instance in iter_servers(self.nova_client, name='novacheck',
+                                     status='ACTIVE'):
+            if getattr(instance, 'OS-EXT-AZ:availability_zone') \
+                    == self.zone:
                 self.instance = instance
+                break
         if self.instance:
             self.logger.warning("Selected Instance %s : %s" %
                                 (self.instance.id, self.instance.name))
@@ -4,23 +4,54 @@ import argparse
 import datetime
 import logging
 import os
+import sys
 
-import cdn
-import cinder
-import designate
-import glance
-import keystone
-import libra
-import neutron
-import nova
-import swift
-import trove
-import cleanup
-import purge_service
+import auth
+import discovery
+import runner
 
 from sys import exit
 
 
+# Service name -> (module, check class).  Modules are imported on demand by
+# load_check so that a run only loads the client libraries it needs
+SERVICES = {
+    'cdn': ('cdn', 'CdnCheck'),
+    'cinder': ('cinder', 'CinderCheck'),
+    'designate': ('designate', 'DNSaaSCheck'),
+    'designate_scale': ('designate_scale', 'DesignateScaleCheck'),
+    'glance': ('glance', 'GlanceCheck'),
+    'keystone': ('keystone', 'KeystoneCheck'),
+    'keystone_load': ('keystone_load', 'KeystoneLoadCheck'),
+    'libra': ('libra', 'LibraCheck'),
+    'neutron': ('neutron', 'NeutronCheck'),
+    'nova': ('nova', 'NovaCheck'),
+    'swift': ('swift', 'SwiftCheck'),
+    'swift_bench': ('swift_bench', 'SwiftBenchCheck'),
+    'trove': ('trove', 'TroveCheck'),
+    'cleanup': ('cleanup', 'CleanupCheck'),
+    'purge_service': ('purge_service', 'PurgeCheck'),
+    'bench': ('bench', 'BenchCheck'),
+    'boot_storm': ('boot_storm', 'BootStormCheck'),
+}
+
+# Services run by '--os-service all' - cleanup and purge_service are
+# housekeeping, bench runs against a fake cloud, swift_bench moves a lot of
+# data and the load, scale and boot storm tests stress the cloud, they must
+# be requested explicitly
+ALL_SERVICES = ['cdn', 'cinder', 'designate', 'glance', 'keystone', 'libra',
+                'neutron', 'nova', 'swift', 'trove']
+
+
+def load_check(name):
+    """
+    Description - Import the module of a service and return its check class
+    """
+    module_name, class_name = SERVICES[name]
+    module = __import__(module_name, globals(), locals(), [class_name])
+    return getattr(module, class_name)
+
+
 class OpenstackFunctionalShell():
     """
     OpenstackFunctionShell class serves as the entry point into the testing library - handles the various services
@@ -41,6 +72,26 @@ class OpenstackFunctionalShell():
     When executing novaneutron include the os-id parameter to select specific tenant
         --os-id <tenant id>
 
+    Several services can be run concurrently in a single process by passing a
+    comma separated list, or 'all' for every workflow service
+
+    $ osfunc --os-zone az2 --os-service nova,cinder,swift --workers 3
+
+    With --daemon the services are run every --interval seconds by a resident
+    process, reusing clients and tokens between runs
+
+    $ osfunc --os-service nova,swift --daemon --interval 300 --status-port 8778
+
+    Step latency percentiles recorded in the results database are queried with
+
+    $ osfunc rollups --service Compute --hours 24 --bucket 3600
+
+    The results database is indexed, partitioned and pruned with
+
+    $ osfunc schema migrate
+    $ osfunc schema partition --months 3
+    $ osfunc schema prune --days 365
+
     """
 
     def __init__(self):
@@ -58,10 +109,45 @@ class OpenstackFunctionalShell():
         parser = argparse.ArgumentParser(usage=__doc__)
 
         parser.add_argument('--os-service',
-                            help='Name of Openstack service to test - \
-                                    defaults to env[OS_SERVICE_NAME]', 
+                            help='Name of Openstack service to test, a comma \
+                                    separated list of services or all - \
+                                    defaults to env[OS_SERVICE_NAME]',
                             default=os.environ.get('OS_SERVICE_NAME', None),
                             required=True)
+        parser.add_argument('--workers',
+                            help='Number of services run concurrently when \
+                                    more than one is requested - \
+                                    defaults to env[OS_WORKERS] or 4',
+                            type=int,
+                            default=os.environ.get('OS_WORKERS', 4))
+        parser.add_argument('--daemon',
+                            help='Stay resident and run the services on a \
+                                    schedule instead of once',
+                            action='store_true',
+                            default=False)
+        parser.add_argument('--interval',
+                            help='Seconds between the runs of each service in \
+                                    daemon mode - defaults to env[OS_INTERVAL] \
+                                    or 300',
+                            type=float,
+                            default=os.environ.get('OS_INTERVAL', 300))
+        parser.add_argument('--jitter',
+                            help='Fraction of the interval each run is randomly \
+                                    shifted by in daemon mode - defaults to \
+                                    env[OS_JITTER] or 0.1',
+                            type=float,
+                            default=os.environ.get('OS_JITTER', 0.1))
+        parser.add_argument('--status-port',
+                            help='Port serving the last result of each service \
+                                    as JSON in daemon mode - defaults to \
+                                    env[OS_STATUS_PORT], disabled when unset',
+                            type=int,
+                            default=os.environ.get('OS_STATUS_PORT'))
+        parser.add_argument('--import-time',
+                            help='Report the time taken to import each module \
+                                    needed by the selected services',
+                            action='store_true',
+                            default=False)
         parser.add_argument('--os-username',
                             help='Username - defaults env[to OS_USERNAME]',
                             default=os.environ.get('OS_USERNAME', None))
@@ -87,13 +173,187 @@ class OpenstackFunctionalShell():
                             help="Domain ID - defaults to env[OS_DOMAIN_ID]",
                             default=os.environ.get('OS_DOMAIN_ID', None))
         parser.add_argument('--nameserver',
-                            help='Nameserver for use with designate to perform lookup - \
-                                    defaults to env[OS_NAMESERVER]',
+                            help='Comma separated nameservers, host or \
+                                    host:port, designate checks the new record \
+                                    propagated to - defaults to \
+                                    env[OS_NAMESERVER] or the nameservers of \
+                                    the domain',
                             default=os.environ.get('OS_NAMESERVER'))
+        parser.add_argument('--dns-propagation-timeout',
+                            help='Seconds a new record has to become visible \
+                                    on every nameserver - defaults to \
+                                    env[OS_DNS_PROPAGATION_TIMEOUT] or 120',
+                            type=float,
+                            default=os.environ.get(
+                                'OS_DNS_PROPAGATION_TIMEOUT', 120))
+        parser.add_argument('--designate-scale-records',
+                            help='A records created in the test domain by \
+                                    designate_scale - defaults to \
+                                    env[OS_DESIGNATE_SCALE_RECORDS] or 1000',
+                            type=int,
+                            default=os.environ.get(
+                                'OS_DESIGNATE_SCALE_RECORDS', 1000))
+        parser.add_argument('--designate-scale-concurrency',
+                            help='Records created or deleted in parallel by \
+                                    designate_scale - defaults to \
+                                    env[OS_DESIGNATE_SCALE_CONCURRENCY] or 8',
+                            type=int,
+                            default=os.environ.get(
+                                'OS_DESIGNATE_SCALE_CONCURRENCY', 8))
+        parser.add_argument('--nova-zones',
+                            help='Comma separated availability zones, or all \
+                                    for every available one, the nova \
+                                    instance workflow runs in concurrently - \
+                                    defaults to env[OS_NOVA_ZONES] or \
+                                    --os-zone only',
+                            default=os.environ.get('OS_NOVA_ZONES'))
+        parser.add_argument('--boot-storm-count',
+                            help='Instances booted at once by boot_storm - \
+                                    defaults to env[OS_BOOT_STORM_COUNT] or 10',
+                            type=int,
+                            default=os.environ.get('OS_BOOT_STORM_COUNT', 10))
+        parser.add_argument('--boot-storm-concurrency',
+                            help='Create requests sent in parallel by \
+                                    boot_storm - defaults to \
+                                    env[OS_BOOT_STORM_CONCURRENCY] or all of \
+                                    them',
+                            type=int,
+                            default=os.environ.get('OS_BOOT_STORM_CONCURRENCY'))
+        parser.add_argument('--boot-storm-flavor',
+                            help='Flavor of the boot_storm instances - \
+                                    defaults to env[OS_BOOT_STORM_FLAVOR] or 101',
+                            default=os.environ.get('OS_BOOT_STORM_FLAVOR', '101'))
+        parser.add_argument('--boot-storm-image',
+                            help='Name or id of the image booted by boot_storm \
+                                    - defaults to env[OS_BOOT_STORM_IMAGE] or \
+                                    the image the nova check selects',
+                            default=os.environ.get('OS_BOOT_STORM_IMAGE'))
+        parser.add_argument('--boot-storm-volume-size',
+                            help='Boot the boot_storm instances from volumes \
+                                    of this many GB created from the image - \
+                                    defaults to env[OS_BOOT_STORM_VOLUME_SIZE] \
+                                    or 0 to boot from the image',
+                            type=int,
+                            default=os.environ.get('OS_BOOT_STORM_VOLUME_SIZE',
+                                                   0))
         parser.add_argument('--os-purge-service',
                             help='Service to reset quotas - \
                                     defaults to env[OS_PURGE_SERVICE]',
                             default=os.environ.get('OS_PURGE_SERVICE'))
+        parser.add_argument('--cleanup-concurrency',
+                            help='Number of cleanup deletes in flight, \
+                                    shared out between about its square \
+                                    root of stages run concurrently - \
+                                    defaults to env[OS_CLEANUP_CONCURRENCY] or 8',
+                            type=int,
+                            default=os.environ.get('OS_CLEANUP_CONCURRENCY', 8))
+        parser.add_argument('--http-pool-size',
+                            help='Keep-alive connections kept per host by the \
+                                    checks calling REST APIs directly - \
+                                    defaults to env[OS_HTTP_POOL_SIZE] or 4',
+                            type=int,
+                            default=os.environ.get('OS_HTTP_POOL_SIZE', 4))
+        parser.add_argument('--http-connect-timeout',
+                            help='Seconds allowed to open a connection - \
+                                    defaults to env[OS_HTTP_CONNECT_TIMEOUT] \
+                                    or 5',
+                            type=float,
+                            default=os.environ.get('OS_HTTP_CONNECT_TIMEOUT',
+                                                   5))
+        parser.add_argument('--http-read-timeout',
+                            help='Seconds allowed between bytes of a response \
+                                    - defaults to env[OS_HTTP_READ_TIMEOUT] or \
+                                    30',
+                            type=float,
+                            default=os.environ.get('OS_HTTP_READ_TIMEOUT', 30))
+        parser.add_argument('--token-cache-dir',
+                            help='Directory used to cache Keystone tokens between \
+                                    runs, empty to disable - defaults to \
+                                    env[OS_TOKEN_CACHE_DIR] or ~/.osfunc/tokens',
+                            default=os.environ.get('OS_TOKEN_CACHE_DIR',
+                                                   auth.DEFAULT_CACHE_DIR))
+        parser.add_argument('--discovery-cache-dir',
+                            help='Directory used to cache the image, network \
+                                    and keypair selected between runs, empty \
+                                    to keep them in memory only - defaults to \
+                                    env[OS_DISCOVERY_CACHE_DIR] or \
+                                    ~/.osfunc/discovery',
+                            default=os.environ.get('OS_DISCOVERY_CACHE_DIR',
+                                                   discovery.DEFAULT_CACHE_DIR))
+        parser.add_argument('--discovery-ttl',
+                            help='Seconds a cached selection is reused, 0 to \
+                                    select again on every run - defaults to \
+                                    env[OS_DISCOVERY_TTL] or 3600',
+                            type=float,
+                            default=os.environ.get('OS_DISCOVERY_TTL',
+                                                   discovery.DEFAULT_TTL))
+        parser.add_argument('--bench-services',
+                            help='Comma separated services run by the bench \
+                                    service against a local fake cloud - \
+                                    defaults to env[OS_BENCH_SERVICES] or all \
+                                    services it emulates',
+                            default=os.environ.get('OS_BENCH_SERVICES'))
+        parser.add_argument('--bench-latency',
+                            help='Seconds added to every call served by the \
+                                    fake cloud - defaults to \
+                                    env[OS_BENCH_LATENCY] or 0',
+                            type=float,
+                            default=os.environ.get('OS_BENCH_LATENCY', 0))
+        parser.add_argument('--bench-transition',
+                            help='Seconds fake resources spend in a transitional \
+                                    status such as BUILD - defaults to \
+                                    env[OS_BENCH_TRANSITION] or 0',
+                            type=float,
+                            default=os.environ.get('OS_BENCH_TRANSITION', 0))
+        parser.add_argument('--bench-iterations',
+                            help='Number of times each bench service is run - \
+                                    defaults to env[OS_BENCH_ITERATIONS] or 1',
+                            type=int,
+                            default=os.environ.get('OS_BENCH_ITERATIONS', 1))
+        parser.add_argument('--swift-bench-sizes',
+                            help='Comma separated object sizes uploaded and \
+                                    downloaded by swift_bench, e.g. 4K,1M,1G - \
+                                    defaults to env[OS_SWIFT_BENCH_SIZES] or \
+                                    4K,1M,64M',
+                            default=os.environ.get('OS_SWIFT_BENCH_SIZES'))
+        parser.add_argument('--swift-bench-count',
+                            help='Objects of each size transferred by \
+                                    swift_bench - defaults to \
+                                    env[OS_SWIFT_BENCH_COUNT] or 10',
+                            type=int,
+                            default=os.environ.get('OS_SWIFT_BENCH_COUNT', 10))
+        parser.add_argument('--swift-bench-concurrency',
+                            help='Transfers run in parallel by swift_bench - \
+                                    defaults to env[OS_SWIFT_BENCH_CONCURRENCY] \
+                                    or 4',
+                            type=int,
+                            default=os.environ.get('OS_SWIFT_BENCH_CONCURRENCY',
+                                                   4))
+        parser.add_argument('--keystone-load-rate',
+                            help='Requests started per second by keystone_load \
+                                    - defaults to env[OS_KEYSTONE_LOAD_RATE] \
+                                    or 10',
+                            type=float,
+                            default=os.environ.get('OS_KEYSTONE_LOAD_RATE', 10))
+        parser.add_argument('--keystone-load-duration',
+                            help='Seconds keystone_load runs for - defaults to \
+                                    env[OS_KEYSTONE_LOAD_DURATION] or 60',
+                            type=float,
+                            default=os.environ.get('OS_KEYSTONE_LOAD_DURATION',
+                                                   60))
+        parser.add_argument('--keystone-load-concurrency',
+                            help='Requests keystone_load keeps in flight at \
+                                    most - defaults to \
+                                    env[OS_KEYSTONE_LOAD_CONCURRENCY] or 8',
+                            type=int,
+                            default=os.environ.get(
+                                'OS_KEYSTONE_LOAD_CONCURRENCY', 8))
+        parser.add_argument('--keystone-load-operations',
+                            help='Comma separated operations mixed by \
+                                    keystone_load out of v2, v3 and validate - \
+                                    defaults to env[OS_KEYSTONE_LOAD_OPERATIONS] \
+                                    or all of them',
+                            default=os.environ.get('OS_KEYSTONE_LOAD_OPERATIONS'))
         parser.add_argument('--db-string',
                             help='Option connection string to log results to a database - \
                                     defaults to env[OS_DB_STRING]',
@@ -116,7 +376,29 @@ class OpenstackFunctionalShell():
         return args
 
 
+def get_services(os_service):
+    """
+    Description - Expand the --os-service value into a list of service names
+    """
+    if os_service == 'all':
+        return list(ALL_SERVICES)
+
+    services = []
+    for name in os_service.split(','):
+        name = name.strip()
+        if name and name not in services:
+            services.append(name)
+    return services
+
+
 def main():
+    if sys.argv[1:2] == ['rollups']:
+        import rollups
+        exit(rollups.main(sys.argv[2:]))
+    if sys.argv[1:2] == ['schema']:
+        import schema
+        exit(schema.main(sys.argv[2:]))
+
     shell = OpenstackFunctionalShell()
     args = shell.get_args()
 
@@ -124,58 +406,55 @@ def main():
         shell.logger.warning('Please supply valid OpenStack Credentials\n\nosfunc --help')
         exit(1)
 
+    services = get_services(args.os_service)
+    unknown = [name for name in services if name not in SERVICES]
+    if not services or unknown:
+        shell.logger.warning('Unknown service(s) {0}\n\nosfunc --help'
+                             .format(', '.join(unknown)))
+        exit(1)
+
+    # The import hook slows every import down, it is only installed when
+    # the import times are asked for
+    if args.import_time:
+        from importtime import ImportTimer
+
+        with ImportTimer() as timer:
+            checks = dict((name, load_check(name)) for name in services)
+        for line in timer.report():
+            shell.logger.warning(line)
+    else:
+        checks = dict((name, load_check(name)) for name in services)
+
+    if args.daemon:
+        import daemon
+
+        def build_scheduled(name, exec_time):
+            return checks[name](logger=shell.logger,
+                                exec_time=exec_time,
+                                **vars(args))
+
+        exit(daemon.Daemon(services, build_scheduled, shell.logger,
+                           args.interval, jitter=args.jitter,
+                           max_workers=args.workers,
+                           status_port=args.status_port).run())
+
     exec_time = datetime.datetime.now()
 
-    if args.os_service == 'swift':
-        check = swift.SwiftCheck(logger=shell.logger,
-                                 exec_time=exec_time,
-                                 **vars(args))
-    if args.os_service == 'nova':
-        check = nova.NovaCheck(logger=shell.logger,
-                               exec_time=exec_time,
-                               **vars(args))
-    if args.os_service == 'glance':
-        check = glance.GlanceCheck(logger=shell.logger,
-                                   exec_time=exec_time,
-                                   **vars(args))
-    if args.os_service == 'cdn':
-        check = cdn.CdnCheck(logger=shell.logger,
-                             exec_time=exec_time,
-                             **vars(args))
-    if args.os_service == 'cinder':
-        check = cinder.CinderCheck(logger=shell.logger,
-                                   exec_time=exec_time,
-                                   **vars(args))
-    if args.os_service == 'designate':
-        check = designate.DNSaaSCheck(logger=shell.logger,
-                                      exec_time=exec_time,
-                                      **vars(args))
-    if args.os_service == 'keystone':
-        check = keystone.KeystoneCheck(logger=shell.logger,
-                                       exec_time=exec_time,
-                                       **vars(args))
-    if args.os_service == 'libra':
-        check = libra.LibraCheck(logger=shell.logger,
-                                 exec_time=exec_time,
-                                 **vars(args))
-    if args.os_service == 'neutron':
-        check = neutron.NeutronCheck(logger=shell.logger,
-                                     exec_time=exec_time,
-                                     **vars(args))
-    if args.os_service == 'trove':
-        check = trove.TroveCheck(logger=shell.logger,
-                                 exec_time=exec_time,
-                                 **vars(args))
-    if args.os_service == 'cleanup':
-        check = cleanup.CleanupCheck(logger=shell.logger,
-                                     exec_time=exec_time,
-                                     **vars(args))
-    if args.os_service == 'purge_service':
-        check = purge_service.PurgeCheck(logger=shell.logger,
-                                         exec_time=exec_time,
-                                         **vars(args))
-
-    check.run()
+    def build(name):
+        return checks[name](logger=shell.logger,
+                            exec_time=exec_time,
+                            **vars(args))
+
+    if len(services) == 1:
+        exit(runner.run_check(build(services[0])))
+
+    statuses = runner.run_services(services, build, shell.logger,
+                                   args.workers)
+
+    if all(status == 0 for status in statuses.values()):
+        exit(0)
+    else:
+        exit(1)
 
 if __name__ == '__main__':
     main()
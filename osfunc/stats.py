@@ -0,0 +1,28 @@
+import math
+
+
+def percentile(values, pct):
+    """
+    Description - Nearest rank pct percentile of values, None when empty
+    """
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    rank = int(math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[min(max(rank, 1), len(ordered)) - 1]
+
+
+def summarize(values):
+    """
+    Description - Count, mean, p50, p90, p99 and max of values
+    """
+    values = list(values)
+    if not values:
+        return {'count': 0, 'mean': None, 'p50': None, 'p90': None,
+                'p99': None, 'max': None}
+    return {'count': len(values),
+            'mean': sum(values) / float(len(values)),
+            'p50': percentile(values, 50),
+            'p90': percentile(values, 90),
+            'p99': percentile(values, 99),
+            'max': max(values)}
@@ -1,9 +1,9 @@
-from swiftclient import Connection
 from swiftclient import exceptions as cdn_exceptions
 import sys
 from sys import exit
 
 import time
+import clients
 import monitoring
 
 
@@ -31,14 +31,7 @@ class SwiftCheck:
     """
 
     def __init__(self, logger, exec_time, **kwargs):
-        self.swift_client = Connection(
-            user=kwargs['os_username'],
-            key=kwargs['os_password'],
-            tenant_name=kwargs['os_tenant_name'],
-            authurl=kwargs['os_auth_url'],
-            auth_version="2.0",
-            os_options={'region_name': kwargs['os_region']}
-        )
+        self.swift_client = clients.swift(**kwargs)
 
         self.service = 'Object Storage'
         self.logger = logger
@@ -0,0 +1,195 @@
+import time
+
+import clients
+import monitoring
+import stats
+import swift_purge
+import workers
+
+from swift import SwiftCheck
+from sys import exit
+
+# Bytes sent or read per call while streaming an object
+CHUNK_SIZE = 65536
+
+_PATTERN = ''.join(chr(i) for i in range(256)) * (CHUNK_SIZE // 256)
+
+_UNITS = [('G', 1024 ** 3), ('M', 1024 ** 2), ('K', 1024), ('', 1)]
+
+
+def parse_size(text):
+    """
+    Description - Convert a size such as 512, 4K, 64M or 5G to bytes
+    """
+    text = text.strip().upper().rstrip('B')
+    for suffix, multiplier in _UNITS:
+        if suffix and text.endswith(suffix):
+            return int(float(text[:-1]) * multiplier)
+    return int(text)
+
+
+def format_size(size):
+    for suffix, multiplier in _UNITS:
+        if size >= multiplier and size % multiplier == 0:
+            return '{0}{1}'.format(size // multiplier, suffix)
+    return str(size)
+
+
+def iter_pattern(size):
+    """
+    Description - Yield size bytes of a repeating pattern in CHUNK_SIZE
+                  chunks, so an object of any size is generated without
+                  holding it in memory
+    """
+    while size > 0:
+        chunk = _PATTERN[:min(size, CHUNK_SIZE)]
+        size -= len(chunk)
+        yield chunk
+
+
+class GeneratorReader(object):
+    """
+    Description - File like wrapper letting swiftclient stream a body from
+                  a generator of strings
+    """
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.buffer = ''
+
+    def read(self, size=-1):
+        while size < 0 or len(self.buffer) < size:
+            try:
+                self.buffer += next(self.chunks)
+            except StopIteration:
+                break
+        if size < 0:
+            size = len(self.buffer)
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+
+class SwiftBenchCheck(SwiftCheck):
+    """
+    Throughput benchmark for Swift - for every size in --swift-bench-sizes
+
+    Upload --swift-bench-count objects, --swift-bench-concurrency at a time
+    Download them back, checking their length
+    Record <op>_<size> (seconds), <op>_<size>_mbps, <op>_<size>_ops and
+    <op>_<size>_p50/_p90/_p99 (seconds per object) for upload and download
+
+    Objects are generated while they are sent and discarded while they are
+    read, sizes of several GB need no memory.  The container, swiftcheck
+    prefixed so that cleanup removes it if the run dies, is purged at the
+    end
+
+    """
+
+    def __init__(self, logger, exec_time, **kwargs):
+        SwiftCheck.__init__(self, logger, exec_time, **kwargs)
+
+        # Transfers run on several threads, each needs its own connection
+        self.bench_client = clients.PerThread(clients.swift, **kwargs)
+        self.http_timeout = clients.http_timeout(**kwargs)
+
+        self.service = 'Object Storage Benchmark'
+        self.sizes = [parse_size(size) for size in
+                      (kwargs.get('swift_bench_sizes') or '4K,1M,64M')
+                      .split(',') if size.strip()]
+        self.count = int(kwargs.get('swift_bench_count') or 10)
+        self.concurrency = int(kwargs.get('swift_bench_concurrency') or 4)
+
+    def _object_name(self, size, index):
+        return 'bench-{0}-{1:06d}'.format(format_size(size), index)
+
+    def _upload(self, size):
+        def put(index):
+            st = time.time()
+            self.bench_client.put_object(
+                self.container, self._object_name(size, index),
+                GeneratorReader(iter_pattern(size)), content_length=size,
+                chunk_size=CHUNK_SIZE)
+            return time.time() - st
+
+        return put
+
+    def _download(self, size):
+        def get(index):
+            st = time.time()
+            headers, body = self.bench_client.get_object(
+                self.container, self._object_name(size, index),
+                resp_chunk_size=CHUNK_SIZE)
+            received = 0
+            for chunk in body:
+                received += len(chunk)
+            if received != size:
+                raise Exception('Read {0} of {1} bytes'
+                                .format(received, size))
+            return time.time() - st
+
+        return get
+
+    def measure(self, operation, size, transfer):
+        """
+        Description - Run transfer for every object of size and record
+                      its throughput, rate and latency percentiles
+        """
+        label = '{0}_{1}'.format(operation, format_size(size))
+        st = time.time()
+        results = workers.run_concurrently(transfer, range(self.count),
+                                           self.concurrency)
+        en = time.time()
+        elapsed = en - st
+
+        latencies = [latency for index, latency, error in results
+                     if error is None]
+        errors = [error for index, latency, error in results
+                  if error is not None]
+        summary = stats.summarize(latencies)
+        mbps = size * len(latencies) / elapsed / 10 ** 6 if elapsed else 0.0
+        ops = len(latencies) / elapsed if elapsed else 0.0
+
+        self.success = not errors
+        self.failure = errors[0] if errors else None
+        if errors:
+            self.overall_success = False
+            self.logger.error('<*>%s Failed %s of %s %s', label, len(errors),
+                              self.count, errors[0])
+
+        self.logger.warning(
+            '<*> {0} - {1} objects in {2:.2f} sec - {3:.2f} MB/s - '
+            '{4:.2f} ops/s - p50 {5:.4f} p99 {6:.4f} sec'.format(
+                label, len(latencies), elapsed, mbps, ops,
+                summary['p50'] or 0.0, summary['p99'] or 0.0))
+
+        monitoring.record(self, label, elapsed, st=st, en=en,
+                          kind=monitoring.TIMER)
+        monitoring.record(self, label + '_mbps', mbps)
+        monitoring.record(self, label + '_ops', ops)
+        for pct in ['p50', 'p90', 'p99']:
+            if summary[pct] is not None:
+                monitoring.record(self, '{0}_{1}'.format(label, pct),
+                                  summary[pct])
+        self.failure = None
+
+    def run(self):
+        self.create_container()
+
+        if self.overall_success is True:
+            for size in self.sizes:
+                self.measure('upload', size, self._upload(size))
+                self.measure('download', size, self._download(size))
+
+        if hasattr(self, 'container'):
+            try:
+                swift_purge.purge_container(self.bench_client, self.container,
+                                            self.concurrency, self.logger,
+                                            timeout=self.http_timeout)
+            except Exception as e:
+                self.overall_success = False
+                self.logger.error('<*>purge_container Failed %s', e)
+
+        if self.overall_success is True:
+            exit(0)
+        else:
+            exit(1)
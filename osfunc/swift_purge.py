@@ -0,0 +1,130 @@
+import time
+import urllib
+
+import requests
+
+import clients
+import workers
+
+# Objects requested per container listing
+PAGE_SIZE = 10000
+
+
+def iter_object_names(conn, container, page_size=PAGE_SIZE):
+    """
+    Description - Yield every object name in container, paging through the
+                  listing with markers instead of relying on a single GET
+    """
+    marker = ''
+    while True:
+        page = conn.get_container(container, marker=marker,
+                                  limit=page_size)[1]
+        if not page:
+            return
+        for obj in page:
+            yield obj['name']
+        marker = page[-1]['name']
+
+
+def bulk_delete_limit(conn):
+    """
+    Description - Return max_deletes_per_request when the cluster advertises
+                  the bulk delete middleware in /info, None otherwise
+    """
+    try:
+        capabilities = conn.get_capabilities()
+    except Exception:
+        return None
+    bulk_delete = capabilities.get('bulk_delete')
+    if bulk_delete is None:
+        return None
+    return int(bulk_delete.get('max_deletes_per_request', 10000))
+
+
+def _bulk_delete(conn, container, names, timeout):
+    url, token = conn.url, conn.token
+    if not url or not token:
+        url, token = conn.get_auth()
+
+    body = '\n'.join(urllib.quote(u'/{0}/{1}'.format(container, name)
+                                  .encode('utf-8'))
+                     for name in names)
+    response = requests.post(url + '?bulk-delete', data=body,
+                             headers={'X-Auth-Token': token,
+                                      'Content-Type': 'text/plain',
+                                      'Accept': 'application/json'},
+                             timeout=timeout)
+    response.raise_for_status()
+    result = response.json()
+    if result.get('Errors'):
+        raise Exception('Bulk delete failed for {0} objects: {1}'.format(
+            len(result['Errors']), result.get('Response Status')))
+    return result.get('Number Deleted', 0) + \
+        result.get('Number Not Found', 0)
+
+
+def _chunks(names, size):
+    chunk = []
+    for name in names:
+        chunk.append(name)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def purge_container(conn, container, max_workers, logger, timeout=None):
+    """
+    Description - Delete every object in container and then the container
+
+                  Objects are removed through the bulk delete middleware in
+                  batches of max_deletes_per_request when the cluster
+                  supports it, otherwise one DELETE per object with at most
+                  max_workers in flight.  conn must be safe to use from
+                  several threads, see clients.PerThread.  timeout is the
+                  (connect, read) timeout of the bulk delete requests,
+                  clients.http_timeout() by default
+
+                  Returns the number of objects deleted
+    """
+    st = time.time()
+    timeout = timeout or clients.http_timeout()
+    limit = bulk_delete_limit(conn)
+    deleted = 0
+    failed = 0
+
+    for page in _chunks(iter_object_names(conn, container), PAGE_SIZE):
+        if limit is not None:
+            results = workers.run_concurrently(
+                lambda names: _bulk_delete(conn, container, names, timeout),
+                list(_chunks(page, limit)), max_workers)
+            for names, count, error in results:
+                if error is None:
+                    deleted += count
+                else:
+                    failed += len(names)
+                    logger.warning('Bulk delete in %s failed %s',
+                                   container, error)
+        else:
+            results = workers.run_concurrently(
+                lambda name: conn.delete_object(container, name),
+                page, max_workers)
+            for name, result, error in results:
+                if error is None:
+                    deleted += 1
+                else:
+                    failed += 1
+                    logger.warning('Did not delete object %s %s', name, error)
+
+    elapsed = time.time() - st
+    logger.warning('Purged %s objects from %s in %.2f sec - '
+                   '%.1f objects/sec%s', deleted, container, elapsed,
+                   deleted / elapsed if elapsed else 0.0,
+                   ' (bulk delete)' if limit is not None else '')
+    if failed:
+        raise Exception(u'{0} objects could not be deleted from {1}'
+                        .format(failed, container))
+
+    conn.delete_container(container)
+    return deleted
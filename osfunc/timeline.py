@@ -0,0 +1,80 @@
+import datetime
+import time
+
+import monitoring
+
+# Attributes of a server whose changes are recorded
+TASK_STATE = 'OS-EXT-STS:task_state'
+VM_STATE = 'OS-EXT-STS:vm_state'
+
+
+class Timeline:
+    """
+    Description - Transitions of one server as seen by the polls of a
+                  wait.  observe() is given every server the wait fetched
+                  and keeps the ones whose status, task_state or vm_state
+                  differ from the previous, close() queues them as
+                  server_timeline rows when results go to a database
+
+                  A state is only seen when a poll happens to land in it,
+                  the recorded times are those of the poll
+
+        timeline = Timeline(self, 'check_active', self.instance.id)
+        ... timeline.observe(self.nova_client.servers.get(...)) ...
+        timeline.close()
+    """
+
+    def __init__(self, check, name, instance_id, started_at=None):
+        self.check = check
+        self.name = name
+        self.instance_id = instance_id
+        self.started_at = started_at or time.time()
+        self.transitions = []
+
+    def observe(self, server, observed_at=None):
+        """
+        Description - Record the state of server if it changed
+        """
+        state = (str(server.status), getattr(server, TASK_STATE, None),
+                 getattr(server, VM_STATE, None))
+        if self.transitions and self.transitions[-1][1:] == state:
+            return
+        self.transitions.append((observed_at or time.time(),) + state)
+
+    def phases(self):
+        """
+        Description - (task_state, st, en) for every task_state seen, from
+                      the poll that first saw it to the poll that saw the
+                      next task_state.  Changes of status or vm_state alone
+                      do not end a phase
+        """
+        phases = []
+        st, current = None, None
+        for observed_at, _, task_state, _ in self.transitions:
+            if task_state == current:
+                continue
+            if current is not None:
+                phases.append((current, st, observed_at))
+            st, current = observed_at, task_state
+        return phases
+
+    def close(self):
+        if not monitoring.sql_conn:
+            return
+        from models import ServerTimeline
+
+        check = self.check
+        for observed_at, status, task_state, vm_state in self.transitions:
+            monitoring.writer.put(ServerTimeline.__tablename__, {
+                'service': check.service,
+                'exec_time': check.exec_time,
+                'name': self.name,
+                'instance_id': self.instance_id,
+                'status': status,
+                'task_state': task_state,
+                'vm_state': vm_state,
+                'observed_at': datetime.datetime.fromtimestamp(observed_at),
+                'elapsed': observed_at - self.started_at,
+                'zone': check.zone,
+                'region': check.region,
+                'tenant_name': check.tenant_name})
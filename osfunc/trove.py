@@ -1,7 +1,7 @@
 import time
+import clients
 import monitoring
 
-from troveclient.v1 import client
 from time import sleep
 from troveclient.common import exceptions as trove_exceptions
 
@@ -23,13 +23,7 @@ class TroveCheck:
     """
 
     def __init__(self, logger, exec_time, **kwargs):
-        self.client = client.Client(
-            kwargs['os_username'],
-            kwargs['os_password'],
-            kwargs['os_tenant_name'],
-            kwargs['os_auth_url'],
-            region_name=kwargs['os_region'],
-        )
+        self.client = clients.trove(**kwargs)
 
         self.instance = ''
         self.logger = logger
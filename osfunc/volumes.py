@@ -1,5 +1,8 @@
+import discovery
 import monitoring
 import servers
+import waiters
+import workers
 
 from time import sleep
 from random import choice
@@ -88,23 +91,85 @@ def list_volume_type(self):
         self.failure = e
 
 
+# Deletes in flight and longest time to wait for them in purge
+PURGE_CONCURRENCY = 4
+PURGE_TIMEOUT = 120
+
+
+def purge(cinder_client, match, logger, zone=None,
+          max_workers=PURGE_CONCURRENCY, timeout=PURGE_TIMEOUT):
+    """
+    Description - Delete every available volume whose display name contains
+                  match, in zone when one is given, and wait until they
+                  are gone
+
+                  The volumes are found with a single detailed listing
+                  which the API filters on status and zone, their status
+                  is taken from it rather than fetched volume by volume.
+                  The deletes run with at most max_workers in flight and
+                  are then waited for together, one listing per poll
+
+                  Returns (deleted, failed, remaining), the volumes deleted,
+                  the volumes whose delete was refused and the ids of the
+                  deleted volumes still listed when the wait ended
+    """
+    search_opts = {'availability_zone': zone}
+    volumes = [volume for volume in cinder_client.volumes.list(
+               detailed=True, search_opts=dict(search_opts,
+                                               status='available'))
+               # Older APIs ignore some of the filters
+               if volume.status == 'available' and
+               (zone is None or volume.availability_zone == zone) and
+               match in (volume.display_name or '')]
+
+    deleted, failed = [], []
+    for volume, result, error in workers.run_concurrently(
+            lambda volume: cinder_client.volumes.delete(volume.id),
+            volumes, max_workers):
+        if error is None:
+            logger.warning('Deleting unused volume: %s', volume.id)
+            deleted.append(volume)
+        else:
+            logger.warning('Did not delete %s %s', volume.id, error)
+            failed.append(volume)
+
+    remaining = [volume.id for volume in deleted]
+
+    def probe():
+        listed = dict((volume.id, volume.status) for volume in
+                      cinder_client.volumes.list(detailed=True,
+                                                 search_opts=search_opts))
+        remaining[:] = [volume_id for volume_id in remaining
+                        if volume_id in listed]
+        # A volume in error_deleting is not going anywhere
+        return [volume_id for volume_id in remaining
+                if listed[volume_id] != 'error_deleting']
+
+    try:
+        if remaining:
+            waiters.wait_for(probe, lambda deleting: not deleting,
+                             timeout=timeout)
+    except waiters.WaitTimeout:
+        pass
+    for volume_id in remaining:
+        logger.warning('Volume %s was not deleted', volume_id)
+    return deleted, failed, remaining
+
+
 @monitoring.timeit
 def delete_available(self):
     """
     Description - Delete all volumes for the tenant in the zone with a status
                   of available and a display name containing cindercheck
     """
-    volumes = self.cinder_client.volumes.list()
     try:
-        for volume in volumes:
-            self.success = True
-            if volume.availability_zone == self.zone:
-                if 'cindercheck' in volume.display_name:
-                    if self.cinder_client.volumes.get(volume.id).status\
-                            == 'available':
-                        self.logger.warning('Deleting unused volume: %s' %
-                                            volume.id)
-                        volume.delete()
+        self.success = True
+        deleted, failed, remaining = purge(self.cinder_client, 'cindercheck',
+                                           self.logger, zone=self.zone)
+        if failed or remaining:
+            self.success, self.overall_success = False, False
+            self.failure = '{0} volumes not deleted'.format(
+                len(failed) + len(remaining))
     except cinder_exceptions.NotFound:
         self.logger.error("No Volumes found to delete")
         self.success, self.overall_success = False, False
@@ -181,42 +246,52 @@ def create_with_image(self):
         self.logger.error('Got exception: {}'.format(e))
         self.success, self.overall_success = False, False
         self.failure = e
+        discovery.invalidate(self)
         exit(1)
 
 
+# Longest time to wait for a volume to become available
+VOLUME_TIMEOUT = 285
+
+
 @monitoring.timeit
 def check_available(self):
     """
     Description - Wait for newly created volume to change to active
                    status or to fail
     """
+
+    def probe():
+        status = self.cinder_client.volumes.get(self.volume.id).status
+        self.logger.warning("Status %s", status)
+        return status
+
     try:
-        for x in range(1, 20):
-            status = self.cinder_client.volumes.get(self.volume.id).status
-            self.logger.warning("Status %s", status)
-            if status == 'available':
-                self.logger.warning("Volume Is Available")
-                self.success = True
-                return True
-            if status == 'error':
-                self.loffer.warning("Volume is in error state")
-                self.success, self.overall_success = False, False
-                return True
-            sleep(15)
+        status, self.observed_at = waiters.wait_for(
+            probe, lambda status: status in ('available', 'error'),
+            timeout=VOLUME_TIMEOUT)
+        if status == 'available':
+            self.logger.warning("Volume Is Available")
+            self.success = True
+            return True
+        self.logger.warning("Volume is in error state")
+        self.success, self.overall_success = False, False
+        return True
     except cinder_exceptions.NotFound:
         self.logger.error("404 volume not found %s", self.volume.id)
         self.success, self.overall_success = False, False
         self.failure = "Not Found"
         exit(1)
+    except waiters.WaitTimeout:
+        self.logger.error("Volume Never Became Available - Timeout")
+        self.success, self.overall_success = False, False
+        self.failure = "Volume Never Became Available - Timeout"
+        exit(1)
     except Exception as e:
         self.logger.error('Check_available volume Failed: %s' % e)
         self.success, self.overall_success = False, False
         self.failure = e
         exit(1)
-    self.logger.error("Volume Never Became Available - Timeout")
-    self.success, self.overall_success = False, False
-    self.failure = "Volume Never Became Available - Timeout"
-    exit(1)
 
 
 @monitoring.timeit
@@ -0,0 +1,42 @@
+import random
+import time
+
+from time import sleep
+
+
+class WaitTimeout(Exception):
+    pass
+
+
+def wait_for(probe, done, timeout, initial=1, factor=2, max_interval=5,
+             jitter=0.2):
+    """
+    Description - Call probe() until done(value) is true for the value it
+                  returns or timeout seconds have passed
+
+                  The first probes are issued quickly and the interval then
+                  grows by factor up to max_interval, each sleep randomised
+                  by +/- jitter so that concurrent waiters do not poll in
+                  lock step
+
+                  Returns (value, observed_at) where observed_at is the
+                  time.time() at which the probe that satisfied done()
+                  returned.  Raises WaitTimeout once timeout expires and
+                  lets any exception raised by probe() propagate
+    """
+    deadline = time.time() + timeout
+    interval = initial
+
+    while True:
+        value = probe()
+        observed_at = time.time()
+        if done(value):
+            return value, observed_at
+
+        remaining = deadline - observed_at
+        if remaining <= 0:
+            raise WaitTimeout('Timed out after {0} sec'.format(timeout))
+
+        delay = interval * random.uniform(1 - jitter, 1 + jitter)
+        sleep(min(delay, remaining))
+        interval = min(interval * factor, max_interval)
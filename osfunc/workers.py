@@ -0,0 +1,85 @@
+import Queue
+
+from multiprocessing.pool import ThreadPool
+
+
+def _call(func, item):
+    """
+    Description - Invoke func on a single item and hand back the outcome
+                  instead of raising.  SystemExit is trapped as well since
+                  most steps call exit() on failure, and an uncaught
+                  SystemExit kills a ThreadPool worker and hangs map()
+    """
+    try:
+        return item, func(item), None
+    except (Exception, SystemExit) as e:
+        return item, None, e
+
+
+def run_concurrently(func, items, max_workers):
+    """
+    Description - Apply func to every item on a bounded pool of threads
+
+                  Returns a list of (item, result, error) tuples in the
+                  same order as items - error is None when func returned
+                  normally, otherwise the exception it raised
+    """
+    items = list(items)
+    if not items:
+        return []
+
+    max_workers = max(1, min(int(max_workers), len(items)))
+    if max_workers == 1:
+        return [_call(func, item) for item in items]
+
+    pool = ThreadPool(max_workers)
+    try:
+        return pool.map(lambda item: _call(func, item), items)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def run_graph(func, graph, max_workers):
+    """
+    Description - Call func(name) for every name in graph, a dict of
+                  name -> names that must have finished first.  Names whose
+                  dependencies are satisfied run concurrently on a bounded
+                  pool of threads
+
+                  Returns a dict of name -> (result, error) as for
+                  run_concurrently.  A name still runs when something it
+                  depends on failed, dependencies only order the work
+    """
+    pending = dict((name, set(deps) & set(graph))
+                   for name, deps in graph.items())
+    results = {}
+    running = []
+    finished = Queue.Queue()
+    pool = ThreadPool(max(1, int(max_workers)))
+
+    def _submit_ready():
+        for name in sorted(pending):
+            if not pending[name]:
+                del pending[name]
+                running.append(name)
+                pool.apply_async(_call, (func, name),
+                                 callback=finished.put)
+        if pending and not running:
+            raise ValueError('Dependency cycle between {0}'
+                             .format(', '.join(sorted(pending))))
+
+    try:
+        _submit_ready()
+        while len(results) < len(graph):
+            name, result, error = finished.get()
+            running.remove(name)
+            results[name] = (result, error)
+            for deps in pending.values():
+                deps.discard(name)
+            _submit_ready()
+    finally:
+        pool.close()
+        pool.join()
+
+    return results
@@ -0,0 +1,271 @@
+import atexit
+import datetime
+import errno
+import json
+import logging
+import os
+import threading
+import time
+import Queue
+
+from sqlalchemy import DateTime, String
+from sqlalchemy.exc import OperationalError
+
+DATETIME_FORMAT = '%Y-%m-%dT%H:%M:%S.%f'
+
+_STOP = object()
+
+
+class BufferedWriter:
+    """
+    Description - Queue result rows in memory and insert them from a
+                  background thread so that a slow or unreachable database
+                  never stalls a timed step.
+
+                  Rows are flushed with one multi-row insert per table once
+                  batch_size rows are queued or flush_interval seconds have
+                  passed, and on interpreter exit.  When the queue is full
+                  or an insert fails the rows are appended to spill_path as
+                  JSON lines and replayed after the next successful flush,
+                  where a spilled row the database refuses is dropped.
+                  Unless tables_created the tables of metadata are created
+                  before the first insert, once the database is reachable.
+    """
+
+    def __init__(self, engine, metadata, spill_path, batch_size=100,
+                 flush_interval=5, max_queue=10000, tables_created=False):
+        self.engine = engine
+        self.metadata = metadata
+        self.tables = metadata.tables
+        self.tables_created = tables_created
+        # Values too long for a bounded column are cut rather than failing
+        # the whole batch on a strict database
+        self.bounds = dict(
+            (name, [(column.name, column.type.length)
+                    for column in table.columns
+                    if isinstance(column.type, String) and
+                    column.type.length])
+            for name, table in self.tables.items())
+        self.spill_path = os.path.expanduser(spill_path)
+        self.replays = 0
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.logger = logging.getLogger(__name__)
+
+        self.queue = Queue.Queue(max_queue)
+        self.spill_lock = threading.Lock()
+        self.thread = threading.Thread(target=self._run,
+                                       name='osfunc-writer')
+        self.thread.daemon = True
+        self.thread.start()
+
+        atexit.register(self.close)
+
+    def put(self, table, row):
+        """
+        Description - Queue row (a dict of column values) for insertion
+                      into table without blocking
+        """
+        try:
+            self.queue.put_nowait((table, row))
+        except Queue.Full:
+            self._spill([(table, row)])
+
+    def close(self, timeout=30):
+        """
+        Description - Flush everything queued and stop the writer thread
+        """
+        if not self.thread.is_alive():
+            return
+        try:
+            self.queue.put(_STOP, timeout=timeout)
+        except Queue.Full:
+            pass
+        self.thread.join(timeout)
+
+    def _run(self):
+        batch = []
+        last_flush = time.time()
+
+        while True:
+            wait = self.flush_interval - (time.time() - last_flush)
+            try:
+                item = self.queue.get(timeout=max(wait, 0.01))
+            except Queue.Empty:
+                item = None
+
+            if item is _STOP:
+                break
+            if item is not None:
+                batch.append(item)
+
+            if len(batch) >= self.batch_size or \
+                    time.time() - last_flush >= self.flush_interval:
+                self._flush(batch)
+                batch = []
+                last_flush = time.time()
+
+        # Drain anything queued ahead of the stop marker
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except Queue.Empty:
+                break
+            if item is not _STOP:
+                batch.append(item)
+        self._flush(batch)
+
+    def _insert(self, batch):
+        if not self.tables_created:
+            self.metadata.create_all(self.engine)
+            self.tables_created = True
+
+        by_table = {}
+        for table, row in batch:
+            for column, length in self.bounds.get(table, []):
+                value = row.get(column)
+                if value is not None and len(value) > length:
+                    row[column] = value[:length]
+            by_table.setdefault(table, []).append(row)
+
+        with self.engine.begin() as conn:
+            for table, rows in by_table.items():
+                conn.execute(self.tables[table].insert(), rows)
+
+    def _flush(self, batch):
+        if batch:
+            try:
+                self._insert(batch)
+            # Any error, the writer thread must outlive a bad batch
+            except Exception as e:
+                self.logger.error('Unable to write %s results, spilling to '
+                                  '%s: %s', len(batch), self.spill_path, e)
+                self._spill(batch)
+                return
+        self._replay()
+
+    def _spill(self, batch):
+        with self.spill_lock:
+            try:
+                directory = os.path.dirname(self.spill_path)
+                if directory and not os.path.isdir(directory):
+                    os.makedirs(directory)
+                with open(self.spill_path, 'a') as spill_file:
+                    for table, row in batch:
+                        spill_file.write(json.dumps(
+                            {'table': table, 'row': self._dump(row)}) + '\n')
+            except Exception as e:
+                self.logger.error('Dropping %s results, unable to spill: %s',
+                                  len(batch), e)
+
+    def _replay_path(self):
+        self.replays += 1
+        return '{0}.replay.{1}.{2}'.format(self.spill_path, os.getpid(),
+                                           self.replays)
+
+    def _orphaned(self, path):
+        """
+        Description - Whether the replay file path was left by a process
+                      that is no longer running, one killed mid replay
+        """
+        try:
+            pid = int(path[len(self.spill_path + '.replay.'):].split('.')[0])
+        except ValueError:
+            # Named .replay by older versions of the writer
+            return True
+        if pid == os.getpid():
+            return False
+        try:
+            os.kill(pid, 0)
+        except OSError as e:
+            return e.errno == errno.ESRCH
+        return False
+
+    def _replay(self):
+        """
+        Description - Re-insert rows spilled while the database was down,
+                      and those of replays that died before they were done
+        """
+        replay_paths = []
+        with self.spill_lock:
+            # Every replay renames the files it takes to a name of its own,
+            # so no file is overwritten or replayed twice
+            directory, name = os.path.split(self.spill_path)
+            try:
+                names = os.listdir(directory or '.')
+            except OSError:
+                names = []
+            paths = [os.path.join(directory, other) for other in names
+                     if other.startswith(name + '.replay') and
+                     self._orphaned(os.path.join(directory, other))]
+            if os.path.exists(self.spill_path):
+                paths.append(self.spill_path)
+            for path in paths:
+                replay_path = self._replay_path()
+                try:
+                    os.rename(path, replay_path)
+                except OSError:
+                    continue
+                replay_paths.append(replay_path)
+        if not replay_paths:
+            return
+
+        batch = []
+        for replay_path in replay_paths:
+            with open(replay_path) as replay_file:
+                for line in replay_file:
+                    try:
+                        item = json.loads(line)
+                        batch.append((item['table'],
+                                      self._load(item['table'],
+                                                 item['row'])))
+                    except (ValueError, KeyError):
+                        continue
+
+        try:
+            for i in range(0, len(batch), self.batch_size):
+                self._insert(batch[i:i + self.batch_size])
+        except OperationalError as e:
+            self.logger.error('Unable to replay %s spilled results: %s',
+                              len(batch) - i, e)
+            self._spill(batch[i:])
+        except Exception:
+            # The database is there but refuses a row of the batch
+            self._insert_rows(batch[i:])
+        else:
+            self.logger.warning('Replayed %s spilled results', len(batch))
+        for replay_path in replay_paths:
+            os.remove(replay_path)
+
+    def _insert_rows(self, batch):
+        """
+        Description - Insert the rows of batch one at a time, dropping the
+                      ones that cannot be inserted and spilling the rest
+                      if the database becomes unreachable
+        """
+        for i, (table, row) in enumerate(batch):
+            try:
+                self._insert([(table, row)])
+            except OperationalError as e:
+                self.logger.error('Unable to replay %s spilled results: %s',
+                                  len(batch) - i, e)
+                self._spill(batch[i:])
+                return
+            except Exception as e:
+                self.logger.error('Dropping %s result %s: %s', table,
+                                  row.get('name'), e)
+
+    def _dump(self, row):
+        dumped = {}
+        for key, value in row.items():
+            if isinstance(value, datetime.datetime):
+                value = value.strftime(DATETIME_FORMAT)
+            dumped[key] = value
+        return dumped
+
+    def _load(self, table, row):
+        for column in self.tables[table].columns:
+            if isinstance(column.type, DateTime) and row.get(column.name):
+                row[column.name] = datetime.datetime.strptime(
+                    row[column.name], DATETIME_FORMAT)
+        return row